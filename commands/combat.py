@@ -10,6 +10,9 @@ class CmdAttack(Command):
     用法:
       攻击 <目标>
       attack <target>
+    
+    目标正在战斗时加入战斗（站在目标的对立面）；
+    团战中对敌方使用则切换攻击目标。
     """
     
     key = "攻击"
@@ -33,6 +36,10 @@ class CmdAttack(Command):
             return
         
         if hasattr(caller.ndb, 'in_combat') and caller.ndb.in_combat:
+            # 团战中可以切换目标
+            if COMBAT_MANAGER.switch_target(caller, target):
+                caller.msg(f"你将目标转向了{target.name or target.key}。")
+                return
             caller.msg("你已经在战斗中了！")
             return
         
@@ -45,6 +52,12 @@ class CmdAttack(Command):
             caller.msg("这里是安全区，不能战斗！")
             return
         
+        # 目标正在战斗：加入战斗（团战）
+        if getattr(target.ndb, 'in_combat', False):
+            if not COMBAT_MANAGER.join_combat(caller, target):
+                caller.msg(f"{target.key} 正在战斗中，你插不上手。")
+            return
+        
         COMBAT_MANAGER.start_combat(caller, target)
 
 class CmdFlee(Command):
@@ -3,7 +3,7 @@
 建造者命令 - 用YAML数据创建游戏对象
 """
 from evennia import Command, create_object
-from world.loaders.game_data import GAME_DATA
+from world.loaders.game_data import GAME_DATA, thaw
 from typeclasses.npcs import NPC
 from typeclasses.rooms import Room
 
@@ -72,10 +72,11 @@ class CmdSpawnNPC(Command):
         
         # 设置属性
         npc.db.desc = npc_data.get('desc', f"这是 {custom_key}")
-        npc.db.stats = npc_data.get('stats', {})
-        npc.db.skills = npc_data.get('skills', ['普通攻击'])
-        npc.db.passive_skills = npc_data.get('passive_skills', [])
-        npc.db.drops = npc_data.get('drops', [])
+        # GAME_DATA 是只读的，存进 Attribute 前复制
+        npc.db.stats = thaw(npc_data.get('stats', {}))
+        npc.db.skills = thaw(npc_data.get('skills', ['普通攻击']))
+        npc.db.passive_skills = thaw(npc_data.get('passive_skills', []))
+        npc.db.drops = thaw(npc_data.get('drops', []))
         npc.db.dialogue = npc_data.get('dialogue', f"{custom_key}: 你好。")
         npc.db.ai_type = npc_data.get('ai_type', 'passive')
         
@@ -99,4 +99,223 @@ class CmdCombatDebug(Command):
         if fixed_count > 0:
             self.caller.msg(f"|y共修复了 {fixed_count} 个数据问题。现在应该不会卡死了。|n")
         else:
-            self.caller.msg("|g数据看起来很健康，无需修复。|n")
\ No newline at end of file
+            self.caller.msg("|g数据看起来很健康，无需修复。|n")
+
+class CmdCombatScheduler(Command):
+    """
+    查看战斗调度器（时间轮）状态
+
+    用法:
+      xx sched         - 显示队列深度、延迟与抖动统计、战斗文本合并情况
+      xx sched/reset   - 清空统计数据
+    """
+
+    key = "xx sched"
+    aliases = ["combatsched"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+
+    def func(self):
+        from world.managers.combat_scheduler import COMBAT_SCHEDULER
+
+        if 'reset' in self.switches:
+            from world.systems.battle_text import TEXT_STATS
+            COMBAT_SCHEDULER.reset_stats()
+            for key in TEXT_STATS:
+                TEXT_STATS[key] = 0
+            self.caller.msg("|g调度统计已清空。|n")
+            return
+
+        stats = COMBAT_SCHEDULER.get_stats()
+        self.caller.msg("|w=== 战斗调度器 ===|n")
+        self.caller.msg(f"精度: {COMBAT_SCHEDULER.resolution}s  槽位: {COMBAT_SCHEDULER.wheel_size}")
+        self.caller.msg(f"队列深度: |y{stats['queue_depth']}|n (峰值 {stats['peak_depth']})")
+        self.caller.msg(f"已调度: {stats['scheduled']}  已执行: {stats['fired']}  已取消: {stats['cancelled']}  出错: {stats['errors']}")
+        self.caller.msg(f"回调延迟: 平均 {stats['lag_avg_ms']}ms / 最大 {stats['lag_max_ms']}ms")
+        self.caller.msg(f"Tick抖动: 平均 {stats['jitter_avg_ms']}ms / 最大 {stats['jitter_max_ms']}ms")
+
+        from world.systems.battle_text import TEXT_STATS
+        self.caller.msg(
+            f"战斗文本: {TEXT_STATS['lines']} 行 → {TEXT_STATS['flushes']} 批 / {TEXT_STATS['writes']} 次发送"
+        )
+
+
+class CmdEffectStats(Command):
+    """
+    查看技能效果耗时（按效果类型统计）
+
+    用法:
+      xx effects         - 按累计耗时列出各效果的调用次数与平均耗时
+      xx effects/reset   - 清空统计数据
+    """
+
+    key = "xx effects"
+    aliases = ["effectstats"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+
+    def func(self):
+        from world.systems.skill_effects import get_effect_stats, reset_effect_stats
+
+        if 'reset' in self.switches:
+            reset_effect_stats()
+            self.caller.msg("|g效果耗时统计已清空。|n")
+            return
+
+        rows = get_effect_stats()
+        if not rows:
+            self.caller.msg("|y还没有效果执行记录。|n")
+            return
+
+        total = sum(seconds for _, _, seconds in rows) or 1
+        self.caller.msg("|w=== 技能效果耗时 ===|n")
+        self.caller.msg(f"{'效果':<22}{'次数':>10}{'累计ms':>12}{'平均us':>10}{'占比':>8}")
+        for effect_type, calls, seconds in rows:
+            self.caller.msg(
+                f"{effect_type:<22}{calls:>10}{seconds * 1000:>12.2f}"
+                f"{seconds / calls * 1e6:>10.1f}{seconds / total:>8.1%}"
+            )
+
+
+class CmdCombatSim(Command):
+    """
+    离线战斗模拟（虚拟时钟，不产生真实对象）
+
+    用法:
+      xx sim <NPC_A> <NPC_B> [场次] [种子]
+
+    示例:
+      xx sim 野猪 森林狼 2000 42
+
+    模拟在主线程同步执行，场次上限 2000；更大的样本请在 evennia shell 里
+    直接用 CombatSimulator。
+    """
+
+    key = "xx sim"
+    aliases = ["combatsim"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+
+    max_fights = 2000
+
+    def func(self):
+        from world.managers.combat_simulator import CombatSimulator
+
+        args = self.args.split()
+        if len(args) < 2:
+            self.caller.msg("用法: xx sim <NPC_A> <NPC_B> [场次] [种子]")
+            return
+
+        try:
+            fights = int(args[2]) if len(args) > 2 else 1000
+            seed = int(args[3]) if len(args) > 3 else None
+        except ValueError:
+            self.caller.msg("场次和种子必须是数字。")
+            return
+
+        if not 0 < fights <= self.max_fights:
+            self.caller.msg(f"场次须在 1~{self.max_fights} 之间。")
+            return
+
+        try:
+            report = CombatSimulator(seed=seed).run(args[0], args[1], fights=fights)
+        except KeyError as e:
+            self.caller.msg(f"|r{e}|n")
+            return
+
+        self.caller.msg(report.format())
+
+
+class CmdBalanceMatrix(Command):
+    """
+    批量计算技能平衡矩阵并导出 CSV（需要 numpy）
+
+    用法:
+      xx balance [输出路径] [种子]
+
+    示例:
+      xx balance server/logs/balance.csv 1
+    """
+
+    key = "xx balance"
+    aliases = ["balancematrix"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+
+    def func(self):
+        args = self.args.split()
+        path = args[0] if args else "server/logs/balance.csv"
+
+        try:
+            seed = int(args[1]) if len(args) > 1 else None
+        except ValueError:
+            self.caller.msg("种子必须是数字。")
+            return
+
+        try:
+            from world.managers.balance_engine import BalanceEngine
+            result = BalanceEngine(seed=seed).run()
+        except RuntimeError as e:
+            self.caller.msg(f"|r{e}|n")
+            return
+
+        rows = result.to_csv(path)
+        skills, levels, profiles, monsters = result.shape
+        self.caller.msg(
+            f"|g平衡矩阵完成|n: {skills} 技能 × {levels} 等级 × {profiles} 档位 × {monsters} 怪物, "
+            f"计算 {result.elapsed:.3f}s, 导出 {rows} 行 -> {path}"
+        )
+
+
+class CmdCombatReplay(Command):
+    """
+    战斗回放：按战斗编号（开战时显示的 #xxxx）在模拟器里重放并逐回合比对
+
+    用法:
+      xx replay              - 列出日志中最近的战斗
+      xx replay <编号>       - 重放指定战斗
+    """
+
+    key = "xx replay"
+    aliases = ["combatreplay"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+
+    def func(self):
+        from world.managers.combat_replay import COMBAT_REPLAY_LOG, load_fights, replay_fight
+
+        if not COMBAT_REPLAY_LOG:
+            self.caller.msg("回放日志未开启（combat.replay.enabled）。")
+            return
+
+        fights = load_fights()
+        arg = self.args.strip().lstrip('#')
+
+        if not arg:
+            stats = COMBAT_REPLAY_LOG.stats
+            self.caller.msg(f"|w=== 战斗回放日志 ===|n  {COMBAT_REPLAY_LOG.path}")
+            self.caller.msg(f"记录: {stats['records']}  落盘: {stats['bytes']} 字节 / {stats['flushes']} 次")
+            for fight in sorted(fights.values(), key=lambda f: f['time'])[-10:]:
+                names = " / ".join(a['name'] for a in fight['actors'])
+                self.caller.msg(f"  #{fight['seed']:x}  {names}  出手 {len(fight['turns'])} 次")
+            return
+
+        try:
+            seed = int(arg, 16)
+        except ValueError:
+            self.caller.msg("战斗编号是十六进制，例如: xx replay 1a2b3c")
+            return
+
+        fight = fights.get(seed)
+        if not fight:
+            self.caller.msg(f"日志中没有战斗 #{arg}")
+            return
+
+        result = replay_fight(fight)
+        if result['divergence'] is None:
+            self.caller.msg(f"|g重放一致：{result['matched']}/{result['total']} 次出手完全复现。|n")
+        else:
+            logged, actual = result['divergence']
+            self.caller.msg(f"|r第 {result['matched'] + 1} 次出手不一致|n")
+            self.caller.msg(f"  日志: {logged}")
+            self.caller.msg(f"  重放: {actual}")
@@ -113,7 +113,7 @@ class CmdDebugReload(Command):
     
     def func(self):
         if not self.args:
-            self.caller.msg("用法: xx reload <data|config>")
+            self.caller.msg("用法: xx reload <data|changed|config>")
             return
         
         reload_type = self.args.strip().lower()
@@ -126,6 +126,18 @@ class CmdDebugReload(Command):
             except Exception as e:
                 self.caller.msg(f"|r加载失败:|n {e}")
             
+        elif reload_type == "changed":
+            from world.loaders.data_loader import reload_changed_data
+            try:
+                changed = reload_changed_data()
+            except Exception as e:
+                self.caller.msg(f"|r加载失败:|n {e}")
+                return
+            if changed:
+                self.caller.msg(f"|g已热重载:|n {', '.join(changed)}")
+            else:
+                self.caller.msg("没有可换入的改动（详见服务器日志）。")
+            
         elif reload_type == "config":
             from world.loaders.config_loader import load_all_configs
             try:
@@ -134,7 +146,7 @@ class CmdDebugReload(Command):
             except Exception as e:
                 self.caller.msg(f"|r加载失败:|n {e}")
         else:
-            self.caller.msg("未知类型。使用: data 或 config")
+            self.caller.msg("未知类型。使用: data、changed 或 config")
 
 class CmdDebugData(Command):
     """查看已加载的游戏数据 (翻页版)"""
@@ -428,4 +440,55 @@ class CmdCheckRoom(Command):
         self.caller.msg(f"ID: #{room.id}")
         self.caller.msg(f"Aliases: {room.aliases.all()}")
         self.caller.msg(f"Tags: {room.tags.all()}")
-        
\ No newline at end of file
+        
+class CmdSaveStats(Command):
+    """
+    查看角色存档的写回与自动存档分批统计
+    
+    用法:
+      xx saves         - 写回次数/行数/字节数，自动存档的批次耗时与退避
+      xx saves/reset   - 清空统计数据
+    """
+    
+    key = "xx saves"
+    aliases = ["savestats"]
+    locks = "cmd:perm(Builder)"
+    help_category = "开发"
+    
+    def func(self):
+        from world.systems.attr_store import SAVE_STATS
+        from world.systems.save_system import AUTO_SAVER
+        
+        if 'reset' in self.switches:
+            for key in SAVE_STATS:
+                SAVE_STATS[key] = 0
+            AUTO_SAVER.reset_stats()
+            self.caller.msg("|g存档统计已清空。|n")
+            return
+        
+        flushes = SAVE_STATS['flushes']
+        written = flushes - SAVE_STATS['idle']
+        self.caller.msg("|w=== 角色存档写回 ===|n")
+        self.caller.msg(f"保存: {flushes} 次  无变化: {SAVE_STATS['idle']} 次  写库: {written} 次")
+        self.caller.msg(
+            f"写入: {SAVE_STATS['rows']} 行 / {SAVE_STATS['bytes']} 字节"
+            f"（平均每次写库 {SAVE_STATS['rows'] / max(written, 1):.1f} 行）"
+        )
+        
+        stats = AUTO_SAVER.get_stats()
+        self.caller.msg("|w=== 自动存档分批 ===|n")
+        self.caller.msg(
+            f"轮数: {stats['rounds']}  批数: {stats['batches']}  等待中: |y{stats['pending']}|n"
+            f"  上一轮用时: {stats['round_last_ms'] / 1000:.1f}s"
+        )
+        self.caller.msg(
+            f"已保存: {stats['saved']}  失败: {stats['failed']}  已下线跳过: {stats['skipped']}"
+            f"  写入: {stats['rows']} 行"
+        )
+        self.caller.msg(
+            f"单批耗时: 最近 {stats['batch_last_ms']}ms / 平均 {stats['batch_avg_ms']}ms"
+            f" / 最大 {stats['batch_max_ms']}ms  定时器迟到最大 {stats['lag_max_ms']}ms"
+        )
+        self.caller.msg(
+            f"批次间隔: {stats['delay']}s  退避: x{stats['backoff']}（累计 {stats['backoffs']} 次）"
+        )
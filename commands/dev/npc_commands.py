@@ -167,6 +167,8 @@ class CmdNPCBatch(Command):
             if skill_dict and not npc.db.skill_slots['attack1']:
                 first_skill = list(skill_dict.keys())[0]
                 npc.db.skill_slots['attack1'] = first_skill
+            if hasattr(npc, 'invalidate_skill_table'):
+                npc.invalidate_skill_table()
 
         # 5. 掉落表
         if 'drops' in config:
@@ -78,7 +78,7 @@ class CmdSaveConfig(Command):
     help_category = "开发"
     
     def func(self):
-        from world.loaders.game_data import get_config, CONFIG
+        from world.loaders.game_data import set_config
         
         if not self.args:
             # 显示当前配置
@@ -100,7 +100,7 @@ class CmdSaveConfig(Command):
                     return
                 
                 # 修改配置
-                CONFIG['game']['save_system']['auto_save_interval'] = interval
+                set_config('game.save_system.auto_save_interval', interval)
                 
                 # 重启自动存档
                 from world.systems.save_system import stop_auto_save, start_auto_save
@@ -114,7 +114,7 @@ class CmdSaveConfig(Command):
         
         elif args[0] == "enable":
             # 启用自动存档
-            CONFIG['game']['save_system']['auto_save_enabled'] = True
+            set_config('game.save_system.auto_save_enabled', True)
             
             from world.systems.save_system import start_auto_save
             start_auto_save()
@@ -123,7 +123,7 @@ class CmdSaveConfig(Command):
         
         elif args[0] == "disable":
             # 禁用自动存档
-            CONFIG['game']['save_system']['auto_save_enabled'] = False
+            set_config('game.save_system.auto_save_enabled', False)
             
             from world.systems.save_system import stop_auto_save
             stop_auto_save()
@@ -154,7 +154,7 @@ class CmdStressTest(Command):
         
         # 停止管理器中的所有战斗
         for k in list(COMBAT_MANAGER.active_combats.keys()):
-            COMBAT_MANAGER.stop_combat(k)
+            COMBAT_MANAGER._end_combat(k, None)
             
         # 进入清理
         reactor.callLater(0.5, self._phase_cleanup)
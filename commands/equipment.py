@@ -159,7 +159,7 @@ class CmdEquipped(Command):
                 
                 # 显示耐久度
                 dur = item.db.durability
-                max_dur = item.db.template.get('base_stats', {}).get('durability', 100)
+                max_dur = item.template.get('base_stats', {}).get('durability', 100)
                 dur_color = "|r" if dur < 30 else "|y" if dur < 60 else "|g"
                 self.caller.msg(f"  耐久: {dur_color}{dur}/{max_dur}|n")
                 
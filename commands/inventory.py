@@ -112,7 +112,7 @@ class CmdEquip(Command):
             return
         
         # 基础校验
-        if not hasattr(target, 'db') or not target.db.template:
+        if not getattr(target, 'template', None):
              self.caller.msg("这不是一件装备。")
              return
 
@@ -4,6 +4,7 @@
 from evennia import Command
 from world.systems.quest_system import QUEST_SYSTEM
 from world.loaders.game_data import GAME_DATA
+from world.loaders.data_index import daily_quests, find_quest_id
 
 class CmdQuest(Command):
     """
@@ -255,10 +256,7 @@ class CmdQuestList(Command):
         daily_completed = self.caller.db.quests.get('daily_completed', {}).get(today, [])
         
         # 查找所有每日任务
-        all_daily = []
-        for quest_id, quest_data in GAME_DATA['quests'].items():
-            if quest_data.get('daily', False):
-                all_daily.append((quest_id, quest_data))
+        all_daily = [(quest_id, GAME_DATA['quests'][quest_id]) for quest_id in daily_quests()]
         
         if not all_daily:
             self.caller.msg("|y没有可用的每日任务|n")
@@ -346,11 +344,7 @@ class CmdAcceptQuest(Command):
         quest_query = self.args.strip()
         
         # 查找任务ID
-        quest_id = None
-        for qid, qdata in GAME_DATA['quests'].items():
-            if qdata.get('name') == quest_query or qid == quest_query:
-                quest_id = qid
-                break
+        quest_id = find_quest_id(quest_query)
         
         if not quest_id:
             self.caller.msg(f"|r未找到任务: {quest_query}|n")
@@ -132,6 +132,8 @@ class CmdLearnSkill(Command):
         
         # 学习技能
         self.caller.db.learned_skills[skill_key] = 1
+        if hasattr(self.caller, 'invalidate_skill_table'):
+            self.caller.invalidate_skill_table()
         self.caller.msg(f"|g你学会了 {skill_data['name']} Lv1！|n")
 
 class CmdUpgradeSkill(Command):
@@ -174,6 +176,8 @@ class CmdUpgradeSkill(Command):
         
         self.caller.db.learned_skills[skill_key] += 1
         new_level = self.caller.db.learned_skills[skill_key]
+        if hasattr(self.caller, 'invalidate_skill_table'):
+            self.caller.invalidate_skill_table()
         
         self.caller.msg(f"|g{skill_data['name']} 升级到 Lv{new_level}！|n")
 
@@ -248,6 +252,8 @@ class CmdEquipSkill(Command):
         # 装备技能
         old_skill = self.caller.db.skill_slots.get(slot_name)
         self.caller.db.skill_slots[slot_name] = skill_key
+        if hasattr(self.caller, 'invalidate_skill_table'):
+            self.caller.invalidate_skill_table()
         
         if old_skill:
             old_data = get_data('skills', old_skill)
@@ -43,6 +43,10 @@ def at_server_start():
     from world.loaders.data_loader import load_all_data
     load_all_data()
     
+    # 数据文件改动后增量热重载
+    from world.loaders.data_watcher import start_data_watcher
+    start_data_watcher()
+    
     # 重新初始化战斗管理器
     logger.log_info("[启动] 初始化战斗管理器...")
     from world.managers.combat_manager import COMBAT_MANAGER
@@ -50,6 +54,14 @@ def at_server_start():
     # 清理所有战斗状态（服务器重启后）
     COMBAT_MANAGER.active_combats.clear()
     
+    # reload 前保存的战斗快照：恢复战斗（冷启动时没有快照）
+    from world.managers.combat_persistence import CombatPersistence
+    CombatPersistence.restore(COMBAT_MANAGER)
+    
+    # 清理没有存档再引用的 Buff 模板
+    from world.systems.buff_store import BuffStore
+    BuffStore.prune_templates()
+    
     logger.log_info("[启动] 服务器已就绪")
     logger.log_info("=" * 60)
 
@@ -64,13 +76,18 @@ def at_server_stop():
     logger.log_info("服务器正在关闭...")
     logger.log_info("=" * 60)
     
-    # 停止所有战斗
+    # 停止所有战斗（reload 时战斗已存入快照并挂起，这里不会再有战斗）
     from world.managers.combat_manager import COMBAT_MANAGER
     
     for combat_id in list(COMBAT_MANAGER.active_combats.keys()):
         COMBAT_MANAGER._end_combat(combat_id, None)
     
     logger.log_info("[停止] 已清理所有战斗状态")
+    
+    # 战斗回放日志落盘
+    from world.managers.combat_replay import COMBAT_REPLAY_LOG
+    if COMBAT_REPLAY_LOG:
+        COMBAT_REPLAY_LOG.flush()
     logger.log_info("[停止] 服务器已安全关闭")
     logger.log_info("=" * 60)
 
@@ -86,6 +103,12 @@ def at_server_reload_start():
 def at_server_reload_stop():
     """
     服务器reload完成时调用
+    
+    在 at_server_stop 之前执行：先把进行中的战斗存成快照
     """
     from evennia.utils import logger
+    from world.managers.combat_manager import COMBAT_MANAGER
+    from world.managers.combat_persistence import CombatPersistence
+    
+    CombatPersistence.save(COMBAT_MANAGER)
     logger.log_info("[重载] 服务器重载完成")
\ No newline at end of file
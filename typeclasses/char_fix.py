@@ -13,6 +13,7 @@ from typeclasses.equip_handler import EquipHandler
 from typeclasses.asset_handler import AssetHandler
 from typeclasses.inventory_handler import InventoryHandler
 from typeclasses.equipment_handler import EquipmentHandler
+from world.systems.buff_container import BuffContainer
 
 
 class Character(SkillHandlerMixin, DefaultCharacter):
@@ -85,7 +86,7 @@ class Character(SkillHandlerMixin, DefaultCharacter):
         
         self.ndb.in_combat = False
         self.ndb.combat_target = None
-        self.ndb.buffs = []
+        self.ndb.buffs = BuffContainer()
         self.ndb.skill_cooldowns = {}
         
         # 2. 初始化处理器
@@ -14,7 +14,19 @@ from typeclasses.equip_handler import EquipHandler
 from typeclasses.asset_handler import AssetHandler
 from typeclasses.inventory_handler import InventoryHandler
 from typeclasses.equipment_handler import EquipmentHandler
+from world.systems.buff_container import BuffContainer
+from world.systems.stat_engine import StatSheet
+from world.systems.buff_store import BuffStore
+from world.systems.attr_store import AttrStore
 
+# 属性表基础层: (属性, attributes 缺失时的默认值)
+BASE_STAT_DEFAULTS = (
+    (At.STRENGTH, 10), (At.AGILITY, 10), (At.INTELLIGENCE, 10), (At.CONSTITUTION, 10),
+    (At.MAX_HP, 100), (At.MAX_QI, 100), (At.CRITICAL_RATE, 0.05), (At.LUCK, 1),
+)
+
+# sync_stats_to_ndb 一次批量读取的 attributes: 进度 + 基础层 + 当前值（顺序即解包顺序）
+SYNC_ATTR_KEYS = ('realm', 'level', 'exp') + tuple(attr for attr, _ in BASE_STAT_DEFAULTS) + (At.HP, At.QI)
 
 class Character(SkillHandlerMixin, DefaultCharacter):
     
@@ -73,7 +85,7 @@ class Character(SkillHandlerMixin, DefaultCharacter):
         
         self.ndb.in_combat = False
         self.ndb.combat_target = None
-        self.ndb.buffs = []
+        self.ndb.buffs = BuffContainer()
         self.ndb.skill_cooldowns = {}
         
         # 2. 初始化处理器
@@ -131,6 +143,9 @@ class Character(SkillHandlerMixin, DefaultCharacter):
         
         # 确保开发工具被加载（如果是管理员）
         self._load_dev_cmdset()
+        
+        # 还原下线前的 Buff
+        BuffStore.restore(self)
 
         self.msg(f"|g欢迎回来，{self.key}！|n")
         # 安全获取境界显示
@@ -143,6 +158,11 @@ class Character(SkillHandlerMixin, DefaultCharacter):
         from world.loaders.game_data import get_config
         from world.systems.save_system import SaveSystem
         
+        # 掉线时结束战斗（注册表按参战者索引，O(1)）
+        if self.ndb.in_combat:
+            from world.managers.combat_manager import COMBAT_MANAGER
+            COMBAT_MANAGER.stop_combat(self)
+        
         # 调用存档系统
         if get_config('game.save_system.save_on_logout', True):
             SaveSystem.save_character(self)
@@ -153,6 +173,11 @@ class Character(SkillHandlerMixin, DefaultCharacter):
             
         super().at_post_unpuppet(account=account, session=session, **kwargs)
 
+    def at_server_reload(self):
+        """reload 前保存 Buff（ndb 会被清空）"""
+        BuffStore.save(self)
+        super().at_server_reload()
+
     def at_server_shutdown(self):
         """关机保存"""
         # 触发属性回写
@@ -166,154 +191,112 @@ class Character(SkillHandlerMixin, DefaultCharacter):
     def sync_stats_to_ndb(self):
         """
         [核心机制] 硬盘 -> 内存 同步
-        包含封顶逻辑，解决 1000/100 问题
-        """
-        # 1. 获取装备加成
-        equip_bonuses = {}
-        if hasattr(self, 'equipment'):
-            equip_bonuses = self.equipment.get_total_stats()
         
-        # 2. 同步基础四维
-        combat_attrs = [
-            At.STRENGTH, At.AGILITY, At.INTELLIGENCE, At.CONSTITUTION,
-            At.CRITICAL_RATE, At.LUCK
-        ]
+        重建属性表的基础层和装备/词条层，Buff 与被动技能层保留；
+        只有数值变化的属性会被重算。包含封顶逻辑，解决 1000/100 问题
+        """
+        hp, qi = self._load_from_db()
         
-        for attr in combat_attrs:
-            base_val = self.attributes.get(attr) or 0
-            bonus_val = equip_bonuses.get(attr, 0)
-            setattr(self.ndb, attr, base_val + bonus_val)
-        
-        # 3. 计算 HP (封顶逻辑)
-        # MaxHP = 基础 + 根骨加成 + 装备
-        db_max_hp = self.attributes.get(At.MAX_HP) or 100
-        con_val = getattr(self.ndb, At.CONSTITUTION, 0)
-        final_max_hp = db_max_hp + (con_val * 10) + equip_bonuses.get(At.MAX_HP, 0)
-        setattr(self.ndb, At.MAX_HP, final_max_hp)
-        
-        # CurrentHP 不能超过 MaxHP
-        current_hp = self.attributes.get(At.HP) or final_max_hp
-        if current_hp > final_max_hp:
-            current_hp = final_max_hp
-            self.attributes.add(At.HP, current_hp) # 写回修正后的值
-        setattr(self.ndb, At.HP, current_hp)
-
-        # 4. 计算 Qi (封顶逻辑)
-        db_max_qi = self.attributes.get(At.MAX_QI) or 100
-        int_val = getattr(self.ndb, At.INTELLIGENCE, 0)
-        final_max_qi = db_max_qi + (int_val * 5) + equip_bonuses.get(At.MAX_QI, 0)
-        setattr(self.ndb, At.MAX_QI, final_max_qi)
-        
-        current_qi = self.attributes.get(At.QI) or final_max_qi
-        if current_qi > final_max_qi:
-            current_qi = final_max_qi
-            self.attributes.add(At.QI, current_qi)
-        setattr(self.ndb, At.QI, current_qi)
-        
-        # 5. 同步其他
-        self.ndb.level = self.db.level or 1
-        self.ndb.realm = self.db.realm or "练气期"
-        self.ndb.exp = self.db.exp or 0
-        
-        # 触发一次 DB -> NDB 的完全加载
-        self._load_from_db()
+        # 当前值超过上限时写回修正后的值
+        for current, maximum, stored in ((At.HP, At.MAX_HP, hp), (At.QI, At.MAX_QI, qi)):
+            if stored is not None and stored > getattr(self.ndb, maximum):
+                self.attributes.add(current, getattr(self.ndb, maximum))
 
     # ========== 存档/读档核心逻辑 ==========
     # 这部分代码非常重要，绝对不能删
 
     def _load_from_db(self):
-        """🔥 上线加载: db → ndb"""
+        """
+        🔥 上线加载: db → ndb（派生属性由属性表计算后写回 ndb）
+        
+        需要的 attributes 一次批量取出，装备/词条加成只算一次；
+        基础值和装备加成都与上次同步相同时不动属性表，只刷新进度和当前值。
+        
+        Returns:
+            tuple: 数据库里的 (hp, qi)，没有时为 None
+        """
+        values = [
+            attr.value if attr is not None else None
+            for attr in self.attributes.get(key=list(SYNC_ATTR_KEYS), return_obj=True, return_list=True)
+        ]
+        realm, level, exp = values[:3]
+        bases = tuple(
+            value or default for value, (_, default) in zip(values[3:-2], BASE_STAT_DEFAULTS)
+        )
+        hp, qi = values[-2:]
+        
         # 基础进度属性
-        self.ndb.realm = self.db.realm or '练气期'
-        self.ndb.level = self.db.level or 1
-        self.ndb.exp = self.db.exp or 0
-        
-        # 获取基础属性 (base)
-        self.ndb.base_strength = self.attributes.get('strength') or 10
-        self.ndb.base_agility = self.attributes.get('agility') or 10
-        self.ndb.base_intelligence = self.attributes.get('intelligence') or 10
-        self.ndb.base_constitution = self.attributes.get('constitution') or 10
-        
-        # 资源池基础值
-        base_max_hp = self.attributes.get('max_hp') or 100
-        base_max_qi = self.attributes.get('max_qi') or 100
-        current_hp = self.attributes.get('hp') or base_max_hp
-        current_qi = self.attributes.get('qi') or base_max_qi
-        
-        # 计算装备加成
-        equip_bonus = {}
+        self.ndb.realm = realm or '练气期'
+        self.ndb.level = level or 1
+        self.ndb.exp = exp or 0
+        
+        # 装备层 / 词条层
+        bonus = ({}, {})
         if hasattr(self, 'equipment'):
             try:
-                equip_bonus = self.equipment.get_total_stats()
-            except:
-                equip_bonus = {}
-        
-        # 合并: 总属性 = 基础 + 装备
-        self.ndb.strength = self.ndb.base_strength + equip_bonus.get('strength', 0)
-        self.ndb.agility = self.ndb.base_agility + equip_bonus.get('agility', 0)
-        self.ndb.intelligence = self.ndb.base_intelligence + equip_bonus.get('intelligence', 0)
-        self.ndb.constitution = self.ndb.base_constitution + equip_bonus.get('constitution', 0)
-        
-        # MaxHP/MaxQi 加装备
-        final_max_hp = base_max_hp + equip_bonus.get('max_hp', 0)
-        final_max_qi = base_max_qi + equip_bonus.get('max_qi', 0)
+                bonus = self.equipment.get_bonus_stats()
+            except Exception:
+                pass
         
-        self.ndb.max_hp = final_max_hp
-        self.ndb.max_qi = final_max_qi
+        sheet = StatSheet.of(self)
+        if sheet.synced != (bases, bonus):
+            # 基础层: 境界 + 等级成长（AttrManager 写在 attributes 里）
+            for (attr, _), value in zip(BASE_STAT_DEFAULTS, bases):
+                sheet.set_base(attr, value)
+            sheet.set_source('equip', bonus[0], flush=False)
+            sheet.set_source('affix', bonus[1], flush=False)
+            sheet.flush()
+            sheet.synced = (bases, bonus)
+            
+            # 兼容旧字段
+            self.ndb.base_strength = sheet.base('strength')
+            self.ndb.base_agility = sheet.base('agility')
+            self.ndb.base_intelligence = sheet.base('intelligence')
+            self.ndb.base_constitution = sheet.base('constitution')
         
         # 当前值封顶 (显示用)
-        self.ndb.hp = min(current_hp, final_max_hp)
-        self.ndb.qi = min(current_qi, final_max_qi)
-        
-        # 其他属性
-        self.ndb.critical_rate = self.attributes.get('critical_rate') or 0.05
-        self.ndb.luck = self.attributes.get('luck') or 1
+        self.ndb.hp = min(hp or sheet.base('max_hp'), self.ndb.max_hp)
+        self.ndb.qi = min(qi or sheet.base('max_qi'), self.ndb.max_qi)
+        return hp, qi
 
     def _save_to_db(self):
-        """🔥 下线保存: ndb → db"""
+        """
+        🔥 下线保存: ndb → db
+        
+        只写与数据库现有值不同的字段，连同 Buff 在一个事务里提交（见 AttrStore）。
+        
+        Returns:
+            tuple: (写入行数, 字节数)
+        """
         # 基础进度属性
-        self.db.realm = self.ndb.realm
-        self.db.level = self.ndb.level
-        self.db.exp = self.ndb.exp
-        
-        # 🔥 四维属性: 保存 base_*
-        # 注意：我们只保存 base 值，不保存加了装备后的总值，防止属性无限膨胀
-        if hasattr(self.ndb, 'base_strength'):
-            self.attributes.add('strength', self.ndb.base_strength)
-        if hasattr(self.ndb, 'base_agility'):
-            self.attributes.add('agility', self.ndb.base_agility)
-        if hasattr(self.ndb, 'base_intelligence'):
-            self.attributes.add('intelligence', self.ndb.base_intelligence)
-        if hasattr(self.ndb, 'base_constitution'):
-            self.attributes.add('constitution', self.ndb.base_constitution)
-        
-        # 🔥 资源池
-        equip_bonus = {}
-        if hasattr(self, 'equipment'):
-            try:
-                equip_bonus = self.equipment.get_total_stats()
-            except:
-                pass
+        values = {
+            'realm': self.ndb.realm,
+            'level': self.ndb.level,
+            'exp': self.ndb.exp,
+        }
         
-        # 还原基础上限 = 当前总上限 - 装备加成
-        base_max_hp = self.ndb.max_hp - equip_bonus.get('max_hp', 0)
-        base_max_qi = self.ndb.max_qi - equip_bonus.get('max_qi', 0)
-        
-        # 当前值不能超过基础上限
-        current_hp = min(self.ndb.hp, base_max_hp + equip_bonus.get('max_hp', 0))
-        current_qi = min(self.ndb.qi, base_max_qi + equip_bonus.get('max_qi', 0))
-        
-        # 写入数据库
-        self.attributes.add('hp', max(0, current_hp))
-        self.attributes.add('qi', max(0, current_qi))
-        self.attributes.add('max_hp', max(1, base_max_hp))
-        self.attributes.add('max_qi', max(1, base_max_qi))
-        
-        # 其他属性
-        if hasattr(self.ndb, 'critical_rate'):
-            self.attributes.add('critical_rate', self.ndb.critical_rate)
-        if hasattr(self.ndb, 'luck'):
-            self.attributes.add('luck', self.ndb.luck)
+        # 🔥 只保存基础层，装备/词条/Buff/被动加成不落库，防止属性无限膨胀
+        sheet = StatSheet.of(self)
+        for attr in ('strength', 'agility', 'intelligence', 'constitution', 'critical_rate', 'luck'):
+            value = sheet.base(attr, None)
+            if value is not None:
+                values[attr] = value
+        
+        # 🔥 资源池: 当前值不能超过当前总上限，上限只存基础值
+        base_max_hp = sheet.base('max_hp', None)
+        base_max_qi = sheet.base('max_qi', None)
+        if base_max_hp is not None:
+            values['max_hp'] = max(1, base_max_hp)
+        if base_max_qi is not None:
+            values['max_qi'] = max(1, base_max_qi)
+        
+        if getattr(self.ndb, 'hp', None) is not None:
+            values['hp'] = max(0, min(self.ndb.hp, self.ndb.max_hp))
+        if getattr(self.ndb, 'qi', None) is not None:
+            values['qi'] = max(0, min(self.ndb.qi, self.ndb.max_qi))
+        
+        # Buff 也在同一个事务里（有变化才写）
+        return AttrStore.flush(self, values)
 
     # ========== 辅助方法 ==========
 
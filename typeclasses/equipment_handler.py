@@ -52,7 +52,7 @@ class EquipmentHandler:
             return False, "装备不在背包里"
         
         # 获取装备槽位
-        slot = item_obj.db.template.get('slot')
+        slot = item_obj.template.get('slot')
         if not slot:
             return False, "这件装备没有定义槽位"
         
@@ -62,7 +62,7 @@ class EquipmentHandler:
             return False, f"未知的装备槽位: {slot}"
         
         # 检查等级需求
-        required_level = item_obj.db.template.get('required_level', 0)
+        required_level = item_obj.template.get('required_level', 0)
         if hasattr(self.character.db, 'level') and self.character.db.level < required_level:
             return False, f"需要等级 {required_level}"
         
@@ -190,6 +190,43 @@ class EquipmentHandler:
         
         return total
     
+    def get_affix_stats(self):
+        """
+        获取所有装备词条提供的属性加成
+        
+        Returns:
+            dict: {属性名: 值}
+        """
+        total = {}
+        
+        for slot, item in self.get_equipped().items():
+            for affix in item.db.affixes or []:
+                for key, value in affix.get('stats', {}).items():
+                    total[key] = total.get(key, 0) + value
+        
+        return total
+    
+    def get_bonus_stats(self):
+        """
+        装备加成与词条加成（一次遍历所有装备）
+        
+        Returns:
+            tuple: ({属性名: 值}, {属性名: 值}) - (装备加成, 词条加成)
+        """
+        total = {}
+        affix_total = {}
+        
+        for slot, item in self.get_equipped().items():
+            for key, value in item.get_stats().items():
+                if key == 'durability':
+                    continue  # 耐久度不参与加成
+                total[key] = total.get(key, 0) + value
+            for affix in item.db.affixes or []:
+                for key, value in affix.get('stats', {}).items():
+                    affix_total[key] = affix_total.get(key, 0) + value
+        
+        return total, affix_total
+    
     def list_equipped(self):
         """
         列出所有已装备的物品（用于显示）
@@ -209,7 +209,6 @@ class InventoryHandler:
             if template.get('desc'):
                 obj.db.desc = template['desc']
             obj.db.item_key = item_key
-            obj.db.template = template
             obj.db.enhance_level = 0
             obj.db.durability = template.get('base_stats', {}).get('durability', 100)
             obj.db.bound_to = None
@@ -252,7 +251,7 @@ class InventoryHandler:
         target_objs = self.get_unique_items()
         
         for obj in target_objs:
-            template = obj.db.template or {}
+            template = obj.template
             item_cat = template.get('category', 'equipment')
             
             if category and item_cat != category: continue
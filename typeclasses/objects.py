@@ -138,7 +138,6 @@ class UniqueItem(Object):
         super().at_object_creation()
         # 基础属性
         self.db.item_key = ""
-        self.db.template = {}
         self.db.enhance_level = 0
         self.db.durability = 100
         self.db.bound_to = None
@@ -148,6 +147,16 @@ class UniqueItem(Object):
         if not self.db.desc:
             self.db.desc = "一件特殊的物品。"
     
+    @property
+    def template(self):
+        """
+        物品模板（按 item_key 从 GAME_DATA 取，只读）
+        
+        旧对象在 db.template 里存过整份模板，物品ID查不到时退回用它。
+        """
+        from world.loaders.game_data import GAME_DATA
+        return GAME_DATA.get('items', {}).get(self.db.item_key) or self.db.template or {}
+    
     def get_display_name(self, looker, **kwargs):
         """获取显示名称（可重写以添加强化等级等）"""
         name = super().get_display_name(looker, **kwargs)
@@ -4,6 +4,7 @@ typeclasses/skill_mixin.py
 """
 
 from world.loaders.game_data import get_data
+from world.systems.stat_engine import StatSheet
 
 class SkillHandlerMixin:
     """
@@ -66,6 +67,7 @@ class SkillHandlerMixin:
         
         # 学会技能
         self.db.learned_skills[skill_key] = initial_level
+        self.invalidate_skill_table()
         self.msg(f"|g你学会了 {skill_data['name']} Lv{initial_level}！|n")
         
         # TODO: 消耗学习材料/金币
@@ -105,6 +107,7 @@ class SkillHandlerMixin:
         
         self.db.learned_skills[skill_key] += 1
         new_level = self.db.learned_skills[skill_key]
+        self.invalidate_skill_table()
         
         self.msg(f"|g{skill_data['name']} 升级到 Lv{new_level}！|n")
         
@@ -173,6 +176,7 @@ class SkillHandlerMixin:
         
         # 装备新技能
         self.db.skill_slots[slot_name] = skill_key
+        self.invalidate_skill_table()
         self.msg(f"|g装备了 {skill_data['name']} 到 {slot_name}！|n")
         
         # 应用被动技能效果
@@ -215,6 +219,7 @@ class SkillHandlerMixin:
             self._remove_passive_skill_effect(skill_key)
         
         self.db.skill_slots[slot_name] = None
+        self.invalidate_skill_table()
         
         if skill_data:
             self.msg(f"|g卸下了 {skill_data['name']}|n")
@@ -239,6 +244,8 @@ class SkillHandlerMixin:
         """
         应用被动技能的属性加成
         
+        加成记在属性表的 'passive:<skill_key>' 来源下，重复应用不会叠加
+        
         Args:
             skill_key (str): 技能key
             silent (bool): 是否静默（不显示消息）
@@ -249,20 +256,20 @@ class SkillHandlerMixin:
         
         effects = skill_data.get('effects', [])
         
+        bonuses = {}
         for effect in effects:
             if effect.get('type') == 'stat_bonus':
                 stat_name = effect['stat']
                 value = effect['value']
-                
-                # 增加属性
-                current_value = getattr(self.ndb, stat_name, 0) or 0
-                setattr(self.ndb, stat_name, current_value + value)
+                bonuses[stat_name] = bonuses.get(stat_name, 0) + value
                 
                 if not silent:
                     if value > 0:
                         self.msg(f"|g{stat_name} +{value}|n")
                     else:
                         self.msg(f"|r{stat_name} {value}|n")
+        
+        StatSheet.of(self).set_source(f"passive:{skill_key}", bonuses)
     
     def _remove_passive_skill_effect(self, skill_key):
         """
@@ -282,12 +289,10 @@ class SkillHandlerMixin:
                 stat_name = effect['stat']
                 value = effect['value']
                 
-                # 减少属性
-                current_value = getattr(self.ndb, stat_name, 0) or 0
-                setattr(self.ndb, stat_name, current_value - value)
-                
                 if value > 0:
                     self.msg(f"|y{stat_name} -{value}|n")
+        
+        StatSheet.of(self).remove_source(f"passive:{skill_key}")
     
     def get_equipped_skills(self):
         """
@@ -345,6 +350,10 @@ class SkillHandlerMixin:
         
         return result
     
+    def invalidate_skill_table(self):
+        """技能组合或等级变化后清掉出手权重表缓存（下次出招时重建）"""
+        self.ndb.skill_table = None
+    
     def _sync_to_old_skill_system(self):
         """同步到旧的技能系统（向后兼容）"""
         active_skills = [key for key, level in self.get_active_skills()]
@@ -1,6 +1,9 @@
 # world/loaders/__init__.py
 #"""加载器模块入口"""
-from .game_data import CONFIG, GAME_DATA, get_config, get_data
+from .game_data import (
+    CONFIG, GAME_DATA, get_config, get_data, set_config, refresh_config,
+    config_float, config_int, config_bool, config_str,
+)
 from .config_loader import load_all_configs
 from .data_loader import load_all_data
 from .validator import validate_all_data
@@ -9,6 +12,12 @@ __all__ = [
     'GAME_DATA',
     'get_config',
     'get_data',
+    'set_config',
+    'refresh_config',
+    'config_float',
+    'config_int',
+    'config_bool',
+    'config_str',
     'load_all_configs',
     'load_all_data',
     'validate_all_data'
@@ -1,9 +1,14 @@
 # world/loaders/config_loader.py
-"""游戏配置加载器"""
+"""
+游戏配置加载器
+
+配置文件没有变化时直接从数据缓存读入（见 data_cache.py）。
+"""
 import yaml
 from pathlib import Path
 from evennia.utils import logger
-from .game_data import CONFIG
+from . import data_cache
+from .game_data import CONFIG, refresh_config
 
 def load_all_configs():
     """
@@ -17,32 +22,50 @@ def load_all_configs():
         config_dir.mkdir(parents=True, exist_ok=True)
         return
     
-    loaded_count = 0
+    config_files = list(config_dir.glob('*.yaml'))
+    manifest = data_cache.build_manifest(config_files, data_cache.cached_manifest('configs'))
+    hit, configs = data_cache.lookup('configs', manifest)
     
-    for yaml_file in config_dir.glob('*.yaml'):
-        try:
-            # 文件名作为配置key（去掉_settings后缀）
-            config_key = yaml_file.stem.replace('_settings', '')
-            
-            with open(yaml_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                
-                # 支持两种格式：
-                # 1. combat: {...}  (推荐)
-                # 2. 直接 {...}
-                if config_key in data:
-                    CONFIG[config_key] = data[config_key]
-                else:
-                    CONFIG[config_key] = data
-                
-                loaded_count += 1
-                logger.log_info(f"[配置] 已加载: {yaml_file.name}")
+    if not hit:
+        configs = {}
+        for yaml_file in config_files:
+            try:
+                # 文件名作为配置key（去掉_settings后缀）
+                config_key = yaml_file.stem.replace('_settings', '')
                 
-        except Exception as e:
-            logger.log_err(f"[配置] 加载失败 {yaml_file.name}: {e}")
+                with open(yaml_file, 'r', encoding='utf-8') as f:
+                    data = yaml.safe_load(f)
+                    
+                    # 支持两种格式：
+                    # 1. combat: {...}  (推荐)
+                    # 2. 直接 {...}
+                    if config_key in data:
+                        configs[config_key] = data[config_key]
+                    else:
+                        configs[config_key] = data
+                    
+                    logger.log_info(f"[配置] 已加载: {yaml_file.name}")
+                    
+            except Exception as e:
+                logger.log_err(f"[配置] 加载失败 {yaml_file.name}: {e}")
+        
+        # 有文件加载失败时不缓存，下次启动重试
+        if len(configs) == len(config_files):
+            data_cache.store('configs', manifest, configs)
+    else:
+        logger.log_info("[配置] 源文件未变，使用缓存")
+    
+    CONFIG.update(configs)
+    loaded_count = len(configs)
+    
+    # 整体替换配置快照（get_config 与已绑定的访问器随之生效）
+    refresh_config()
     
     logger.log_info(f"[配置] 总计加载 {loaded_count} 个配置文件")
     
+    # 配置文件不多，不受 game.data_loading.cache 控制（开关本身就在配置里）
+    data_cache.save_cache()
+    
     # 打印配置摘要
     if CONFIG.get('game'):
         logger.log_info(f"[配置] 游戏名称: {CONFIG['game'].get('name', '未设置')}")
\ No newline at end of file
@@ -0,0 +1,156 @@
+# world/loaders/data_cache.py
+"""
+数据缓存 - 解析好的 CONFIG / GAME_DATA 存成二进制文件，启动时一次读入
+
+缓存按类存放（configs、realms、items、skills ...），每类带一份源文件清单:
+    ((路径, mtime_ns, 大小, 内容哈希), ...)
+启动时先 stat 源文件：mtime 和大小都没变就沿用旧哈希，变了才重新算哈希。
+路径列表和哈希都相同的类直接用缓存，否则只重建这一类。
+
+缓存文件格式（pickle）:
+    (CACHE_VERSION, {类名: (清单, 数据的 pickle 字节)})
+每类数据单独 pickle：取出时总是新对象，运行时对 CONFIG / GAME_DATA 的修改
+（如 set_config）不会被写回缓存。
+加载逻辑（继承合并等）改动后需要调高 CACHE_VERSION，让旧缓存整体失效。
+"""
+import os
+import pickle
+from hashlib import blake2b
+from pathlib import Path
+from evennia.utils import logger
+
+CACHE_VERSION = 1
+
+CACHE_PATH = Path('server/data_cache.pickle')
+
+# 本进程读入的缓存: 类名 -> (清单, 数据的 pickle 字节)；None 表示还没读
+_ENTRIES = None
+
+# 有类被重建（或清单的 mtime 更新），需要写回
+_DIRTY = False
+
+
+def _digest(path):
+    with open(path, 'rb') as f:
+        return blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def _entries():
+    """缓存内容（每个进程只读一次文件；损坏或版本不符时当作空缓存）"""
+    global _ENTRIES
+    if _ENTRIES is None:
+        _ENTRIES = {}
+        if CACHE_PATH.exists():
+            try:
+                with open(CACHE_PATH, 'rb') as f:
+                    version, entries = pickle.load(f)
+                if version == CACHE_VERSION:
+                    _ENTRIES = entries
+            except Exception as e:
+                logger.log_warn(f"[缓存] 数据缓存损坏，将重建: {e}")
+    return _ENTRIES
+
+
+def cached_manifest(category):
+    """缓存里记录的源文件清单（没有则为空元组）"""
+    entry = _entries().get(category)
+    return entry[0] if entry else ()
+
+
+def build_manifest(paths, previous=()):
+    """
+    源文件清单（mtime、大小与 previous 里的记录一致时不重新读文件算哈希）
+
+    Args:
+        paths: 源文件路径列表（不存在的文件也记入清单，之后新建时缓存失效）
+        previous: 上一份清单，用来跳过没变的文件
+
+    Returns:
+        tuple: ((路径, mtime_ns, 大小, 哈希), ...)
+    """
+    known = {row[0]: row for row in previous}
+
+    manifest = []
+    for path in sorted(dict.fromkeys(str(path) for path in paths)):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            manifest.append((path, None, None, None))
+            continue
+        old = known.get(path)
+        if old and old[1] == stat.st_mtime_ns and old[2] == stat.st_size:
+            manifest.append(old)
+        else:
+            manifest.append((path, stat.st_mtime_ns, stat.st_size, _digest(path)))
+    return tuple(manifest)
+
+
+def same_content(manifest, other):
+    """两份清单的路径和内容哈希是否一致（只是 mtime 不同也算一致）"""
+    return [(row[0], row[3]) for row in manifest] == [(row[0], row[3]) for row in other]
+
+
+def lookup(category, manifest):
+    """
+    取缓存数据
+
+    只比较路径和内容哈希：文件被 touch 过但内容没变仍算命中（顺便记下新 mtime）。
+
+    Returns:
+        tuple: (是否命中, 数据)
+    """
+    global _DIRTY
+    entry = _entries().get(category)
+    if entry is None:
+        return False, None
+
+    cached, blob = entry
+    if not same_content(cached, manifest):
+        return False, None
+
+    try:
+        data = pickle.loads(blob)
+    except Exception as e:
+        logger.log_warn(f"[缓存] {category} 缓存损坏，将重建: {e}")
+        return False, None
+
+    if cached != manifest:
+        _ENTRIES[category] = (manifest, blob)
+        _DIRTY = True
+    return True, data
+
+
+def store(category, manifest, data):
+    """记录重建好的一类数据（save_cache 时写盘）"""
+    global _DIRTY
+    _entries()[category] = (manifest, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    _DIRTY = True
+
+
+def save_cache():
+    """有变化时写回缓存文件（先写临时文件再替换，写一半不会留下坏缓存）"""
+    global _DIRTY
+    if not _DIRTY:
+        return False
+
+    tmp_path = CACHE_PATH.with_name(CACHE_PATH.name + '.tmp')
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((CACHE_VERSION, _entries()), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CACHE_PATH)
+    except Exception as e:
+        logger.log_err(f"[缓存] 写入数据缓存失败: {e}")
+        return False
+
+    _DIRTY = False
+    return True
+
+
+def clear_cache():
+    """删除缓存文件（下次加载全部重建）"""
+    global _ENTRIES, _DIRTY
+    _ENTRIES = {}
+    _DIRTY = False
+    if CACHE_PATH.exists():
+        CACHE_PATH.unlink()
@@ -0,0 +1,208 @@
+# world/loaders/data_index.py
+"""
+GAME_DATA 二级索引 - 把常用的全表扫描变成字典查找
+
+- 物品: 分类 -> 物品key；名称/别名/key -> 物品key；模糊搜索用的小写文本表
+- 任务: NPC -> 发布/交付的任务；(目标类型, 目标) -> 任务；任务名 -> 任务ID；每日任务
+- 词条: 类型 -> (候选词条, 累积权重)；词条ID -> 词条
+
+数据加载、热重载换入新数据后由 data_loader 调用 rebuild_indexes()，
+只重建受影响的类。每类索引先整体算好再一起替换，查询方不会看到半新半旧的索引。
+查询结果都是元组或共享的原始数据，调用方不要修改。
+"""
+from itertools import accumulate
+from .game_data import GAME_DATA
+
+# 物品
+_ITEMS_BY_CATEGORY = {}     # 分类 -> (item_key, ...)
+_ITEM_KEYS = {}             # 名称/别名/key（及其小写）-> item_key
+_ITEM_SEARCH = ()           # ((item_key, 小写名称, 小写key), ...)
+
+# 任务
+_QUESTS_BY_GIVER = {}       # NPC名 -> (quest_id, ...)
+_QUESTS_BY_FINISHER = {}    # NPC名 -> (quest_id, ...)
+_QUESTS_BY_OBJECTIVE = {}   # (目标类型, 目标) -> (quest_id, ...)
+_QUEST_IDS = {}             # 任务名/任务ID -> quest_id
+_DAILY_QUESTS = ()          # (quest_id, ...)
+
+# 词条
+_AFFIX_CANDIDATES = {}      # 'prefix'/'suffix' -> ((词条, ...), (累积权重, ...))
+_AFFIXES_BY_ID = {}         # 词条ID -> 词条
+
+
+def _group(pairs):
+    """[(键, 值), ...] -> {键: (值, ...)}（保持数据顺序）"""
+    grouped = {}
+    for key, value in pairs:
+        grouped.setdefault(key, []).append(value)
+    return {key: tuple(values) for key, values in grouped.items()}
+
+
+def _aliases(template):
+    aliases = template.get('aliases') or []
+    if isinstance(aliases, str):
+        aliases = aliases.split(',')
+    return [str(alias).strip() for alias in aliases if str(alias).strip()]
+
+
+def _index_items(items):
+    global _ITEMS_BY_CATEGORY, _ITEM_KEYS, _ITEM_SEARCH
+
+    templates = [(key, template) for key, template in items.items() if isinstance(template, dict)]
+
+    # 优先级: key > 名称 > 别名（后写入的覆盖先写入的）
+    item_keys = {}
+    for pass_no in range(3):
+        for key, template in templates:
+            if pass_no == 0:
+                names = _aliases(template)
+            elif pass_no == 1:
+                names = [template['name']] if template.get('name') else []
+            else:
+                names = [key]
+            for name in names:
+                item_keys[str(name).lower()] = key
+                item_keys[name] = key
+
+    by_category = _group((template.get('category'), key) for key, template in templates)
+    search = tuple(
+        (key, str(template.get('name', '')).lower(), key.lower())
+        for key, template in templates
+    )
+
+    _ITEMS_BY_CATEGORY, _ITEM_KEYS, _ITEM_SEARCH = by_category, item_keys, search
+
+
+def _index_quests(quests):
+    global _QUESTS_BY_GIVER, _QUESTS_BY_FINISHER, _QUESTS_BY_OBJECTIVE, _QUEST_IDS, _DAILY_QUESTS
+
+    entries = [(quest_id, quest) for quest_id, quest in quests.items() if isinstance(quest, dict)]
+
+    givers = _group((quest.get('quest_giver'), quest_id) for quest_id, quest in entries)
+    finishers = _group((quest.get('quest_finisher'), quest_id) for quest_id, quest in entries)
+    objectives = _group(
+        ((objective.get('type'), objective.get('target')), quest_id)
+        for quest_id, quest in entries
+        for objective in quest.get('objectives') or ()
+        if isinstance(objective, dict) and isinstance(objective.get('target'), (str, int))
+    )
+
+    # 任务ID 优先于同名任务
+    quest_ids = {quest['name']: quest_id for quest_id, quest in entries if quest.get('name')}
+    quest_ids.update((quest_id, quest_id) for quest_id, _ in entries)
+
+    daily = tuple(quest_id for quest_id, quest in entries if quest.get('daily', False))
+
+    _QUESTS_BY_GIVER, _QUESTS_BY_FINISHER, _QUESTS_BY_OBJECTIVE = givers, finishers, objectives
+    _QUEST_IDS, _DAILY_QUESTS = quest_ids, daily
+
+
+def _index_affixes(affixes):
+    global _AFFIX_CANDIDATES, _AFFIXES_BY_ID
+
+    entries = [affix for affix in affixes.values() if isinstance(affix, dict)]
+
+    candidates = {}
+    for affix_type, group in _group((affix.get('type'), affix) for affix in entries).items():
+        # 高tier的词条更稀有，权重更低
+        weights = [100 / (affix.get('tier', 1) ** 1.5) for affix in group]
+        candidates[affix_type] = (group, tuple(accumulate(weights)))
+
+    by_id = {}
+    for affix in entries:
+        by_id.setdefault(affix.get('id'), affix)
+
+    _AFFIX_CANDIDATES, _AFFIXES_BY_ID = candidates, by_id
+
+
+# 各类数据对应的索引构建函数
+INDEX_BUILDERS = {
+    'items': _index_items,
+    'quests': _index_quests,
+    'affixes': _index_affixes,
+}
+
+
+def rebuild_indexes(keys=None):
+    """
+    按当前 GAME_DATA 重建索引
+
+    Args:
+        keys: 变化了的数据类，None 表示全部重建
+    """
+    for data_key, build in INDEX_BUILDERS.items():
+        if keys is None or data_key in keys:
+            build(GAME_DATA.get(data_key) or {})
+
+
+# ========================================
+# 物品
+# ========================================
+
+def items_in_category(category):
+    """分类下的物品key"""
+    return _ITEMS_BY_CATEGORY.get(category, ())
+
+
+def find_item_key(identifier):
+    """
+    物品key / 名称 / 别名 -> 物品key（不区分大小写）
+
+    Returns:
+        str | None
+    """
+    return _ITEM_KEYS.get(identifier) or _ITEM_KEYS.get(str(identifier).lower())
+
+
+def search_item_keys(keyword):
+    """名称或key包含关键词（不区分大小写）的物品key"""
+    keyword = keyword.lower()
+    return [key for key, name, key_lower in _ITEM_SEARCH if keyword in name or keyword in key_lower]
+
+
+# ========================================
+# 任务
+# ========================================
+
+def quests_given_by(npc_name):
+    """NPC 发布的任务ID"""
+    return _QUESTS_BY_GIVER.get(npc_name, ())
+
+
+def quests_finished_by(npc_name):
+    """在 NPC 处交付的任务ID"""
+    return _QUESTS_BY_FINISHER.get(npc_name, ())
+
+
+def quests_with_objective(objective_type, target):
+    """含有指定目标（如 ('kill', '野猪')）的任务ID"""
+    return _QUESTS_BY_OBJECTIVE.get((objective_type, target), ())
+
+
+def find_quest_id(query):
+    """任务ID / 任务名 -> 任务ID"""
+    return _QUEST_IDS.get(query)
+
+
+def daily_quests():
+    """所有每日任务的ID"""
+    return _DAILY_QUESTS
+
+
+# ========================================
+# 词条
+# ========================================
+
+def affix_candidates(affix_type):
+    """
+    指定类型的候选词条与累积权重（可直接交给 random.choices 的 cum_weights）
+
+    Returns:
+        tuple: ((词条, ...), (累积权重, ...))，没有候选时为 ((), ())
+    """
+    return _AFFIX_CANDIDATES.get(affix_type, ((), ()))
+
+
+def affix_by_id(affix_id):
+    """词条ID -> 词条模板"""
+    return _AFFIXES_BY_ID.get(affix_id)
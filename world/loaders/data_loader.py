@@ -1,11 +1,135 @@
 # world/loaders/data_loader.py
-"""游戏数据加载器 - 加载YAML配置到内存"""
+"""
+游戏数据加载器 - 加载YAML配置到内存
+
+load_all_data 先收集本次要读的所有 YAML 文件，一次性解析（文件多时用进程池），
+之后各类数据从解析结果里取，每个文件只解析一次。
+有 libyaml 时使用 CSafeLoader，否则退回纯 Python 的 SafeLoader。
+每次加载结束打印最慢文件的解析耗时表。
+解析结果按类写进数据缓存，源文件没变的类下次启动直接从缓存读入。
+"""
+import multiprocessing
+import os
+import pickle
 import yaml
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from time import perf_counter
 from evennia.utils import logger
-from .game_data import GAME_DATA
+from . import data_cache
+from .game_data import GAME_DATA, freeze, get_config
 from copy import deepcopy
 
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # 未编译 libyaml
+    from yaml import SafeLoader as YamlLoader
+
+# 已解析的文件: 路径 -> ((mtime_ns, 大小), 数据的 pickle 字节, 错误信息)
+# 跨次加载保留：文件没变就不再解析，热重载时只解析改动过的文件。
+# 存 pickle 字节，每次读取都是新对象，对 GAME_DATA 的改动不会带进下一次重建。
+_PARSED = {}
+
+# 本次加载各文件的解析耗时: [(路径, 秒), ...]
+PARSE_TIMES = []
+
+def _stat_key(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def parse_yaml(path):
+    """
+    解析单个 YAML 文件（进程池的工作函数，只解析不写日志）
+    
+    Returns:
+        tuple: (路径, 数据的 pickle 字节, 耗时秒, 错误信息)
+    """
+    started = perf_counter()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.load(f, Loader=YamlLoader)
+        blob = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+        return path, blob, perf_counter() - started, None
+    except Exception as e:
+        return path, None, perf_counter() - started, str(e)
+
+def _pool_context():
+    """
+    进程池的启动方式
+
+    服务器进程里有 Twisted / Django 的线程，fork 出来的子进程可能卡在别的线程
+    持有的锁上，所以不用 Linux 默认的 fork：有 forkserver 用 forkserver，否则 spawn
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+def prefetch_yaml(paths):
+    """
+    一次解析一批文件（重复路径、上次解析后没改过的文件都跳过），结果供 _read_yaml 取用
+    
+    文件数达到 game.data_loading.parallel_min_files 时放进进程池并行解析，
+    进程池不可用时退回单进程。
+    """
+    stat_keys = {}
+    for path in dict.fromkeys(str(path) for path in paths):
+        stat_key = _stat_key(path)
+        entry = _PARSED.get(path)
+        if entry is None or stat_key is None or entry[0] != stat_key:
+            stat_keys[path] = stat_key
+    if not stat_keys:
+        return
+    
+    paths = list(stat_keys)
+    workers = get_config('game.data_loading.workers', 0) or min(os.cpu_count() or 1, 8)
+    results = None
+    if workers > 1 and len(paths) >= get_config('game.data_loading.parallel_min_files', 48):
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+                results = list(pool.map(parse_yaml, paths, chunksize=max(1, len(paths) // (workers * 4))))
+        except Exception as e:
+            logger.log_warn(f"[数据] 进程池解析失败，改为单进程: {e}")
+    if results is None:
+        results = [parse_yaml(path) for path in paths]
+    
+    for path, blob, seconds, error in results:
+        _PARSED[path] = (stat_keys[path], blob, error)
+        PARSE_TIMES.append((path, seconds))
+
+def _read_yaml(path):
+    """
+    取文件的解析结果（没有解析过或文件已改动则现解析）
+    
+    Raises:
+        yaml.YAMLError: 解析失败
+    """
+    path = str(path)
+    prefetch_yaml([path])
+    _, blob, error = _PARSED[path]
+    if error is not None:
+        raise yaml.YAMLError(error)
+    return pickle.loads(blob)
+
+def _parse_failed(paths):
+    """这些文件中是否有解析失败的"""
+    return any(str(path) in _PARSED and _PARSED[str(path)][2] is not None for path in paths)
+
+def _log_parse_times(elapsed):
+    """打印本次加载的解析耗时表（最慢的若干个文件）"""
+    if not PARSE_TIMES:
+        return
+    
+    parse_total = sum(seconds for _, seconds in PARSE_TIMES)
+    logger.log_info(
+        f"[数据] 解析 {len(PARSE_TIMES)} 个文件，解析累计 {parse_total * 1000:.1f}ms，"
+        f"加载总耗时 {elapsed * 1000:.1f}ms（{YamlLoader.__name__}）"
+    )
+    rows = get_config('game.data_loading.timing_rows', 10)
+    for path, seconds in sorted(PARSE_TIMES, key=lambda row: row[1], reverse=True)[:rows]:
+        logger.log_info(f"[数据]   {seconds * 1000:8.2f}ms  {path}")
+
 def load_yaml_files_in_dir(dir_path, data_key=None):
     """
     递归加载目录下所有YAML文件，合并为一个字典
@@ -27,35 +151,36 @@ def load_yaml_files_in_dir(dir_path, data_key=None):
     # 递归查找所有.yaml文件（支持子目录）
     yaml_files = list(dir_path.rglob('*.yaml'))
     
+    prefetch_yaml(yaml_files)
+    
     for yaml_file in yaml_files:
         try:
-            with open(yaml_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f)
-                
-                if not data:
-                    continue
-                
-                # 根据data_key提取数据
-                if data_key and data_key in data:
-                    # 格式1: items: {聚气丹: {...}}
-                    to_merge = data[data_key]
-                elif data_key:
-                    # 格式2: 直接定义，兼容处理
-                    to_merge = data
-                else:
-                    # 无data_key，直接合并
-                    to_merge = data
-                
-                # 检查key冲突
-                for key in to_merge:
-                    if key in result:
-                        logger.log_warn(
-                            f"[数据] 发现重复key '{key}' "
-                            f"在 {yaml_file.name}，将覆盖旧值"
-                        )
-                
-                result.update(to_merge)
-                
+            data = _read_yaml(yaml_file)
+            
+            if not data:
+                continue
+            
+            # 根据data_key提取数据
+            if data_key and data_key in data:
+                # 格式1: items: {聚气丹: {...}}
+                to_merge = data[data_key]
+            elif data_key:
+                # 格式2: 直接定义，兼容处理
+                to_merge = data
+            else:
+                # 无data_key，直接合并
+                to_merge = data
+            
+            # 检查key冲突
+            for key in to_merge:
+                if key in result:
+                    logger.log_warn(
+                        f"[数据] 发现重复key '{key}' "
+                        f"在 {yaml_file.name}，将覆盖旧值"
+                    )
+            
+            result.update(to_merge)
+            
         except yaml.YAMLError as e:
             logger.log_err(f"[数据] YAML解析错误 {yaml_file.name}: {e}")
         except Exception as e:
@@ -80,8 +205,7 @@ def load_single_yaml(file_path):
         return {}
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f) or {}
+        return _read_yaml(file_path) or {}
     except Exception as e:
         logger.log_err(f"[数据] 加载失败 {file_path.name}: {e}")
         return {}
@@ -102,10 +226,9 @@ def load_skills_with_inheritance(base_path='data/skills'):
     if base_dir.exists():
         for yaml_file in base_dir.rglob('*.yaml'):
             try:
-                with open(yaml_file, 'r', encoding='utf-8') as f:
-                    data = yaml.safe_load(f) or {}
-                    base_configs.update(data)
-                    logger.log_info(f"[技能] 加载基础配置: {yaml_file.name}")
+                data = _read_yaml(yaml_file) or {}
+                base_configs.update(data)
+                logger.log_info(f"[技能] 加载基础配置: {yaml_file.name}")
             except Exception as e:
                 logger.log_err(f"[技能] 加载失败 {yaml_file.name}: {e}")
     
@@ -115,30 +238,29 @@ def load_skills_with_inheritance(base_path='data/skills'):
             continue  # 跳过base目录
         
         try:
-            with open(yaml_file, 'r', encoding='utf-8') as f:
-                data = yaml.safe_load(f) or {}
-                
-                # 兼容旧格式：skills: {...}
-                if 'skills' in data:
-                    data = data['skills']
-                
-                for skill_key, skill_config in data.items():
-                    # 处理继承
-                    if 'inherit' in skill_config:
-                        inherit_key = skill_config['inherit']
-                        if inherit_key in base_configs:
-                            # 深拷贝基础配置
-                            final_config = deepcopy(base_configs[inherit_key])
-                            # 合并当前配置（覆盖基础配置）
-                            _deep_merge(final_config, skill_config)
-                            all_skills[skill_key] = final_config
-                        else:
-                            logger.log_warn(f"[技能] {skill_key} 继承的基础配置 {inherit_key} 不存在")
-                            all_skills[skill_key] = skill_config
+            data = _read_yaml(yaml_file) or {}
+            
+            # 兼容旧格式：skills: {...}
+            if 'skills' in data:
+                data = data['skills']
+            
+            for skill_key, skill_config in data.items():
+                # 处理继承
+                if 'inherit' in skill_config:
+                    inherit_key = skill_config['inherit']
+                    if inherit_key in base_configs:
+                        # 深拷贝基础配置
+                        final_config = deepcopy(base_configs[inherit_key])
+                        # 合并当前配置（覆盖基础配置）
+                        _deep_merge(final_config, skill_config)
+                        all_skills[skill_key] = final_config
                     else:
+                        logger.log_warn(f"[技能] {skill_key} 继承的基础配置 {inherit_key} 不存在")
                         all_skills[skill_key] = skill_config
-                
-                logger.log_info(f"[技能] 加载: {yaml_file.name}")
+                else:
+                    all_skills[skill_key] = skill_config
+            
+            logger.log_info(f"[技能] 加载: {yaml_file.name}")
         except Exception as e:
             logger.log_err(f"[技能] 加载失败 {yaml_file.name}: {e}")
     
@@ -155,80 +277,227 @@ def _deep_merge(base, override):
         else:
             base[key] = value
 
+def _yaml_tree(dir_path):
+    return list(dir_path.rglob('*.yaml')) if dir_path.exists() else []
+
+def _load_realms(base_path):
+    realms_data = load_single_yaml(base_path / 'realms.yaml')
+    return realms_data.get('realms', realms_data)
+
+# 各类数据: (GAME_DATA 键, 日志名, 源文件, 构建函数)
+# 缓存按类失效：某类的源文件有变化时只重建这一类
+DATA_CATEGORIES = (
+    ('realms', '境界',
+     lambda base: [base / 'realms.yaml'],
+     _load_realms),
+    # 装备槽位优先加载，可能别的系统要用
+    ('equip_slots', '装备槽位',
+     lambda base: [base / 'equip_slots.yaml'],
+     lambda base: load_single_yaml(base / 'equip_slots.yaml').get('slots', {})),
+    # 所有物品（包含普通物品、装备、材料等），扫描整个 items 目录
+    ('items', '物品总数',
+     lambda base: _yaml_tree(base / 'items'),
+     lambda base: load_yaml_files_in_dir(base / 'items', 'items')),
+    ('affixes', '词条',
+     lambda base: [base / 'items' / 'affixes.yaml'],
+     lambda base: load_single_yaml(base / 'items' / 'affixes.yaml').get('affixes', {})),
+    ('recipes', '配方',
+     lambda base: [base / 'items' / 'recipes.yaml'],
+     lambda base: load_single_yaml(base / 'items' / 'recipes.yaml').get('recipes', {})),
+    # 技能（支持继承，缓存的是合并后的结果）
+    ('skills', '技能',
+     lambda base: _yaml_tree(base / 'skills'),
+     lambda base: load_skills_with_inheritance(base / 'skills')),
+    ('npcs', 'NPC',
+     lambda base: _yaml_tree(base / 'npcs'),
+     lambda base: load_yaml_files_in_dir(base / 'npcs', 'npcs')),
+    ('rooms', '房间',
+     lambda base: _yaml_tree(base / 'rooms'),
+     lambda base: load_yaml_files_in_dir(base / 'rooms', 'rooms')),
+    ('quests', '任务',
+     lambda base: _yaml_tree(base / 'quests'),
+     lambda base: load_yaml_files_in_dir(base / 'quests', 'quests')),
+)
+
+_CATEGORY_BUILDERS = {key: build for key, _, _, build in DATA_CATEGORIES}
+
+# 当前 GAME_DATA 各类对应的源文件清单（热重载据此判断哪些类变了；只在换入成功后更新）
+_MANIFESTS = {}
+
+# 热重载被拒绝的清单：文件没再改动前不重复重建、重复报错
+_REJECTED = {}
+
+def _data_path():
+    base_path = Path('world/data')  # 🔥 修正路径：通常是 world/data 而不是 data
+    if not base_path.exists():
+         # 如果你的数据确实在项目根目录的 data 文件夹，那就用 Path('data')
+         # 请确认你的目录结构是 mygame/data 还是 mygame/world/data
+         base_path = Path('data') 
+    return base_path
+
+def _rebuild(base_path, stale):
+    """
+    重建源文件有变化的类（先一次性解析这些类里改动过的文件）
+    
+    Args:
+        stale: {类名: (源文件, 清单)}
+    
+    Returns:
+        tuple: ({类名: 数据}, [有文件解析失败的类])
+    """
+    # affixes/recipes 也在 items 目录里，只解析一次
+    prefetch_yaml(path for files, _ in stale.values() for path in files if path.exists())
+    
+    built = {}
+    failed = []
+    for key, (files, manifest) in stale.items():
+        built[key] = _CATEGORY_BUILDERS[key](base_path)
+        if _parse_failed(files):
+            failed.append(key)
+    return built, failed
+
+def _reject(stale):
+    """记下被拒绝的清单（_MANIFESTS 仍描述 GAME_DATA 里的旧数据）"""
+    for key, (_, manifest) in stale.items():
+        _REJECTED[key] = manifest
+
+def _rebuild_derived(keys):
+    """按新数据重建派生结构"""
+    from .data_index import rebuild_indexes
+    rebuild_indexes(keys)
+    
+    if 'skills' in keys:
+        # 技能变了，等级表缓存作废（继承合并在 _rebuild 里已随整个技能类重做）
+        from .skill_loader import clear_skill_cache
+        clear_skill_cache()
+        
+        # 技能效果预编译成管线（Buff 效果同时生成共享模板）
+        from world.systems.skill_effects import compile_skill_pipelines
+        logger.log_info(f"[数据] 效果管线: {compile_skill_pipelines()} 个")
+
 def load_all_data():
     """
     加载所有游戏数据到 GAME_DATA 全局字典
     启动时调用一次
+    
+    源文件没变的类直接取数据缓存（见 data_cache.py），
+    只有变了的类才解析 YAML 重建（game.data_loading.cache 关闭时全部重建）。
     """
 
     logger.log_info("=" * 60)
     logger.log_info("开始加载游戏数据...")
     logger.log_info("=" * 60)
     
-    base_path = Path('world/data')  # 🔥 修正路径：通常是 world/data 而不是 data
-    if not base_path.exists():
-         # 如果你的数据确实在项目根目录的 data 文件夹，那就用 Path('data')
-         # 请确认你的目录结构是 mygame/data 还是 mygame/world/data
-         base_path = Path('data') 
+    base_path = _data_path()
+    started = perf_counter()
+    PARSE_TIMES.clear()
+    use_cache = get_config('game.data_loading.cache', True)
     
-    # 1. 加载境界配置
-    realms_data = load_single_yaml(base_path / 'realms.yaml')
-    GAME_DATA['realms'] = realms_data.get('realms', realms_data)
-    logger.log_info(f"[数据] 境界: {len(GAME_DATA['realms'])} 个")
-    
-    # 2. 加载装备槽位 (优先加载，可能别的系统要用)
-    slots_data = load_single_yaml(base_path / 'equip_slots.yaml')
-    GAME_DATA['equip_slots'] = slots_data.get('slots', {})
-    logger.log_info(f"[数据] 装备槽位: {len(GAME_DATA['equip_slots'])} 个")
-    
-    # 3. 加载所有物品（包含普通物品、装备、材料等）
-    # 🔥 核心修正：只加载一次，包含所有子目录
-    GAME_DATA['items'] = load_yaml_files_in_dir(
-        base_path / 'items',  # 扫描整个 items 目录，不只是 base
-        'items'
-    )
-    logger.log_info(f"[数据] 物品总数: {len(GAME_DATA['items'])} 个")
-    
-    # 4. 加载词条库
-    affixes_data = load_single_yaml(base_path / 'items' / 'affixes.yaml')
-    GAME_DATA['affixes'] = affixes_data.get('affixes', {})
-    logger.log_info(f"[数据] 词条: {len(GAME_DATA['affixes'])} 个")
-    
-    # 5. 加载合成配方
-    recipes_data = load_single_yaml(base_path / 'items' / 'recipes.yaml')
-    GAME_DATA['recipes'] = recipes_data.get('recipes', {})
-    logger.log_info(f"[数据] 配方: {len(GAME_DATA['recipes'])} 个")
-    
-    # 6. 加载技能（支持继承）
-    GAME_DATA['skills'] = load_skills_with_inheritance(base_path / 'skills')
-    logger.log_info(f"[数据] 技能: {len(GAME_DATA['skills'])} 个")
-    
-    # 7. 加载NPC
-    GAME_DATA['npcs'] = load_yaml_files_in_dir(
-        base_path / 'npcs', 
-        'npcs'
-    )
-    logger.log_info(f"[数据] NPC: {len(GAME_DATA['npcs'])} 个")
+    # 1. 逐类核对源文件清单，命中缓存的直接取
+    loaded = {}
+    stale = {}
+    for key, label, sources, build in DATA_CATEGORIES:
+        files = sources(base_path)
+        manifest = data_cache.build_manifest(files, _MANIFESTS.get(key) or data_cache.cached_manifest(key))
+        hit, data = data_cache.lookup(key, manifest) if use_cache else (False, None)
+        if hit:
+            loaded[key] = data
+            _MANIFESTS[key] = manifest
+        else:
+            stale[key] = (files, manifest)
     
-    # 8. 加载房间
-    GAME_DATA['rooms'] = load_yaml_files_in_dir(
-        base_path / 'rooms', 
-        'rooms'
-    )
-    logger.log_info(f"[数据] 房间: {len(GAME_DATA['rooms'])} 个")
-
-    # 9. 加载任务
-    GAME_DATA['quests'] = load_yaml_files_in_dir(
-        base_path / 'quests',
-        'quests'
+    # 2. 重建其余的类；有文件解析失败的类不缓存，下次启动重试并再次报错
+    built, failed = _rebuild(base_path, stale)
+    loaded.update(built)
+    for key, (_, manifest) in stale.items():
+        _MANIFESTS[key] = manifest
+    _REJECTED.clear()
+    if use_cache:
+        for key in built:
+            if key not in failed:
+                data_cache.store(key, stale[key][1], built[key])
+    
+    # 冻结成只读结构后放进 GAME_DATA（见 game_data.FrozenDict）
+    for key, label, _, _ in DATA_CATEGORIES:
+        GAME_DATA[key] = freeze(loaded[key])
+        logger.log_info(f"[数据] {label}: {len(GAME_DATA[key])} 个")
+    
+    _rebuild_derived(_CATEGORY_BUILDERS)
+    
+    if use_cache:
+        data_cache.save_cache()
+    
+    logger.log_info(
+        f"[数据] 缓存命中 {len(DATA_CATEGORIES) - len(stale)}/{len(DATA_CATEGORIES)} 类"
+        + (f"，重建: {', '.join(stale)}" if stale else "")
     )
-    logger.log_info(f"[数据] 任务: {len(GAME_DATA['quests'])} 个")
+    _log_parse_times(perf_counter() - started)
     
     logger.log_info("=" * 60)
     logger.log_info("游戏数据加载完成！")
     logger.log_info("=" * 60)
+
+def reload_changed_data():
+    """
+    热重载：只重建源文件有变化的类，校验通过后一次性换入 GAME_DATA
     
+    - 只重新解析改动过的文件（其余文件用上次的解析结果）
+    - 有文件解析失败，或新数据引入了原来没有的校验问题时，保留旧数据
+    - 换入后重建派生结构（索引、技能等级表、效果管线），并更新数据缓存
     
-    logger.log_info("=" * 60)
-    logger.log_info("游戏数据加载完成！")
-    logger.log_info("=" * 60)
\ No newline at end of file
+    Returns:
+        list: 换入的类名（没有变化或被拒绝时为空）
+    """
+    from .validator import find_data_problems
+    
+    base_path = _data_path()
+    stale = {}
+    for key, _, sources, _ in DATA_CATEGORIES:
+        files = sources(base_path)
+        previous = _MANIFESTS.get(key, ())
+        manifest = data_cache.build_manifest(files, previous)
+        if data_cache.same_content(manifest, previous):
+            # 只是 touch 过：记下新 mtime，下次不再算哈希
+            _MANIFESTS[key] = manifest
+        elif not data_cache.same_content(manifest, _REJECTED.get(key, ())):
+            stale[key] = (files, manifest)
+    
+    if not stale:
+        return []
+    
+    started = perf_counter()
+    PARSE_TIMES.clear()
+    built, failed = _rebuild(base_path, stale)
+    if failed:
+        logger.log_err(f"[热重载] {', '.join(failed)} 有文件解析失败，保留旧数据")
+        _reject(stale)
+        return []
+    
+    built = {key: freeze(data) for key, data in built.items()}
+    candidate = dict(GAME_DATA)
+    candidate.update(built)
+    problems = find_data_problems(candidate, built) - find_data_problems(GAME_DATA, built)
+    if problems:
+        logger.log_err(f"[热重载] 新数据有 {len(problems)} 个问题，保留旧数据:")
+        for problem in sorted(problems):
+            logger.log_err(f"  - {problem}")
+        _reject(stale)
+        return []
+    
+    # 一次性换入，再重建派生结构
+    GAME_DATA.update(built)
+    for key, (_, manifest) in stale.items():
+        _MANIFESTS[key] = manifest
+        _REJECTED.pop(key, None)
+    _rebuild_derived(built)
+    
+    if get_config('game.data_loading.cache', True):
+        for key, data in built.items():
+            data_cache.store(key, stale[key][1], data)
+        data_cache.save_cache()
+    
+    logger.log_info(
+        f"[热重载] 已换入: {', '.join(built)}"
+        f"（解析 {len(PARSE_TIMES)} 个文件，耗时 {(perf_counter() - started) * 1000:.1f}ms）"
+    )
+    return list(built)
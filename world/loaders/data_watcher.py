@@ -0,0 +1,62 @@
+# world/loaders/data_watcher.py
+"""
+数据热重载 - 定时批量 stat 数据文件，有改动时增量重载
+
+每 game.data_loading.watch_interval 秒检查一次 data/ 下的 YAML
+（只 stat，改动过的文件才算哈希），有变化就调用 reload_changed_data：
+只重新解析改动过的文件、重建受影响的类，校验通过后一次性换入 GAME_DATA。
+设为 0 关闭。
+"""
+from evennia.utils import logger
+from .game_data import get_config
+
+WATCH_IDSTRING = "data_hot_reload"
+
+# 启动时使用的检查间隔（停止时按它移除 Ticker，配置之后改了也能移除）
+_INTERVAL = None
+
+
+def data_watch_tick(*args, **kwargs):
+    """热重载检查（Ticker 回调）"""
+    from .data_loader import reload_changed_data
+    try:
+        reload_changed_data()
+    except Exception as e:
+        logger.log_trace(f"[热重载] 检查失败: {e}")
+
+
+def start_data_watcher():
+    """启动数据热重载检查"""
+    global _INTERVAL
+    from evennia import TICKER_HANDLER
+
+    stop_data_watcher()
+    interval = get_config('game.data_loading.watch_interval', 0)
+    if not interval:
+        logger.log_info("[热重载] 数据热重载未开启")
+        return
+
+    TICKER_HANDLER.add(
+        interval=interval,
+        callback=data_watch_tick,
+        idstring=WATCH_IDSTRING,
+        persistent=False
+    )
+    _INTERVAL = interval
+    logger.log_info(f"[热重载] 数据热重载已启动，间隔 {interval} 秒")
+
+
+def stop_data_watcher():
+    """停止数据热重载检查"""
+    global _INTERVAL
+    if _INTERVAL is None:
+        return
+    from evennia import TICKER_HANDLER
+
+    TICKER_HANDLER.remove(
+        interval=_INTERVAL,
+        callback=data_watch_tick,
+        idstring=WATCH_IDSTRING,
+        persistent=False
+    )
+    _INTERVAL = None
@@ -1,5 +1,6 @@
 # world/loaders/game_data.py
 """全局游戏数据存储 - 单例模式"""
+from types import MappingProxyType
 
 # 游戏配置（从data/configs/加载）
 CONFIG = {
@@ -9,6 +10,8 @@ CONFIG = {
 }
 
 # 游戏内容数据（从data/加载）
+# 各类数据加载后冻结成 FrozenDict / FrozenList，全服共享同一份，读取方不需要复制；
+# 需要改动（如任务进度、存进 Attribute）时用 thaw() 复制一份
 GAME_DATA = {
     'realms': {},      # 境界配置
     'skills': {},      # 技能配置
@@ -20,10 +23,221 @@ GAME_DATA = {
     'quests': {}   # 任务配置 
 }
 
+class FrozenDict(dict):
+    """
+    只读字典（GAME_DATA 里的数据）
+    
+    读取和普通 dict 完全一样（isinstance(x, dict) 仍然成立），任何修改都抛 TypeError。
+    copy() 得到可修改的浅拷贝，thaw() / deepcopy 得到可修改的深拷贝；
+    pickle 时还原成普通 dict。
+    """
+    
+    __slots__ = ()
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("游戏数据是只读的，需要修改请先 thaw() 复制")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def copy(self):
+        return dict(self)
+    
+    __copy__ = copy
+    
+    def __deepcopy__(self, memo):
+        return thaw(self)
+    
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """只读列表（GAME_DATA 里的数据），规则同 FrozenDict"""
+    
+    __slots__ = ()
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("游戏数据是只读的，需要修改请先 thaw() 复制")
+    
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    
+    def copy(self):
+        return list(self)
+    
+    __copy__ = copy
+    
+    def __deepcopy__(self, memo):
+        return thaw(self)
+    
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def freeze(value):
+    """
+    递归转换为只读结构：dict → FrozenDict，list → FrozenList
+    
+    已经冻结的部分原样返回，不再复制。
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """
+    递归复制成可修改的普通 dict / list（写时复制：真正需要改动或存进 Attribute 时调用）
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [thaw(item) for item in value]
+    return value
+
+
+# 配置快照：CONFIG 展开成 {'combat.counter.base_rate': 0.02, ...} 的只读平铺表
+# （中间层路径也保留，值为原字典）。加载/修改配置后由 refresh_config() 整体替换。
+_SNAPSHOT = MappingProxyType({})
+
+# 已绑定的配置访问器，刷新快照时一并更新
+_BOUND = []
+
+
+def _flatten(node, prefix, out):
+    for key, value in node.items():
+        path = f"{prefix}{key}"
+        out[path] = value
+        if isinstance(value, dict):
+            _flatten(value, f"{path}.", out)
+
+
+class ConfigValue:
+    """
+    绑定到单个配置项的访问器
+    
+    在模块导入时创建，热路径上直接读 .value（或调用实例），
+    配置重载后由 refresh_config() 统一更新，无需重新导入。
+    
+    Example:
+        >>> CRIT_CHANCE = config_float('combat.critical_chance', 0.05)
+        >>> CRIT_CHANCE.value
+        0.05
+    """
+    
+    __slots__ = ('key', 'default', 'cast', 'value')
+    
+    def __init__(self, key, default, cast=None):
+        self.key = key
+        self.default = default
+        self.cast = cast
+        self.value = self._resolve(_SNAPSHOT)
+    
+    def _resolve(self, snapshot):
+        value = snapshot.get(self.key)
+        if value is None:
+            return self.default
+        if self.cast is None:
+            return value
+        try:
+            return self.cast(value)
+        except (TypeError, ValueError):
+            return self.default
+    
+    def __call__(self):
+        return self.value
+    
+    def __repr__(self):
+        return f"<ConfigValue {self.key}={self.value!r}>"
+
+
+def bind_config(key_path, default=None, cast=None):
+    """创建并登记一个配置访问器"""
+    accessor = ConfigValue(key_path, default, cast)
+    _BOUND.append(accessor)
+    return accessor
+
+
+def config_float(key_path, default=0.0):
+    return bind_config(key_path, default, float)
+
+
+def config_int(key_path, default=0):
+    return bind_config(key_path, default, int)
+
+
+_TRUE_STRINGS = frozenset(('true', 'yes', 'on', '1'))
+_FALSE_STRINGS = frozenset(('false', 'no', 'off', '0', ''))
+
+
+def _to_bool(value):
+    """配置值 -> bool（字符串按 true/false、yes/no、on/off、1/0 识别，无法识别时抛 ValueError 走默认值）"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return bool(value)
+    if isinstance(value, str):
+        text = value.strip().lower()
+        if text in _TRUE_STRINGS:
+            return True
+        if text in _FALSE_STRINGS:
+            return False
+    raise ValueError(f"无法识别的布尔值: {value!r}")
+
+
+def config_bool(key_path, default=False):
+    return bind_config(key_path, default, _to_bool)
+
+
+def config_str(key_path, default=''):
+    return bind_config(key_path, default, str)
+
+
+def refresh_config():
+    """
+    按当前 CONFIG 重建配置快照（加载或修改配置后调用）
+    
+    先算好新快照和所有访问器的新值，再一次性替换，
+    读取方不会看到新旧混合的配置。
+    """
+    global _SNAPSHOT
+    flat = {}
+    _flatten(CONFIG, '', flat)
+    snapshot = MappingProxyType(flat)
+    values = [accessor._resolve(snapshot) for accessor in _BOUND]
+    
+    _SNAPSHOT = snapshot
+    for accessor, value in zip(_BOUND, values):
+        accessor.value = value
+
+
+def set_config(key_path, value):
+    """
+    修改单个配置值（运行时调整用），并刷新快照
+    
+    Args:
+        key_path: 配置路径，如 'game.save_system.auto_save_interval'
+    """
+    keys = key_path.split('.')
+    node = CONFIG
+    for key in keys[:-1]:
+        node = node.setdefault(key, {})
+    node[keys[-1]] = value
+    refresh_config()
+
+
 def get_config(key_path, default=None):
     """
     获取配置值，支持点号路径
     
+    查询的是 refresh_config() 生成的平铺快照，一次字典查找。
+    热路径上请用 config_float() 等在导入时绑定访问器。
+    
     Args:
         key_path: 配置路径，如 'combat.turn_interval'
         default: 默认值
@@ -37,19 +251,8 @@ def get_config(key_path, default=None):
         >>> get_config('combat.critical_chance')
         0.05
     """
-    keys = key_path.split('.')
-    value = CONFIG
-    
-    for key in keys:
-        if isinstance(value, dict):
-            value = value.get(key)
-        else:
-            return default
-        
-        if value is None:
-            return default
-    
-    return value
+    value = _SNAPSHOT.get(key_path)
+    return default if value is None else value
 
 def get_data(data_type, key):
     """
@@ -66,4 +269,7 @@ def get_data(data_type, key):
         >>> get_data('items', '聚气丹')
         {'type': 'elixir', 'tier': 1, ...}
     """
-    return GAME_DATA.get(data_type, {}).get(key)
\ No newline at end of file
+    return GAME_DATA.get(data_type, {}).get(key)
+
+
+refresh_config()
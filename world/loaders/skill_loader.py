@@ -1,7 +1,14 @@
 # world/loaders/skill_loader.py
 """技能加载器 - 支持继承和等级计算"""
-from copy import deepcopy
-from world.loaders.game_data import GAME_DATA, get_data
+from functools import lru_cache
+from types import MappingProxyType
+from world.loaders.game_data import GAME_DATA, FrozenDict, FrozenList, get_data
+
+# 技能等级表缓存容量: (skill_key, level) 组合数上限
+SKILL_TABLE_SIZE = 4096
+
+# 技能数据版本号：每次重载技能数据 +1，依赖技能数据的派生缓存（如出招权重表）据此失效
+SKILL_DATA_VERSION = 0
 
 def calculate_skill_stats(skill_config, level):
     """
@@ -61,39 +68,70 @@ def calculate_skill_stats(skill_config, level):
     
     return result
 
+def _freeze(value):
+    """
+    递归转换为只读结构：dict → MappingProxyType，list → tuple
+    
+    GAME_DATA 里已冻结的部分（FrozenDict / FrozenList）原样共享，不再复制。
+    """
+    if isinstance(value, (FrozenDict, FrozenList)):
+        return value
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def _resolve_placeholder(value, level_stats):
+    """替换 "{level_xxx}" 占位符"""
+    if isinstance(value, str) and value.startswith('{level_'):
+        stat_key = value[7:-1]  # 去掉 {level_ 和 }
+        if stat_key in level_stats:
+            return level_stats[stat_key]
+    return value
+
+@lru_cache(maxsize=SKILL_TABLE_SIZE)
 def get_skill_at_level(skill_key, level):
     """
     获取指定等级的技能配置
     
+    结果按 (skill_key, level) 缓存，等级属性和效果占位符只在首次访问时计算一次。
+    返回的是只读结构（MappingProxyType / tuple，沿用原始配置的部分为 FrozenDict / FrozenList），
+    调用方不能也不需要修改它；
+    确实需要改动时请自行 dict() 复制。数据重载后需调用 clear_skill_cache()。
+    
     Args:
         skill_key (str): 技能key
         level (int): 技能等级
     
     Returns:
-        dict: 完整的技能配置（包含计算后的属性）
+        MappingProxyType: 完整的技能配置（包含计算后的属性），不存在则为None
     """
     base_config = GAME_DATA['skills'].get(skill_key)
     if not base_config:
         return None
     
-    # 深拷贝，避免修改原始配置
-    config = deepcopy(base_config)
+    # 浅拷贝顶层即可：新算出的部分由 _freeze 转成只读，原始配置里的嵌套结构直接共享
+    config = dict(base_config)
     
     # 计算等级属性
     if 'level_formula' in config:
         level_stats = calculate_skill_stats(config, level)
         
         # 合并到配置中
-        for stat_name, value in level_stats.items():
-            config[stat_name] = value
+        config.update(level_stats)
         
         # 处理effects中的占位符
         if 'effects' in config:
-            for effect in config['effects']:
-                for key, val in effect.items():
-                    if isinstance(val, str) and val.startswith('{level_'):
-                        stat_key = val[7:-1]  # 去掉 {level_ 和 }
-                        if stat_key in level_stats:
-                            effect[key] = level_stats[stat_key]
+            config['effects'] = [
+                {key: _resolve_placeholder(val, level_stats) for key, val in effect.items()}
+                for effect in config['effects']
+            ]
     
-    return config
\ No newline at end of file
+    return _freeze(config)
+
+def clear_skill_cache():
+    """清空技能等级表缓存（技能数据重载后调用）"""
+    global SKILL_DATA_VERSION
+    get_skill_at_level.cache_clear()
+    SKILL_DATA_VERSION += 1
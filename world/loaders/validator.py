@@ -2,38 +2,80 @@
 """数据验证器 - 检查YAML数据完整性"""
 from evennia.utils import logger
 
-def validate_skill(skill_key, skill_data):
-    """验证技能数据"""
+def _skill_problem(skill_key, skill_data):
+    """技能数据的问题描述，没有问题返回 None"""
     required_fields = ['name', 'effects']
     
     for field in required_fields:
         if field not in skill_data:
-            logger.log_warn(f"[验证] 技能 '{skill_key}' 缺少字段: {field}")
-            return False
+            return f"技能 '{skill_key}' 缺少字段: {field}"
     
     # 验证效果列表
     if not isinstance(skill_data['effects'], list):
-        logger.log_warn(f"[验证] 技能 '{skill_key}' 的effects必须是列表")
-        return False
+        return f"技能 '{skill_key}' 的effects必须是列表"
     
     for effect in skill_data['effects']:
         if 'type' not in effect:
-            logger.log_warn(f"[验证] 技能 '{skill_key}' 的效果缺少type字段")
-            return False
+            return f"技能 '{skill_key}' 的效果缺少type字段"
     
-    return True
+    return None
 
-def validate_item(item_key, item_data):
-    """验证物品数据"""
+def _item_problem(item_key, item_data):
+    """物品数据的问题描述，没有问题返回 None"""
     required_fields = ['name', 'type']
     
     for field in required_fields:
         if field not in item_data:
-            logger.log_warn(f"[验证] 物品 '{item_key}' 缺少字段: {field}")
-            return False
+            return f"物品 '{item_key}' 缺少字段: {field}"
     
+    return None
+
+def validate_skill(skill_key, skill_data):
+    """验证技能数据"""
+    problem = _skill_problem(skill_key, skill_data)
+    if problem:
+        logger.log_warn(f"[验证] {problem}")
+        return False
     return True
 
+def validate_item(item_key, item_data):
+    """验证物品数据"""
+    problem = _item_problem(item_key, item_data)
+    if problem:
+        logger.log_warn(f"[验证] {problem}")
+        return False
+    return True
+
+# 各类数据的检查函数
+_CHECKS = {
+    'skills': _skill_problem,
+    'items': _item_problem,
+}
+
+def find_data_problems(game_data, keys=None):
+    """
+    收集数据问题（不写日志，热重载用来对比新旧数据）
+    
+    Args:
+        game_data: GAME_DATA 或同结构的字典
+        keys: 只检查这些类，None 表示全部
+    
+    Returns:
+        set: 问题描述
+    """
+    problems = set()
+    for data_key, check in _CHECKS.items():
+        if keys is not None and data_key not in keys:
+            continue
+        for key, data in game_data.get(data_key, {}).items():
+            if not isinstance(data, dict):
+                problems.add(f"{data_key} '{key}' 不是字典")
+                continue
+            problem = check(key, data)
+            if problem:
+                problems.add(problem)
+    return problems
+
 def validate_all_data(game_data):
     """
     验证所有游戏数据
@@ -0,0 +1,386 @@
+"""
+world/managers/balance_engine.py
+数值平衡分析 - NumPy 批量蒙特卡洛
+
+一次性计算 技能 × 技能等级 × 角色档位(境界+等级) × 怪物 的
+单次期望伤害、方差、DPS 和击杀耗时(TTK)，供策划调数值。
+
+规则与线上代码保持一致:
+- 伤害: base_effects.damage_effect (value + 属性缩放, ±浮动, 暴击倍率, 取整)
+- 命中: CombatSystem._check_hit (accuracy + accuracy_scale - 怪物 dodge_rate, 下限5%)
+- 暴击: CombatSystem._check_crit (基础暴击 + crit_bonus)
+- 反击: CombatSystem._check_counter_before_hit (含怪物 counter_rate, 被反击的回合不造成伤害)
+- 属性: realms.yaml 的 base_stats + (等级-1) × level_growth
+
+伤害与暴击用蒙特卡洛抽样（含逐效果取整），命中/反击与怪物相关的概率
+按独立事件解析合成，整张矩阵只做一次向量化计算。
+
+依赖 numpy（可选依赖，未安装时构造引擎会报错）；热力图另需 matplotlib。
+
+用法（evennia shell）:
+    >>> from world.managers.balance_engine import BalanceEngine
+    >>> result = BalanceEngine(seed=1).run()
+    >>> result.to_csv('balance.csv')
+    >>> result.heatmap('ttk.png', metric='ttk', level=10)
+"""
+import csv
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+from world.loaders.game_data import GAME_DATA, get_config
+from world.loaders.skill_loader import get_skill_at_level
+from world.managers.combat_simulator import CombatSimulator, SimCombatant
+
+
+# 可参与属性缩放的属性（角色档位矩阵的列）
+SCALE_ATTRS = ('strength', 'agility', 'intelligence', 'constitution')
+
+# 结果中可导出的指标
+METRICS = ('mean', 'std', 'dps', 'casts', 'casts_std', 'ttk', 'ttk_std', 'hit', 'counter')
+
+
+class BalanceEngine:
+    """
+    平衡矩阵计算
+
+    Args:
+        skills (list): 技能key列表，默认所有带 damage 效果的主动技能
+        skill_levels (tuple): 技能等级轴（超过技能 max_level 的格子为 NaN）
+        profiles (list): 角色档位 [(realm, level), ...]，默认每个境界的 1 级和满级
+        monsters (list): 怪物 NPC key 列表，默认所有配置了血量的 NPC
+        samples (int): 每个格子的蒙特卡洛样本数
+        seed (int): 随机种子
+    """
+
+    def __init__(self, skills=None, skill_levels=(1, 10, 50, 100, 200),
+                 profiles=None, monsters=None, samples=512, seed=None):
+        if np is None:
+            raise RuntimeError("平衡分析需要 numpy: pip install numpy")
+
+        CombatSimulator.ensure_data_loaded()
+
+        self.skill_levels = tuple(skill_levels)
+        self.skills = list(skills) if skills else self._default_skills()
+        self.profiles = list(profiles) if profiles else self._default_profiles()
+        self.monsters = list(monsters) if monsters else self._default_monsters()
+        self.samples = samples
+        self.rng = np.random.default_rng(seed)
+
+    # ========================================
+    # 默认轴
+    # ========================================
+
+    @staticmethod
+    def _damage_effects(skill_cfg):
+        return [e for e in skill_cfg.get('effects', ()) if e.get('type') == 'damage']
+
+    def _default_skills(self):
+        keys = []
+        for key in sorted(GAME_DATA['skills']):
+            cfg = get_skill_at_level(key, 1)
+            if cfg and cfg.get('type', 'active') == 'active' and self._damage_effects(cfg):
+                keys.append(key)
+        return keys
+
+    @staticmethod
+    def _default_profiles():
+        profiles = []
+        for realm, realm_data in GAME_DATA['realms'].items():
+            profiles.append((realm, 1))
+            max_level = realm_data.get('max_level', 1)
+            if max_level > 1:
+                profiles.append((realm, max_level))
+        return profiles
+
+    @staticmethod
+    def _default_monsters():
+        monsters = []
+        for key in sorted(GAME_DATA['npcs']):
+            args = SimCombatant._npc_args(key)
+            stats = args[1]
+            if stats.get('hp') or stats.get('max_hp'):
+                monsters.append(key)
+        return monsters
+
+    # ========================================
+    # 参数矩阵
+    # ========================================
+
+    def _skill_arrays(self):
+        """
+        技能参数 → (S, L) / (S, L, E) 数组
+        """
+        S, L = len(self.skills), len(self.skill_levels)
+        cfgs = [[get_skill_at_level(k, lv) for lv in self.skill_levels] for k in self.skills]
+        E = max([len(self._damage_effects(c)) for row in cfgs for c in row if c] + [1])
+
+        default_variance = get_config('combat.damage_variance', 0.1)
+        turn_interval = get_config('combat.turn_interval', 2.0)
+
+        arr = {
+            'value': np.zeros((S, L, E)),
+            'variance': np.zeros((S, L, E)),
+            'scale_idx': np.zeros((S, L, E), dtype=np.intp),
+            'scale_ratio': np.zeros((S, L, E)),
+            'accuracy': np.zeros((S, L)),
+            'accuracy_scale': np.zeros((S, L, len(SCALE_ATTRS))),
+            'crit_bonus': np.zeros((S, L)),
+            'counter_chance': np.zeros((S, L)),
+            'period': np.ones((S, L)),
+            'turn_time': np.zeros((S, L)),
+            'valid': np.zeros((S, L), dtype=bool),
+        }
+
+        for s, row in enumerate(cfgs):
+            for l, cfg in enumerate(row):
+                if not cfg:
+                    continue
+                max_level = cfg.get('level_formula', {}).get('max_level')
+                if max_level and self.skill_levels[l] > max_level:
+                    continue
+                arr['valid'][s, l] = True
+
+                for e, effect in enumerate(self._damage_effects(cfg)):
+                    arr['value'][s, l, e] = float(effect.get('value', 0) or 0)
+                    arr['variance'][s, l, e] = effect.get('damage_variance', default_variance)
+                    scale_attr = effect.get('scale_with')
+                    if scale_attr in SCALE_ATTRS:
+                        arr['scale_idx'][s, l, e] = SCALE_ATTRS.index(scale_attr)
+                        arr['scale_ratio'][s, l, e] = effect.get('scale_ratio', 1.0)
+
+                arr['accuracy'][s, l] = cfg.get('accuracy', 0.9)
+                for attr, ratio in (cfg.get('accuracy_scale') or {}).items():
+                    if attr in SCALE_ATTRS:
+                        arr['accuracy_scale'][s, l, SCALE_ATTRS.index(attr)] = ratio
+                arr['crit_bonus'][s, l] = cfg.get('crit_bonus', 0)
+                arr['counter_chance'][s, l] = cfg.get('counter_chance', 0)
+                arr['period'][s, l] = max(1, cfg.get('cooldown', 0))
+                arr['turn_time'][s, l] = _turn_time(cfg) + turn_interval
+
+        return arr
+
+    def _profile_arrays(self):
+        """角色档位 → (R, A) 属性矩阵与 (R,) 等级"""
+        attrs = np.zeros((len(self.profiles), len(SCALE_ATTRS)))
+        levels = np.zeros(len(self.profiles))
+        for r, (realm, level) in enumerate(self.profiles):
+            stats = SimCombatant._realm_args(realm, level)[1]
+            attrs[r] = [stats.get(a, 10) for a in SCALE_ATTRS]
+            levels[r] = level
+        return attrs, levels
+
+    def _monster_arrays(self):
+        """怪物 → (M,) 血量/身法/等级/闪避/反击率，以及怪物普攻回合时长"""
+        M = len(self.monsters)
+        hp, agility, level = np.zeros(M), np.zeros(M), np.zeros(M)
+        dodge, counter = np.zeros(M), np.zeros(M)
+        for m, key in enumerate(self.monsters):
+            _, stats, _, lv, _, _ = SimCombatant._npc_args(key)
+            hp[m] = stats.get('max_hp') or stats.get('hp') or 100
+            agility[m] = stats.get('agility', 10) or 10
+            level[m] = lv or 1
+            # 与 CombatSystem 一致: 未配置或为 0 时闪避取 0.1，反击率取 0
+            dodge[m] = stats.get('dodge_rate', 0.1) or 0.1
+            counter[m] = stats.get('counter_rate', 0) or 0
+
+        basic = get_skill_at_level('basic_attack', 1)
+        monster_turn = (_turn_time(basic) if basic else 0.5) + get_config('combat.turn_interval', 2.0)
+        return hp, agility, level, dodge, counter, monster_turn
+
+    # ========================================
+    # 计算
+    # ========================================
+
+    def run(self):
+        """
+        计算整张矩阵
+
+        Returns:
+            BalanceResult: 所有指标的形状均为 (技能, 技能等级, 角色档位, 怪物)
+        """
+        started = time.perf_counter()
+
+        sk = self._skill_arrays()
+        attrs, p_level = self._profile_arrays()
+        hp, m_agility, m_level, m_dodge, m_counter, monster_turn = self._monster_arrays()
+        N = self.samples
+
+        # --- 单次伤害（与怪物无关）: (N, S, L, R) ---
+        # 基础伤害 = value + 属性 × 系数   → (S, L, R, E)
+        scale = attrs[:, sk['scale_idx']].transpose(1, 2, 0, 3) * sk['scale_ratio'][:, :, None, :]
+        base = sk['value'][:, :, None, :] + scale
+
+        # 浮动: uniform(1-v, 1+v)，所有档位共用同一组随机数（公共随机数，便于横向对比）
+        shape = (N,) + sk['value'].shape                                 # (N, S, L, E)
+        roll = 1 - sk['variance'] + self.rng.random(shape) * 2 * sk['variance']
+
+        crit_p = get_config('combat.critical_chance', 0.05) + sk['crit_bonus']          # (S, L)
+        crit = self.rng.random((N,) + crit_p.shape) < crit_p                             # (N, S, L)
+        crit_mult = np.where(crit, get_config('combat.critical_multiplier', 2.0), 1.0)
+
+        raw = base[None] * roll[:, :, :, None, :] * crit_mult[:, :, :, None, None]     # (N, S, L, R, E)
+        damage = np.trunc(raw).sum(axis=-1)                                             # (N, S, L, R)
+
+        d_mean = damage.mean(axis=0)
+        d_sq = (damage ** 2).mean(axis=0)
+
+        # --- 命中: max(0.05, accuracy + 属性加成 - 怪物闪避) → (S, L, R, M) ---
+        accuracy = sk['accuracy'][:, :, None] + np.einsum('sla,ra->slr', sk['accuracy_scale'], attrs)
+        hit = np.clip(accuracy[..., None] - m_dodge[None, None, None, :], 0.05, 1.0)
+
+        # --- 反击: (S, L, R, M) ---
+        counter = (
+            get_config('combat.counter.base_rate', 0.02)
+            + sk['counter_chance'][:, :, None, None]
+            + m_counter[None, None, None, :]
+            + (m_level[None, :] - p_level[:, None])[None, None] * get_config('combat.counter.level_diff_bonus', 0.01)
+            + (m_agility * get_config('combat.counter.agility_bonus', 0.001))[None, None, None, :]
+        )
+        counter = np.clip(counter, 0, get_config('combat.counter.max_rate', 0.50))
+
+        # --- 单次期望与方差: X = D × 命中 × 未被反击 ---
+        p = hit * (1 - counter)
+        mean = p * d_mean[..., None]
+        var = np.maximum(p * d_sq[..., None] - mean ** 2, 0)
+        std = np.sqrt(var)
+
+        # --- DPS / TTK ---
+        # 一个完整轮次 = 自己出手 + 怪物出手；带冷却的技能每 period 个轮次才能用一次
+        cycle = (sk['turn_time'] + monster_turn) * sk['period']                         # (S, L)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dps = mean / cycle[:, :, None, None]
+            # 更新过程近似: 击杀所需次数 ≈ HP/μ，标准差 ≈ sqrt(HP·σ²/μ³)
+            casts = np.where(mean > 0, hp / mean, np.inf)
+            casts_std = np.where(mean > 0, np.sqrt(hp * var / mean ** 3), np.inf)
+        ttk = casts * cycle[:, :, None, None]
+        ttk_std = casts_std * cycle[:, :, None, None]
+
+        invalid = ~sk['valid'][:, :, None, None]
+        metrics = {}
+        for name, values in (('mean', mean), ('std', std), ('dps', dps), ('casts', casts),
+                             ('casts_std', casts_std), ('ttk', ttk), ('ttk_std', ttk_std),
+                             ('hit', hit), ('counter', counter)):
+            values = np.array(np.broadcast_to(values, mean.shape), dtype=float)
+            values[np.broadcast_to(invalid, values.shape)] = np.nan
+            metrics[name] = values
+
+        return BalanceResult(
+            skills=self.skills,
+            skill_levels=self.skill_levels,
+            profiles=self.profiles,
+            monsters=self.monsters,
+            metrics=metrics,
+            elapsed=time.perf_counter() - started,
+        )
+
+
+def _turn_time(skill_cfg):
+    """
+    出手到回合结束的耗时（与 CombatSystem 的调度一致）:
+    max(施法时间, 最晚文本) + 0.5 秒回调
+    """
+    cast_time = skill_cfg.get('cast_time', 0) or 0
+    battle_text = skill_cfg.get('battle_text') or {}
+    last_text = 0
+    for group in ('cast', 'hit'):
+        for text_data in battle_text.get(group) or ():
+            delay = cast_time * (text_data.get('delay_percent', 0) / 100.0)
+            if delay >= cast_time:
+                delay += 0.1
+            last_text = max(last_text, delay)
+    return max(cast_time, last_text) + 0.5
+
+
+class BalanceResult:
+    """
+    平衡矩阵结果
+
+    metrics[name] 的形状为 (技能, 技能等级, 角色档位, 怪物):
+        mean/std   单次出手伤害期望/标准差
+        dps        每秒伤害（计入冷却与双方回合时长）
+        casts      击杀所需出手次数（期望）
+        ttk        击杀耗时（秒）
+        hit        命中率
+        counter    被反击率
+    """
+
+    def __init__(self, skills, skill_levels, profiles, monsters, metrics, elapsed=0.0):
+        self.skills = skills
+        self.skill_levels = skill_levels
+        self.profiles = profiles
+        self.monsters = monsters
+        self.metrics = metrics
+        self.elapsed = elapsed
+
+    @property
+    def shape(self):
+        return self.metrics['mean'].shape
+
+    def rows(self):
+        """逐格输出 dict（跳过无效格子）"""
+        mean = self.metrics['mean']
+        for idx in np.argwhere(~np.isnan(mean)):
+            s, l, r, m = idx
+            row = {
+                'skill': self.skills[s],
+                'skill_level': self.skill_levels[l],
+                'realm': self.profiles[r][0],
+                'level': self.profiles[r][1],
+                'monster': self.monsters[m],
+            }
+            for name in METRICS:
+                row[name] = round(float(self.metrics[name][s, l, r, m]), 4)
+            yield row
+
+    def to_csv(self, path):
+        """导出 CSV，返回写入的行数"""
+        fields = ['skill', 'skill_level', 'realm', 'level', 'monster'] + list(METRICS)
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for row in self.rows():
+                writer.writerow(row)
+                count += 1
+        return count
+
+    def slice(self, metric='ttk', level=None, profile=None):
+        """
+        取 技能 × 怪物 的二维切片
+
+        Args:
+            metric (str): 指标名
+            level (int): 技能等级（默认第一个）
+            profile (tuple|int): (realm, level) 或档位下标（默认第一个）
+        """
+        l = self.skill_levels.index(level) if level is not None else 0
+        if isinstance(profile, tuple):
+            r = self.profiles.index(profile)
+        else:
+            r = profile or 0
+        return self.metrics[metric][:, l, r, :]
+
+    def heatmap(self, path, metric='ttk', level=None, profile=None):
+        """输出 技能 × 怪物 热力图（需要 matplotlib）"""
+        try:
+            import matplotlib
+            matplotlib.use('Agg')
+            import matplotlib.pyplot as plt
+        except ImportError:
+            raise RuntimeError("输出热力图需要 matplotlib: pip install matplotlib")
+
+        data = self.slice(metric, level, profile)
+        fig, ax = plt.subplots(figsize=(max(6, len(self.monsters) * 0.6), max(4, len(self.skills) * 0.35)))
+        image = ax.imshow(np.ma.masked_invalid(data), aspect='auto', cmap='viridis')
+        ax.set_xticks(range(len(self.monsters)), self.monsters, rotation=60, ha='right')
+        ax.set_yticks(range(len(self.skills)), self.skills)
+        ax.set_title(f"{metric} (skill Lv{level or self.skill_levels[0]})")
+        fig.colorbar(image, ax=ax)
+        fig.tight_layout()
+        fig.savefig(path)
+        plt.close(fig)
+        return path
@@ -3,10 +3,25 @@
 修改点:
 1. 战斗结束时保存 HP/Qi 到 db
 2. 支持事件触发存档
+3. 回合Tick走统一的战斗调度器(时间轮)，不再每场战斗各挂 reactor.callLater
+4. 战斗记录存放在带索引的 CombatRegistry 中，按参战者查找为 O(1)
+5. 支持 N vs M 团战：身法决定先手，每回合一次批量结算
+6. 每场战斗独立的随机数种子，出手决策写入二进制回放日志
+7. 战斗文本/状态栏经发件箱按 Tick 合并，每个接收者每 Tick 一次 msg
 """
+import random
 from twisted.internet import reactor
 from evennia.utils import logger
+from world.loaders.game_data import get_config, config_str
+from world.loaders.skill_loader import get_skill_at_level
 from world.systems.combat_system import CombatSystem
+from world.managers.combat_scheduler import COMBAT_SCHEDULER
+from world.managers.combat_registry import CombatRegistry
+from world.managers.combat_replay import COMBAT_REPLAY_LOG, EVENT_JOIN, EVENT_LEAVE
+
+# 团战选目标策略（每个出手者每回合都要读）
+TARGET_STRATEGY = config_str('combat.group.target_strategy', 'lowest_hp')
+
 
 class CombatManager:
     """战斗管理器（单例）"""
@@ -23,34 +38,35 @@ class CombatManager:
         if self._initialized:
             return
         
-        self.combat_system = CombatSystem()
-        self.active_combats = {}
+        self.scheduler = COMBAT_SCHEDULER
+        self.combat_system = CombatSystem(self.scheduler)
+        self.active_combats = CombatRegistry()
+        self.replay_log = COMBAT_REPLAY_LOG
         self._initialized = True
         
         logger.log_info("[战斗管理器] 初始化完成")
     
-    def start_combat(self, attacker, target):
-        """开始战斗"""
+    def start_combat(self, attacker, target, seed=None):
+        """
+        开始战斗
+        
+        Args:
+            seed (int): 随机数种子（回放时传入，默认随机生成）
+        """
         if not self.combat_system.start_combat(attacker, target):
             return False
         
-        combat_id = f"{attacker.id}_{target.id}"
+        record = self.active_combats.add(attacker, target)
+        self.seed_combat(record, seed)
         
-        delayed_call = reactor.callLater(
+        record.delayed_call = self.scheduler.call_later(
             1.0,
             self._combat_tick,
-            combat_id
+            record.id
         )
         
-        self.active_combats[combat_id] = {
-            'attacker': attacker,
-            'target': target,
-            'current_turn': 0,
-            'delayed_call': delayed_call
-        }
-        
-        attacker.msg(f"|r【战斗开始】|n")
-        target.msg(f"|r【战斗开始】|n")
+        attacker.msg(f"|r【战斗开始】|n |x#{record.seed:x}|n")
+        target.msg(f"|r【战斗开始】|n |x#{record.seed:x}|n")
         
         logger.log_info(f"[战斗] {attacker.key} vs {target.key} 开始")
         
@@ -58,13 +74,13 @@ class CombatManager:
     
     def _combat_tick(self, combat_id):
         """战斗Tick"""
-        combat_data = self.active_combats.get(combat_id)
-        if not combat_data:
+        record = self.active_combats.get(combat_id)
+        if not record:
             return
         
-        attacker = combat_data['attacker']
-        target = combat_data['target']
-        current_turn = combat_data['current_turn']
+        attacker = record.attacker
+        target = record.target
+        current_turn = record.current_turn
         
         if not attacker or not target:
             self._end_combat(combat_id, None)
@@ -97,23 +113,13 @@ class CombatManager:
             self._end_combat(combat_id, winner)
             return
         
-        # 减少冷却
-        self.combat_system._reduce_cooldowns(actor)
-        
-        # 选择技能
-        active_skills = actor.get_active_skills()
-        
-        available = []
-        for sk, lv in active_skills:
-            cooldown = actor.ndb.skill_cooldowns.get(sk, 0)
-            if cooldown <= 0:
-                available.append((sk, lv))
+        # 减少冷却并选择技能
+        skill_key, skill_level = self._choose_action(actor, record.rng)
+        round_no = getattr(attacker.ndb, 'combat_round', 0) or 0
         
-        if available:
-            skill_key, skill_level = self.combat_system._choose_skill_weighted(available)
-        else:
-            skill_key = 'basic_attack'
-            skill_level = actor.db.learned_skills.get('basic_attack', 1)
+        def on_done(result):
+            self._log_turn(record, round_no, actor, defender, skill_key, skill_level, result)
+            self._on_turn_complete(combat_id, result)
         
         # 执行攻击
         self.combat_system.use_skill(
@@ -121,17 +127,51 @@ class CombatManager:
             defender,
             skill_key,
             skill_level=skill_level,
-            callback=lambda result: self._on_turn_complete(combat_id, result)
+            callback=on_done
         )
     
+    def seed_combat(self, record, seed=None):
+        """
+        给战斗分配独立的随机数流，并在回放日志中记下开战状态
+        
+        Args:
+            seed (int): 指定种子（回放/复现用），默认随机生成
+        """
+        if seed is None:
+            seed = random.getrandbits(63)
+        record.seed = seed
+        record.rng = random.Random(seed)
+        
+        for char in record.participants:
+            char.ndb.combat_rng = record.rng
+        
+        if self.replay_log:
+            if record.is_group:
+                actors = [(char, index) for index, side in enumerate(record.sides) for char in side]
+                self.replay_log.fight(seed, True, record.round, 0, actors)
+            else:
+                round_no = getattr(record.attacker.ndb, 'combat_round', 0) or 0
+                actors = [(record.attacker, 0), (record.target, 1)]
+                self.replay_log.fight(seed, False, round_no, record.current_turn, actors)
+    
+    def _log_turn(self, record, round_no, actor, target, skill_key, skill_level, result):
+        """出手完成，写一条回放记录"""
+        if self.replay_log and record.seed is not None:
+            self.replay_log.turn(record.seed, round_no, actor, target, skill_key, skill_level, result)
+    
+    def _choose_action(self, actor, rng=None):
+        """推进出手序号（冷却随之就绪），按权重选出本回合要用的技能"""
+        self.combat_system._advance_turn(actor)
+        return self.combat_system.pick_skill(actor, rng)
+    
     def _on_turn_complete(self, combat_id, result):
         """单个回合完成"""
-        combat_data = self.active_combats.get(combat_id)
-        if not combat_data:
+        record = self.active_combats.get(combat_id)
+        if not record:
             return
         
-        attacker = combat_data['attacker']
-        target = combat_data['target']
+        attacker = record.attacker
+        target = record.target
         
         # Buff 处理
         from world.systems.buff_manager import BuffManager
@@ -165,15 +205,14 @@ class CombatManager:
             return
         
         # 切换回合
-        combat_data['current_turn'] = 1 - combat_data['current_turn']
+        record.current_turn = 1 - record.current_turn
         
         # 继续下一个Tick
-        delayed_call = reactor.callLater(
+        record.delayed_call = self.scheduler.call_later(
             self.combat_system.turn_interval,
             self._combat_tick,
             combat_id
         )
-        combat_data['delayed_call'] = delayed_call
     
     def _show_combat_status(self, attacker, target):
         """显示战斗状态"""
@@ -191,45 +230,75 @@ class CombatManager:
         status_msg = f"\n|w你: HP {attacker_hp}/{attacker_max_hp} | QI {attacker_qi}/{attacker_max_qi}|n"
         status_msg += f"\n|y{target_name}: HP {target_hp}/{target_max_hp}|n\n"
         
-        attacker.msg(status_msg)
+        outbox = self.combat_system.outbox
+        outbox.send(attacker, status_msg)
         
         if hasattr(target, 'msg'):
             target_status = f"\n|w你: HP {target_hp}/{target_max_hp}|n"
             target_status += f"\n|y{attacker_name}: HP {attacker_hp}/{attacker_max_hp}|n\n"
-            target.msg(target_status)
+            outbox.send(target, target_status)
     
     def stop_combat(self, character):
-        """手动停止战斗"""
-        for combat_id, combat_data in list(self.active_combats.items()):
-            if character in [combat_data['attacker'], combat_data['target']]:
-                if combat_data['delayed_call'].active():
-                    combat_data['delayed_call'].cancel()
-                
-                self._end_combat(combat_id, None)
-                character.msg("战斗已停止")
-                return True
+        """手动停止战斗（逃跑、掉线等）"""
+        record = self.active_combats.find(character)
+        if not record:
+            return False
         
-        return False
+        if record.is_group:
+            # 团战中只是本人离场，其余人继续打
+            if self.replay_log and record.seed is not None:
+                self.replay_log.event(record.seed, record.round, character, EVENT_LEAVE, record.side_of(character))
+            self._leave_group(record, character)
+            character.msg("战斗已停止")
+            self._check_group_outcome(record)
+            return True
+        
+        self._end_combat(record.id, None)
+        character.msg("战斗已停止")
+        return True
+    
+    def get_combat(self, character):
+        """获取角色所在的战斗记录"""
+        return self.active_combats.find(character)
+    
+    def combats_in_room(self, room):
+        """房间内的所有战斗"""
+        return self.active_combats.in_room(room)
+    
+    def combats_in_zone(self, zone_key):
+        """涉及指定区域NPC的所有战斗"""
+        return self.active_combats.in_zone(zone_key)
     
     def _end_combat(self, combat_id, winner):
         """
         结束战斗
         
         🔥 新增: 战斗结束时同步 ndb → db
+        团战记录转交 _end_group_combat（winner 为获胜方序号）
         """
-        combat_data = self.active_combats.get(combat_id)
-        if not combat_data:
+        record = self.active_combats.get(combat_id)
+        if record and record.is_group:
+            self._end_group_combat(combat_id, winner)
             return
         
-        attacker = combat_data['attacker']
-        target = combat_data['target']
+        record = self.active_combats.remove(combat_id)
+        if not record:
+            return
         
-        if combat_data['delayed_call'].active():
-            combat_data['delayed_call'].cancel()
+        # 先送出排队中的战斗文本/状态，再发结算消息
+        self.combat_system.outbox.flush()
         
-        self.combat_system.end_combat(attacker, target, winner)
+        attacker = record.attacker
+        target = record.target
+        
+        if record.delayed_call and record.delayed_call.active():
+            record.delayed_call.cancel()
         
-        del self.active_combats[combat_id]
+        if self.replay_log and record.seed is not None:
+            winner_side = None if winner is None else (0 if winner == attacker else 1)
+            self.replay_log.end(record.seed, winner_side, getattr(attacker.ndb, 'combat_round', 0) or 0)
+        
+        self.combat_system.end_combat(attacker, target, winner)
         
         if winner:
             loser = target if winner == attacker else attacker
@@ -255,14 +324,383 @@ class CombatManager:
         
         # 🔥 检查是否需要触发存档
         from world.systems.save_system import SaveSystem
-        if SaveSystem.should_save_on_event('combat_end'):
-            if hasattr(attacker, 'account'):  # 玩家角色
-                SaveSystem.save_character(attacker)
-            if hasattr(target, 'account'):
-                SaveSystem.save_character(target)
+        for char in (attacker, target):
+            if hasattr(char, 'account'):  # 玩家角色
+                if SaveSystem.should_save_on_event('combat_end'):
+                    SaveSystem.save_character(char)
+                else:
+                    SaveSystem.mark_dirty(char)  # 下一轮自动存档优先保存
         
         logger.log_info(f"[战斗] {attacker.key} vs {target.key} 结束")
     
+    # ========================================
+    # 团战（N vs M）
+    # ========================================
+    
+    def start_group_combat(self, side_a, side_b, seed=None):
+        """
+        开始团战
+        
+        Args:
+            side_a (list): 一方参战者（通常是发起方）
+            side_b (list): 另一方参战者
+            seed (int): 随机数种子（回放时传入，默认随机生成）
+        
+        Returns:
+            bool: 是否成功开始
+        """
+        side_a = list(side_a)
+        side_b = list(side_b)
+        
+        max_participants = get_config('combat.group.max_participants', 40)
+        if len(side_a) + len(side_b) > max_participants:
+            return False
+        
+        if not self.combat_system.start_group_combat(side_a, side_b):
+            return False
+        
+        record = self.active_combats.add_group(side_a, side_b)
+        self.seed_combat(record, seed)
+        record.delayed_call = self.scheduler.call_later(
+            1.0,
+            self._group_round,
+            record.id
+        )
+        
+        for char in record.participants:
+            char.msg(f"|r【团战开始】|n |x#{record.seed:x}|n")
+        
+        logger.log_info(f"[战斗] 团战 #{record.id} 开始: {len(side_a)} vs {len(side_b)}")
+        
+        return True
+    
+    def join_combat(self, character, target):
+        """
+        加入目标所在的战斗，站在目标的对立面
+        
+        目标正在 1v1 时，先把这场战斗升级为团战。
+        
+        Returns:
+            bool: 是否成功加入
+        """
+        if getattr(character.ndb, 'in_combat', False):
+            return False
+        
+        record = self.active_combats.find(target)
+        if not record:
+            return False
+        
+        max_participants = get_config('combat.group.max_participants', 40)
+        if len(record.participants) >= max_participants:
+            return False
+        
+        if not record.is_group:
+            record = self._promote_to_group(record)
+        
+        side = record.side_of(target)
+        self.combat_system.enter_combat(character, target, record.rng)
+        character.ndb.combat_round = record.round
+        self.active_combats.attach(record, character, 1 - side)
+        
+        if self.replay_log and record.seed is not None:
+            self.replay_log.event(record.seed, record.round, character, EVENT_JOIN, 1 - side)
+        
+        name = character.name or character.key
+        for char in record.participants:
+            char.msg(f"|r{name}加入了战斗！|n")
+        
+        return True
+    
+    def switch_target(self, character, target):
+        """团战中切换攻击目标"""
+        record = self.active_combats.find(character)
+        if not record or not record.is_group:
+            return False
+        if target not in record.enemies_of(character):
+            return False
+        
+        character.ndb.combat_target = target
+        return True
+    
+    def _promote_to_group(self, record):
+        """把进行中的 1v1 升级为团战（保留双方的冷却和回合数）"""
+        self.active_combats.remove(record.id)
+        if record.delayed_call and record.delayed_call.active():
+            record.delayed_call.cancel()
+        
+        group = self.active_combats.add_group([record.attacker], [record.target])
+        group.round = getattr(record.attacker.ndb, 'combat_round', 0) or 0
+        # 沿用原战斗的随机数流，回放日志里仍是同一场战斗
+        group.seed = record.seed
+        group.rng = record.rng
+        group.delayed_call = self.scheduler.call_later(
+            self.combat_system.turn_interval,
+            self._group_round,
+            group.id
+        )
+        return group
+    
+    def _group_round(self, combat_id):
+        """
+        团战回合
+        
+        所有人按先手顺序在同一个 Tick 里出手，同一时刻到期的技能
+        由调度器按调度顺序结算，所以先手的人先造成伤害。
+        全部出手回调完成后统一结算 Buff / 阵亡 / 胜负。
+        """
+        record = self.active_combats.get(combat_id)
+        if not record:
+            return
+        
+        record.delayed_call = None
+        if self._check_group_outcome(record):
+            return
+        
+        # 先手顺序：身法高者先出手，同身法随机
+        rng = record.rng or random
+        actors = sorted(
+            record.participants,
+            key=lambda char: (-(getattr(char.ndb, 'agility', 0) or 0), rng.random())
+        )
+        
+        record.round += 1
+        round_no = record.round
+        # 先记下待结算数再出手：技能失败时回调是同步触发的
+        record.pending = len(actors)
+        record.watchdog = self.scheduler.call_later(
+            get_config('combat.group.round_timeout', 15.0),
+            self._finish_group_round,
+            combat_id,
+            round_no
+        )
+        
+        def on_action(result):
+            self._on_group_action(combat_id, round_no)
+        
+        for actor in actors:
+            actor.ndb.combat_round = round_no
+            target = self._select_target(actor, record.enemies_of(actor), rng)
+            if target is None:
+                on_action(None)
+                continue
+            
+            skill_key, skill_level = self._choose_action(actor, rng)
+            
+            # 范围技能一次施法打到多个敌人
+            targets = None
+            skill_data = get_skill_at_level(skill_key, skill_level)
+            if self.combat_system.is_area_skill(skill_data):
+                targets = self.combat_system.area_targets(skill_data, target, record.enemies_of(actor))
+            
+            self.combat_system.use_skill(
+                actor,
+                target,
+                skill_key,
+                skill_level=skill_level,
+                callback=self._group_action_callback(record, round_no, actor, target, skill_key, skill_level, on_action),
+                targets=targets
+            )
+    
+    def _group_action_callback(self, record, round_no, actor, target, skill_key, skill_level, on_action):
+        """团战出手回调：先写回放记录，再计数"""
+        def callback(result):
+            self._log_turn(record, round_no, actor, target, skill_key, skill_level, result)
+            on_action(result)
+        return callback
+    
+    def _select_target(self, actor, enemies, rng=None):
+        """
+        选择攻击目标
+        
+        已有目标且仍在场时保持不变（玩家可用"攻击"切换）；
+        否则按 combat.group.target_strategy 重新选：
+        lowest_hp - 集火血量比例最低者，random - 随机
+        """
+        current = getattr(actor.ndb, 'combat_target', None)
+        if current in enemies and (getattr(current.ndb, 'hp', 0) or 0) > 0:
+            return current
+        
+        alive = [enemy for enemy in enemies if (getattr(enemy.ndb, 'hp', 0) or 0) > 0]
+        if not alive:
+            return None
+        
+        if TARGET_STRATEGY.value == 'random':
+            target = (rng or random).choice(alive)
+        else:
+            target = min(
+                alive,
+                key=lambda enemy: (getattr(enemy.ndb, 'hp', 0) or 0) / (getattr(enemy.ndb, 'max_hp', 1) or 1)
+            )
+        
+        actor.ndb.combat_target = target
+        return target
+    
+    def _on_group_action(self, combat_id, round_no):
+        """团战中单人出手完成"""
+        record = self.active_combats.get(combat_id)
+        if not record or record.round != round_no:
+            return
+        
+        record.pending -= 1
+        if record.pending <= 0:
+            self._finish_group_round(combat_id, round_no)
+    
+    def _finish_group_round(self, combat_id, round_no):
+        """团战回合结算（全部出手完成，或超时兜底）"""
+        record = self.active_combats.get(combat_id)
+        if not record or record.round != round_no or record.delayed_call:
+            return
+        
+        record.pending = 0
+        if record.watchdog and record.watchdog.active():
+            record.watchdog.cancel()
+        record.watchdog = None
+        
+        from world.systems.buff_manager import BuffManager
+        
+        # Buff 处理（所有参战者一次批量处理）
+        for char in record.participants:
+            BuffManager.tick_buffs(char, 'turn_end')
+        
+        # 阵亡离场
+        for char in record.participants:
+            if (getattr(char.ndb, 'hp', 0) or 0) <= 0:
+                self._group_fall(record, char)
+        
+        if self._check_group_outcome(record):
+            return
+        
+        for char in record.participants:
+            BuffManager.reduce_duration(char)
+        
+        self._show_group_status(record)
+        
+        if record.round >= self.combat_system.max_rounds:
+            for char in record.participants:
+                char.msg("战斗超时！")
+            self._end_group_combat(combat_id, None)
+            return
+        
+        record.delayed_call = self.scheduler.call_later(
+            self.combat_system.turn_interval,
+            self._group_round,
+            combat_id
+        )
+    
+    def _group_fall(self, record, character):
+        """团战中有人倒下"""
+        side = record.side_of(character)
+        self._leave_group(record, character)
+        record.fallen[side].append(character)
+        
+        name = character.name or character.key
+        for char in record.participants:
+            char.msg(f"|r{name}倒下了！|n")
+        
+        if hasattr(character, 'is_npc') and character.is_npc:
+            self._turn_to_corpse(character)
+        else:
+            character.msg(f"\n|r【战败】|n")
+    
+    def _leave_group(self, record, character):
+        """参战者离开团战（阵亡、逃跑、掉线）"""
+        self.active_combats.detach(record, character)
+        self.combat_system.leave_combat(character)
+        self._save_combat_data(character)
+    
+    def _check_group_outcome(self, record):
+        """
+        检查团战是否分出胜负
+        
+        Returns:
+            bool: 战斗是否已结束
+        """
+        if record.sides[0] and record.sides[1]:
+            return False
+        
+        if record.sides[0]:
+            winner_side = 0
+        elif record.sides[1]:
+            winner_side = 1
+        else:
+            winner_side = None
+        
+        self._end_group_combat(record.id, winner_side)
+        return True
+    
+    def _show_group_status(self, record):
+        """显示团战状态（整场只拼一次文本）"""
+        lines = []
+        for index, side in enumerate(record.sides):
+            color = 'w' if index == 0 else 'y'
+            entries = [
+                f"{char.name or char.key} {getattr(char.ndb, 'hp', 0) or 0}/{getattr(char.ndb, 'max_hp', 1) or 1}"
+                for char in side
+            ]
+            lines.append(f"|{color}{'  '.join(entries)}|n")
+        
+        status_msg = f"\n|c第{record.round}回合|n\n" + "\n".join(lines) + "\n"
+        
+        outbox = self.combat_system.outbox
+        for char in record.participants:
+            if not getattr(char, 'is_npc', False):
+                outbox.send(char, status_msg)
+    
+    def _end_group_combat(self, combat_id, winner_side):
+        """
+        结束团战
+        
+        Args:
+            winner_side (int): 获胜方序号，平局/中止为None
+        """
+        record = self.active_combats.remove(combat_id)
+        if not record:
+            return
+        
+        for handle in (record.delayed_call, record.watchdog):
+            if handle and handle.active():
+                handle.cancel()
+        
+        self.combat_system.outbox.flush()
+        
+        if self.replay_log and record.seed is not None:
+            self.replay_log.end(record.seed, winner_side, record.round)
+        
+        survivors = record.participants
+        for char in survivors:
+            self.combat_system.leave_combat(char)
+        
+        if winner_side is not None:
+            losers = record.fallen[1 - winner_side]
+            for winner in record.sides[winner_side]:
+                exp = gold = 0
+                for loser in losers:
+                    rewards = self.combat_system.calculate_combat_rewards(winner, loser)
+                    exp += rewards['exp']
+                    gold += rewards['gold']
+                
+                winner.msg(f"\n|g【胜利！】|n")
+                if losers:
+                    winner.msg(f"获得经验: {exp}")
+                    winner.msg(f"获得金币: {gold}")
+        else:
+            for char in survivors:
+                char.msg("|y【战斗已结束】|n")
+        
+        for char in survivors:
+            self._save_combat_data(char)
+        
+        from world.systems.save_system import SaveSystem
+        save_now = SaveSystem.should_save_on_event('combat_end')
+        for char in survivors + record.fallen[0] + record.fallen[1]:
+            if hasattr(char, 'account'):
+                if save_now:
+                    SaveSystem.save_character(char)
+                else:
+                    SaveSystem.mark_dirty(char)  # 下一轮自动存档优先保存
+        
+        logger.log_info(f"[战斗] 团战 #{combat_id} 结束，第{record.round}回合")
+    
     def _save_combat_data(self, character):
         """
         🔥 新增: 保存战斗数据到数据库
@@ -0,0 +1,258 @@
+"""
+world/managers/combat_persistence.py
+战斗状态快照 - reload 不再清空战斗
+
+战斗状态（血量、灵力、冷却、Buff、回合）全部在 ndb 里，
+reload 会重启服务器进程，ndb 随之丢失。这里在 reload 前把进行中的
+战斗压成一份紧凑快照写进 ServerConfig，启动后按 dbid 取回对象、
+写回 ndb 并重新挂上回合Tick。
+随机数流不保存：恢复后换新种子，回放日志里从恢复点记为一场新战斗。
+
+快照格式（pickle + zlib）:
+    (版本, 保存时间, 战斗列表, 角色状态)
+
+    战斗:  (0, 攻击者dbid, 目标dbid, 当前回合方)                    1v1
+           (1, 甲方dbids, 乙方dbids, 回合数, 甲方阵亡, 乙方阵亡)      团战
+    角色:  dbid -> (hp, qi, 战斗回合, 目标dbid, 冷却, Buff列表)
+
+Buff 与角色存档同样打包成 (模板ID, 层数, 剩余回合, tick计数, 施加者dbid)，
+模板表由 BuffStore 写进 ServerConfig（见 buff_store.py）。
+
+只有 reload 会写快照；正常关机仍按原逻辑结束所有战斗。
+"""
+import pickle
+import time
+import zlib
+from evennia.utils import logger
+from world.loaders.game_data import get_config
+
+SNAPSHOT_KEY = 'combat_snapshot'
+SNAPSHOT_VERSION = 2
+
+
+def _dbid(obj):
+    return obj.id if obj is not None and hasattr(obj, 'id') else None
+
+
+class CombatPersistence:
+    """战斗快照的保存与恢复"""
+
+    # ========================================
+    # 保存
+    # ========================================
+
+    @staticmethod
+    def save(manager):
+        """
+        reload 前保存所有战斗，并挂起战斗管理器
+
+        挂起后注册表为空，at_server_stop 不会再把这些战斗当作结束处理。
+
+        Returns:
+            int: 保存的战斗数
+        """
+        if not get_config('combat.persistence.enabled', True):
+            return 0
+
+        combats = []
+        states = {}
+
+        for record in list(manager.active_combats.values()):
+            if record.is_group:
+                combats.append((
+                    1,
+                    tuple(_dbid(char) for char in record.sides[0]),
+                    tuple(_dbid(char) for char in record.sides[1]),
+                    record.round,
+                    tuple(_dbid(char) for char in record.fallen[0]),
+                    tuple(_dbid(char) for char in record.fallen[1]),
+                ))
+            else:
+                combats.append((0, _dbid(record.attacker), _dbid(record.target), record.current_turn))
+
+            for char in record.participants:
+                states[char.id] = CombatPersistence._pack_state(char)
+
+        if not combats:
+            return 0
+
+        from world.systems.buff_store import BuffStore
+        BuffStore.flush_templates()
+
+        payload = zlib.compress(
+            pickle.dumps((SNAPSHOT_VERSION, time.time(), combats, states), pickle.HIGHEST_PROTOCOL)
+        )
+
+        from evennia.server.models import ServerConfig
+        ServerConfig.objects.conf(SNAPSHOT_KEY, payload)
+
+        CombatPersistence.suspend(manager)
+
+        logger.log_info(
+            f"[战斗快照] 已保存 {len(combats)} 场战斗，{len(states)} 名参战者，{len(payload)} 字节"
+        )
+        return len(combats)
+
+    @staticmethod
+    def suspend(manager):
+        """取消所有回合Tick并清空注册表（不做战斗结算）"""
+        for record in manager.active_combats.values():
+            for handle in (record.delayed_call, getattr(record, 'watchdog', None)):
+                if handle and handle.active():
+                    handle.cancel()
+        manager.active_combats.clear()
+
+    @staticmethod
+    def _pack_state(char):
+        """单个参战者的紧凑状态"""
+        from world.systems.buff_store import BuffStore
+        from world.systems.combat_system import CombatSystem
+
+        ndb = char.ndb
+        cooldowns = tuple(CombatSystem.remaining_cooldowns(char).items())
+        buffs = BuffStore.pack_buffs(getattr(ndb, 'buffs', None) or ())
+        return (
+            getattr(ndb, 'hp', None),
+            getattr(ndb, 'qi', None),
+            getattr(ndb, 'combat_round', 0) or 0,
+            _dbid(getattr(ndb, 'combat_target', None)),
+            cooldowns,
+            buffs,
+        )
+
+    # ========================================
+    # 恢复
+    # ========================================
+
+    @staticmethod
+    def restore(manager):
+        """
+        启动时恢复快照中的战斗（快照读取后即删除）
+
+        Returns:
+            int: 恢复的战斗数
+        """
+        from evennia.server.models import ServerConfig
+
+        payload = ServerConfig.objects.conf(SNAPSHOT_KEY)
+        if not payload:
+            return 0
+        ServerConfig.objects.conf(SNAPSHOT_KEY, delete=True)
+
+        try:
+            version, saved_at, combats, states = pickle.loads(zlib.decompress(payload))
+        except Exception as e:
+            logger.log_err(f"[战斗快照] 快照损坏，已丢弃: {e}")
+            return 0
+
+        if version != SNAPSHOT_VERSION:
+            logger.log_warn(f"[战斗快照] 快照版本不符({version})，已丢弃")
+            return 0
+
+        max_age = get_config('combat.persistence.max_age', 600)
+        if time.time() - saved_at > max_age:
+            logger.log_warn("[战斗快照] 快照已过期，已丢弃")
+            return 0
+
+        objects = CombatPersistence._fetch_objects(states)
+
+        restored = 0
+        for entry in combats:
+            if entry[0] == 1:
+                ok = CombatPersistence._restore_group(manager, entry, objects, states)
+            else:
+                ok = CombatPersistence._restore_duel(manager, entry, objects, states)
+            restored += ok
+
+        logger.log_info(f"[战斗快照] 已恢复 {restored}/{len(combats)} 场战斗")
+        return restored
+
+    @staticmethod
+    def _fetch_objects(states):
+        """按 dbid 取回对象（触发 at_init，之后再写回 ndb）"""
+        from evennia.objects.models import ObjectDB
+
+        objects = {}
+        for dbid in states:
+            obj = ObjectDB.objects.get_id(dbid)
+            if obj:
+                objects[dbid] = obj
+        return objects
+
+    @staticmethod
+    def _restore_duel(manager, entry, objects, states):
+        _, attacker_id, target_id, current_turn = entry
+        attacker = objects.get(attacker_id)
+        target = objects.get(target_id)
+        if not attacker or not target:
+            return False
+
+        CombatPersistence._apply_state(attacker, states[attacker_id], objects)
+        CombatPersistence._apply_state(target, states[target_id], objects)
+
+        record = manager.active_combats.add(attacker, target)
+        record.current_turn = current_turn
+        manager.seed_combat(record)
+        record.delayed_call = manager.scheduler.call_later(
+            manager.combat_system.turn_interval,
+            manager._combat_tick,
+            record.id
+        )
+        return True
+
+    @staticmethod
+    def _restore_group(manager, entry, objects, states):
+        _, side_a, side_b, round_no, fallen_a, fallen_b = entry
+        sides = (
+            [objects[dbid] for dbid in side_a if dbid in objects],
+            [objects[dbid] for dbid in side_b if dbid in objects],
+        )
+        if not sides[0] or not sides[1]:
+            return False
+
+        for side in sides:
+            for char in side:
+                CombatPersistence._apply_state(char, states[char.id], objects)
+
+        from evennia.objects.models import ObjectDB
+
+        record = manager.active_combats.add_group(sides[0], sides[1])
+        record.round = round_no
+        for index, fallen in enumerate((fallen_a, fallen_b)):
+            for dbid in fallen:
+                obj = ObjectDB.objects.get_id(dbid)
+                if obj:
+                    record.fallen[index].append(obj)
+
+        manager.seed_combat(record)
+        record.delayed_call = manager.scheduler.call_later(
+            manager.combat_system.turn_interval,
+            manager._group_round,
+            record.id
+        )
+        return True
+
+    @staticmethod
+    def _apply_state(char, state, objects):
+        """把快照写回 ndb（Buff 的属性修改需要重新施加）"""
+        from world.systems.buff_container import BuffContainer
+        from world.systems.buff_store import BuffStore
+
+        hp, qi, combat_round, target_id, cooldowns, buffs = state
+        ndb = char.ndb
+
+        if hp is not None:
+            ndb.hp = hp
+        if qi is not None:
+            ndb.qi = qi
+        ndb.in_combat = True
+        ndb.combat_round = combat_round
+        ndb.combat_target = objects.get(target_id)
+        # 冷却存的是剩余回合，出手序号归零后即为就绪戳
+        ndb.combat_turn = 0
+        ndb.skill_cooldowns = dict(cooldowns)
+
+        ndb.buffs = BuffContainer()
+        BuffStore.unpack_buffs(char, buffs, objects.get)
+        # 快照里的 Buff 比 db.buff_state 新，不再从角色存档还原
+        BuffStore.adopt(char)
@@ -0,0 +1,254 @@
+"""
+world/managers/combat_registry.py
+战斗注册表 - 带索引的战斗记录存储
+
+- 战斗ID: 自增整数（不再拼接 "攻击者ID_目标ID" 字符串）
+- 记录: 1v1 用 CombatRecord，N vs M 团战用 GroupCombatRecord
+- 索引: 参战者 → 战斗、房间 → 战斗、区域 → 战斗
+- 查询: 按参战者查找、"房间X内所有战斗"、"涉及区域Y的NPC的所有战斗" 均为字典查找
+
+保留 dict 风格的 get/keys/values/items/clear 接口，
+旧代码里 `COMBAT_MANAGER.active_combats.xxx()` 的用法无需修改。
+"""
+from itertools import count
+
+
+class CombatRecord:
+    """单场战斗记录"""
+
+    __slots__ = ('id', 'attacker', 'target', 'current_turn', 'delayed_call', 'room_id', 'zones',
+                 'seed', 'rng')
+
+    is_group = False
+
+    def __init__(self, combat_id, attacker, target, room_id=None, zones=()):
+        self.id = combat_id
+        self.attacker = attacker
+        self.target = target
+        self.current_turn = 0
+        self.delayed_call = None
+        self.room_id = room_id
+        self.zones = zones
+        self.seed = None
+        self.rng = None
+
+    @property
+    def participants(self):
+        """所有参战者"""
+        return (self.attacker, self.target)
+
+    def __repr__(self):
+        return f"<CombatRecord #{self.id} {self.attacker.key} vs {self.target.key}>"
+
+
+class GroupCombatRecord:
+    """
+    团战记录（N vs M）
+
+    sides 是两个列表，分别存放两方仍在场的参战者；
+    pending 是本回合尚未结算完的出手数。
+    """
+
+    __slots__ = ('id', 'sides', 'round', 'pending', 'delayed_call', 'watchdog',
+                 'fallen', 'room_id', 'zones', 'seed', 'rng')
+
+    is_group = True
+
+    def __init__(self, combat_id, side_a, side_b, room_id=None, zones=()):
+        self.id = combat_id
+        self.sides = (list(side_a), list(side_b))
+        self.round = 0
+        self.pending = 0
+        self.delayed_call = None
+        self.watchdog = None
+        self.fallen = ([], [])
+        self.room_id = room_id
+        self.zones = zones
+        self.seed = None
+        self.rng = None
+
+    @property
+    def participants(self):
+        """所有仍在场的参战者"""
+        return self.sides[0] + self.sides[1]
+
+    def side_of(self, character):
+        """参战者所在一方（0/1），不在场返回None"""
+        for index, side in enumerate(self.sides):
+            if character in side:
+                return index
+        return None
+
+    def enemies_of(self, character):
+        """参战者的敌方列表"""
+        index = self.side_of(character)
+        return self.sides[1 - index] if index is not None else []
+
+    def __repr__(self):
+        return f"<GroupCombatRecord #{self.id} {len(self.sides[0])} vs {len(self.sides[1])}>"
+
+
+def _zones_of(obj):
+    """NPC 所属区域（ZoneManager 打的 zone:xxx 标签）"""
+    if not getattr(obj, 'is_npc', False) or not hasattr(obj, 'tags'):
+        return ()
+    return tuple(tag[5:] for tag in obj.tags.all() if tag.startswith('zone:'))
+
+
+class CombatRegistry:
+    """
+    战斗注册表
+
+    所有增删都维护三张索引，查询全部 O(1)（按房间/区域查询为 O(结果数)）。
+    """
+
+    def __init__(self):
+        self._combats = {}          # combat_id -> CombatRecord
+        self._by_participant = {}   # obj.id -> combat_id
+        self._by_room = {}          # room.id -> {combat_id}
+        self._by_zone = {}          # zone_key -> {combat_id}
+        self._ids = count(1)
+
+    # ========================================
+    # 增删
+    # ========================================
+
+    def add(self, attacker, target):
+        """
+        登记一场新战斗
+
+        Returns:
+            CombatRecord
+        """
+        room_id, zones = self._locate((attacker, target))
+        record = CombatRecord(next(self._ids), attacker, target, room_id, zones)
+        return self._register(record)
+
+    def add_group(self, side_a, side_b):
+        """
+        登记一场团战
+
+        Returns:
+            GroupCombatRecord
+        """
+        room_id, zones = self._locate(list(side_a) + list(side_b))
+        record = GroupCombatRecord(next(self._ids), side_a, side_b, room_id, zones)
+        return self._register(record)
+
+    def attach(self, record, character, side):
+        """中途加入团战"""
+        record.sides[side].append(character)
+        self._by_participant[character.id] = record.id
+        for zone in _zones_of(character):
+            if zone not in record.zones:
+                record.zones += (zone,)
+                self._by_zone.setdefault(zone, set()).add(record.id)
+
+    def detach(self, record, character):
+        """参战者离场（阵亡、逃跑），战斗本身继续"""
+        for side in record.sides:
+            if character in side:
+                side.remove(character)
+        if self._by_participant.get(character.id) == record.id:
+            del self._by_participant[character.id]
+
+    def remove(self, combat_id):
+        """
+        注销战斗
+
+        Returns:
+            CombatRecord: 被移除的记录（不存在则为None）
+        """
+        record = self._combats.pop(combat_id, None)
+        if not record:
+            return None
+
+        for obj in record.participants:
+            if self._by_participant.get(obj.id) == combat_id:
+                del self._by_participant[obj.id]
+        if record.room_id is not None:
+            self._discard(self._by_room, record.room_id, combat_id)
+        for zone in record.zones:
+            self._discard(self._by_zone, zone, combat_id)
+
+        return record
+
+    def clear(self):
+        """清空所有战斗（不做任何收尾）"""
+        self._combats.clear()
+        self._by_participant.clear()
+        self._by_room.clear()
+        self._by_zone.clear()
+
+    # ========================================
+    # 查询
+    # ========================================
+
+    def find(self, character):
+        """查找角色所在的战斗"""
+        combat_id = self._by_participant.get(character.id)
+        return self._combats.get(combat_id) if combat_id is not None else None
+
+    def in_room(self, room):
+        """房间内的所有战斗"""
+        room_id = room.id if hasattr(room, 'id') else room
+        return [self._combats[cid] for cid in self._by_room.get(room_id, ())]
+
+    def in_zone(self, zone_key):
+        """涉及指定区域NPC的所有战斗"""
+        return [self._combats[cid] for cid in self._by_zone.get(zone_key, ())]
+
+    # ========================================
+    # dict 兼容接口
+    # ========================================
+
+    def get(self, combat_id, default=None):
+        return self._combats.get(combat_id, default)
+
+    def keys(self):
+        return self._combats.keys()
+
+    def values(self):
+        return self._combats.values()
+
+    def items(self):
+        return self._combats.items()
+
+    def __contains__(self, combat_id):
+        return combat_id in self._combats
+
+    def __iter__(self):
+        return iter(self._combats)
+
+    def __len__(self):
+        return len(self._combats)
+
+    def _register(self, record):
+        self._combats[record.id] = record
+
+        for obj in record.participants:
+            self._by_participant[obj.id] = record.id
+        if record.room_id is not None:
+            self._by_room.setdefault(record.room_id, set()).add(record.id)
+        for zone in record.zones:
+            self._by_zone.setdefault(zone, set()).add(record.id)
+
+        return record
+
+    @staticmethod
+    def _locate(participants):
+        """战斗所在房间与涉及的区域"""
+        location = getattr(participants[0], 'location', None)
+        room_id = location.id if location else None
+        zones = set()
+        for obj in participants:
+            zones.update(_zones_of(obj))
+        return room_id, tuple(zones)
+
+    @staticmethod
+    def _discard(index, key, combat_id):
+        ids = index.get(key)
+        if ids:
+            ids.discard(combat_id)
+            if not ids:
+                del index[key]
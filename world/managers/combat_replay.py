@@ -0,0 +1,355 @@
+"""
+world/managers/combat_replay.py
+战斗回放日志 - 紧凑二进制、只追加
+
+每场战斗有独立的随机数种子（见 CombatManager），这里把
+"开战时的状态 + 每回合的决策与结果" 写成 struct 定长记录，
+之后用同一个种子在模拟器里重放，即可复现玩家报告的战斗。
+
+记录类型（小端，第一字节为类型）:
+    SESSION  进程启动标记，字符串表从这里重新开始（字符串 id 快用完时也会另起一个）
+    STRING   字符串表项（技能key、角色名）
+    FIGHT    开战: 种子、时间、类型(1v1/团战)、起始回合、当前出手方、人数
+    ACTOR    参战者: dbid、阵营、属性向量、技能列表、冷却
+    TURN     一次出手: 回合、出手者、目标、技能、标志位、伤害、双方剩余HP
+    EVENT    中途加入/离开
+    END      结束: 胜方、总回合
+
+写入只是 struct.pack 追加到内存缓冲区（微秒级），
+缓冲区超过阈值或服务器停止时才落盘。
+"""
+import os
+import struct
+import time
+from evennia.utils import logger
+from world.loaders.game_data import get_config
+
+REC_SESSION = 0
+REC_STRING = 1
+REC_FIGHT = 2
+REC_ACTOR = 3
+REC_TURN = 4
+REC_EVENT = 5
+REC_END = 6
+
+# 回放需要的战斗属性（按顺序存为 double）
+ACTOR_STATS = (
+    'hp', 'max_hp', 'qi', 'max_qi', 'strength', 'agility', 'intelligence',
+    'constitution', 'level', 'dodge_rate', 'counter_rate', 'critical_rate', 'luck',
+)
+
+FLAG_SUCCESS = 1
+FLAG_HIT = 2
+FLAG_CRITICAL = 4
+FLAG_COUNTERED = 8
+
+EVENT_JOIN = 1
+EVENT_LEAVE = 2
+
+NO_WINNER = 255
+
+_SESSION = struct.Struct('<Bd')
+_STRING = struct.Struct('<BHB')
+_FIGHT = struct.Struct('<BQdBHBB')
+_ACTOR = struct.Struct('<BQIBBHH' + 'd' * len(ACTOR_STATS) + 'BB')
+_PAIR = struct.Struct('<HH')
+_TURN = struct.Struct('<BQHIIHHBiii')
+_EVENT = struct.Struct('<BQHIBB')
+_END = struct.Struct('<BQBH')
+
+# 字符串 id 为 16 位；表快满时在 FIGHT / TURN 之前另起一个 SESSION。
+# 余量远大于一条 FIGHT（含全部 ACTOR）可能新增的字符串数
+_STRING_LIMIT = 0x10000
+_STRING_HEADROOM = 4096
+
+
+class ReplayLog:
+    """
+    回放日志写入器
+
+    Args:
+        path (str): 日志文件路径；为None时只保存在内存（模拟器回放时用来采集）
+        flush_bytes (int): 缓冲区落盘阈值
+    """
+
+    def __init__(self, path=None, flush_bytes=None):
+        self.path = path
+        self.flush_bytes = flush_bytes or get_config('combat.replay.flush_bytes', 65536)
+        self.buffer = bytearray()
+        self._strings = {}
+        self.stats = {'records': 0, 'bytes': 0, 'flushes': 0, 'fights': 0}
+        self._session()
+
+    # ========================================
+    # 写入
+    # ========================================
+
+    def fight(self, seed, is_group, round_no, current_turn, actors):
+        """
+        记录开战
+
+        Args:
+            actors: [(角色, 阵营)]
+        """
+        self._check_strings()
+        buf = self.buffer
+        buf += _FIGHT.pack(REC_FIGHT, seed, time.time(), int(is_group), round_no, current_turn, len(actors))
+        for char, side in actors:
+            self._actor(seed, char, side)
+        self.stats['fights'] += 1
+        self.stats['records'] += 1 + len(actors)
+
+    def turn(self, seed, round_no, actor, target, skill_key, skill_level, result):
+        """记录一次出手（result 为 use_skill 回调的结果）"""
+        self._check_strings()
+        result = result or {}
+        flags = (
+            (FLAG_SUCCESS if result.get('success') else 0)
+            | (FLAG_HIT if result.get('hit') else 0)
+            | (FLAG_CRITICAL if result.get('critical') else 0)
+            | (FLAG_COUNTERED if result.get('countered') else 0)
+        )
+        self.buffer += _TURN.pack(
+            REC_TURN, seed, round_no & 0xFFFF,
+            actor.id, target.id if target else 0,
+            self._string(skill_key), skill_level,
+            flags,
+            int(result.get('damage', 0) or 0),
+            int(getattr(actor.ndb, 'hp', 0) or 0),
+            int(getattr(target.ndb, 'hp', 0) or 0) if target else 0,
+        )
+        self.stats['records'] += 1
+
+    def event(self, seed, round_no, char, kind, side):
+        """记录中途加入/离开"""
+        self.buffer += _EVENT.pack(REC_EVENT, seed, round_no & 0xFFFF, char.id, kind, side)
+        self.stats['records'] += 1
+
+    def end(self, seed, winner, rounds):
+        """记录结束（winner 为阵营序号，平局/中止为None）"""
+        self.buffer += _END.pack(REC_END, seed, NO_WINNER if winner is None else winner, rounds & 0xFFFF)
+        self.stats['records'] += 1
+        if self.path and len(self.buffer) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        """缓冲区落盘"""
+        if not self.path or not self.buffer:
+            return
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'ab') as f:
+                f.write(self.buffer)
+        except OSError as e:
+            logger.log_err(f"[战斗回放] 写入失败: {e}")
+            return
+        self.stats['bytes'] += len(self.buffer)
+        self.stats['flushes'] += 1
+        self.buffer.clear()
+
+    def _actor(self, seed, char, side):
+        from world.systems.combat_system import CombatSystem
+
+        ndb = char.ndb
+        learned = getattr(char.db, 'learned_skills', None) or {}
+        skills = char.get_active_skills() if hasattr(char, 'get_active_skills') else []
+        cooldowns = list(CombatSystem.remaining_cooldowns(char).items())
+
+        # 字符串表项必须写在 ACTOR 之前，ACTOR 后面紧跟的只能是技能/冷却对
+        name_id = self._string(char.name or char.key)
+        pairs = [(self._string(key), value) for key, value in skills + cooldowns]
+
+        buf = self.buffer
+        buf += _ACTOR.pack(
+            REC_ACTOR, seed, char.id, side,
+            int(bool(getattr(char, 'is_npc', False))),
+            name_id,
+            learned.get('basic_attack', 1),
+            *[float(getattr(ndb, attr, 0) or 0) for attr in ACTOR_STATS],
+            len(skills), len(cooldowns),
+        )
+        for sid, value in pairs:
+            buf += _PAIR.pack(sid, value)
+
+    def _session(self):
+        """写 SESSION 记录，字符串表从头开始"""
+        self.buffer += _SESSION.pack(REC_SESSION, time.time())
+        self._strings.clear()
+
+    def _check_strings(self):
+        """字符串表快满时另起一个 SESSION（只在记录之间调用，不会拆开一条记录）"""
+        if len(self._strings) >= _STRING_LIMIT - _STRING_HEADROOM:
+            self._session()
+
+    def _string(self, text):
+        """字符串表：首次出现时写一条 STRING 记录"""
+        sid = self._strings.get(text)
+        if sid is None:
+            sid = len(self._strings)
+            self._strings[text] = sid
+            data = text.encode('utf-8')[:255]
+            self.buffer += _STRING.pack(REC_STRING, sid, len(data))
+            self.buffer += data
+        return sid
+
+
+def read_fights(data):
+    """
+    解析回放日志
+
+    Args:
+        data (bytes): 日志内容
+
+    Returns:
+        dict: {种子: 战斗}，战斗为 dict(seed, time, is_group, round, current_turn,
+              actors, turns, events, winner, rounds)
+    """
+    fights = {}
+    strings = {}
+    pos = 0
+    size = len(data)
+
+    while pos < size:
+        rec = data[pos]
+        if rec == REC_SESSION:
+            strings = {}
+            pos += _SESSION.size
+        elif rec == REC_STRING:
+            _, sid, length = _STRING.unpack_from(data, pos)
+            pos += _STRING.size
+            strings[sid] = data[pos:pos + length].decode('utf-8', 'replace')
+            pos += length
+        elif rec == REC_FIGHT:
+            _, seed, ts, is_group, round_no, current_turn, _count = _FIGHT.unpack_from(data, pos)
+            pos += _FIGHT.size
+            fights[seed] = {
+                'seed': seed, 'time': ts, 'is_group': bool(is_group),
+                'round': round_no, 'current_turn': current_turn,
+                'actors': [], 'turns': [], 'events': [], 'winner': None, 'rounds': None,
+            }
+        elif rec == REC_ACTOR:
+            fields = _ACTOR.unpack_from(data, pos)
+            pos += _ACTOR.size
+            seed, dbid, side, is_npc, name_id, basic_level = fields[1:7]
+            stats = dict(zip(ACTOR_STATS, fields[7:7 + len(ACTOR_STATS)]))
+            n_skills, n_cooldowns = fields[-2:]
+            pairs = []
+            for _ in range(n_skills + n_cooldowns):
+                sid, value = _PAIR.unpack_from(data, pos)
+                pos += _PAIR.size
+                pairs.append((strings.get(sid), value))
+            fights[seed]['actors'].append({
+                'dbid': dbid, 'side': side, 'is_npc': bool(is_npc),
+                'name': strings.get(name_id), 'basic_level': basic_level, 'stats': stats,
+                'skills': pairs[:n_skills], 'cooldowns': dict(pairs[n_skills:]),
+            })
+        elif rec == REC_TURN:
+            fields = _TURN.unpack_from(data, pos)
+            pos += _TURN.size
+            seed = fields[1]
+            turn = (fields[2], fields[3], fields[4], strings.get(fields[5])) + fields[6:]
+            if seed in fights:
+                fights[seed]['turns'].append(turn)
+        elif rec == REC_EVENT:
+            _, seed, round_no, dbid, kind, side = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            if seed in fights:
+                fights[seed]['events'].append((round_no, dbid, kind, side))
+        elif rec == REC_END:
+            _, seed, winner, rounds = _END.unpack_from(data, pos)
+            pos += _END.size
+            if seed in fights:
+                fights[seed]['winner'] = None if winner == NO_WINNER else winner
+                fights[seed]['rounds'] = rounds
+        else:
+            logger.log_warn(f"[战斗回放] 未知记录类型 {rec}（偏移 {pos}），停止解析")
+            break
+
+    return fights
+
+
+def load_fights(path=None):
+    """读取日志文件（先把当前缓冲区落盘）"""
+    if COMBAT_REPLAY_LOG:
+        COMBAT_REPLAY_LOG.flush()
+        path = path or COMBAT_REPLAY_LOG.path
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'rb') as f:
+        return read_fights(f.read())
+
+
+def replay_fight(fight):
+    """
+    在模拟器里用原种子重放一场战斗，逐回合与日志比对
+
+    中途有人加入/离开的战斗只比对到第一次事件之前。
+
+    Returns:
+        dict: matched(比对一致的出手数)、total(可比对的出手数)、
+              divergence(第一处不一致: (日志, 重放))
+    """
+    from world.managers.combat_simulator import (
+        SimCombatant, SimCombatManager, VirtualScheduler
+    )
+
+    actors = []
+    for info in fight['actors']:
+        skills = dict(info['skills'])
+        skills['basic_attack'] = info['basic_level']
+        char = SimCombatant(info['name'], {}, skills, is_npc=info['is_npc'])
+        char.id = info['dbid']
+        char._active_skills = list(info['skills'])
+        for attr, value in info['stats'].items():
+            setattr(char.ndb, attr, int(value) if value == int(value) else value)
+        actors.append((char, info))
+
+    scheduler = VirtualScheduler()
+    capture = ReplayLog()
+    manager = SimCombatManager(scheduler, lambda *args: None, replay_log=capture)
+
+    sides = ([], [])
+    for char, info in actors:
+        sides[info['side']].append(char)
+
+    if fight['is_group']:
+        manager.start_group_combat(sides[0], sides[1], seed=fight['seed'])
+        record = manager.active_combats.find(sides[0][0])
+        record.round = fight['round']
+    else:
+        manager.start_combat(sides[0][0], sides[1][0], seed=fight['seed'])
+        record = manager.active_combats.find(sides[0][0])
+        record.current_turn = fight['current_turn']
+        sides[0][0].ndb.combat_round = fight['round']
+
+    # 开战时已有的冷却（重载恢复的战斗），记录的是剩余回合，出手序号从 0 开始
+    for char, info in actors:
+        char.ndb.combat_turn = 0
+        char.ndb.skill_cooldowns = dict(info['cooldowns'])
+
+    stop_round = min((event[0] for event in fight['events']), default=None)
+    scheduler.run()
+
+    replayed = read_fights(bytes(capture.buffer)).get(fight['seed'], {}).get('turns', [])
+    expected = [t for t in fight['turns'] if stop_round is None or t[0] < stop_round]
+
+    matched = 0
+    divergence = None
+    for logged, actual in zip(expected, replayed):
+        if logged != actual:
+            divergence = (logged, actual)
+            break
+        matched += 1
+    if divergence is None and len(replayed) < len(expected):
+        divergence = (expected[len(replayed)], None)
+
+    return {'matched': matched, 'total': len(expected), 'divergence': divergence}
+
+
+# 关闭回放日志时为None，战斗管理器不记录
+COMBAT_REPLAY_LOG = (
+    ReplayLog(get_config('combat.replay.path', 'server/logs/combat_replay.bin'))
+    if get_config('combat.replay.enabled', True) else None
+)
@@ -0,0 +1,295 @@
+"""
+world/managers/combat_scheduler.py
+战斗调度器 - 哈希时间轮
+
+所有战斗相关的延迟回调（回合Tick、施法延迟、战斗文本、回合结束回调）
+统一挂在一个时间轮上，由单个 LoopingCall 驱动，
+不再让每场战斗各自往 Twisted 堆里塞 reactor.callLater。
+
+- 调度: O(1)，按到期 tick 哈希到槽位
+- 取消: O(1)，直接从槽位字典中删除
+- 统计: 队列深度、回调延迟(lag)、Tick 抖动
+"""
+import time
+from math import ceil
+from twisted.internet import task
+from evennia.utils import logger
+from world.loaders.game_data import config_float, config_int
+
+# 时间轮精度与槽位数（空闲重启时重新读取，配置重载后下一次启动生效）
+RESOLUTION = config_float('combat.scheduler.resolution', 0.1)
+WHEEL_SIZE = config_int('combat.scheduler.wheel_size', 512)
+
+
+class TimerHandle:
+    """
+    定时任务句柄
+
+    接口与 Twisted DelayedCall 保持一致（active / cancel），
+    旧代码里的 `delayed_call.active()` 判断无需修改。
+    """
+
+    __slots__ = ('tick', 'deadline', 'seq', 'func', 'args', 'kwargs', 'state', 'wheel')
+
+    PENDING = 0
+    CALLED = 1
+    CANCELLED = 2
+
+    def __init__(self, wheel, tick, deadline, seq, func, args, kwargs):
+        self.wheel = wheel
+        self.tick = tick
+        self.deadline = deadline
+        self.seq = seq
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.state = TimerHandle.PENDING
+
+    def active(self):
+        """是否仍在等待执行"""
+        return self.state == TimerHandle.PENDING
+
+    def cancel(self):
+        """取消任务（O(1)）"""
+        if self.state != TimerHandle.PENDING:
+            return
+        self.state = TimerHandle.CANCELLED
+        self.wheel._discard(self)
+
+    def getTime(self):
+        """到期时间（兼容 DelayedCall）"""
+        return self.deadline
+
+
+class CombatScheduler:
+    """
+    哈希时间轮调度器
+
+    时间被切成固定精度(resolution)的 tick，任务按到期 tick 放进
+    `tick % wheel_size` 号槽位。每次驱动时只处理新走过的槽位，
+    槽位里还没到期（要转好几圈）的任务原地保留。
+
+    Args:
+        resolution (float): 每个 tick 的秒数，默认取 combat.scheduler.resolution
+        wheel_size (int): 槽位数量，默认取 combat.scheduler.wheel_size
+        clock (callable): 时间源，默认 time.monotonic
+
+    未指定的参数每次空闲后重启时（_rebase）按当前配置重新读取。
+    """
+
+    def __init__(self, resolution=None, wheel_size=None, clock=None):
+        self._fixed = (resolution, wheel_size)
+        self.clock = clock or time.monotonic
+        self._slots = []
+        self._seq = 0
+        self._pending = 0
+        self._loop = None
+
+        self._reset_stats()
+        self._rebase()
+
+    # ========================================
+    # 公共接口
+    # ========================================
+
+    def call_later(self, delay, func, *args, **kwargs):
+        """
+        延迟 delay 秒后调用 func(*args, **kwargs)
+
+        Returns:
+            TimerHandle: 可用于取消的句柄
+        """
+        self._ensure_running()
+
+        now = self.clock()
+        deadline = now + max(0, delay)
+        tick = ceil((deadline - self._origin) / self.resolution)
+        if tick <= self._tick:
+            tick = self._tick + 1
+
+        self._seq += 1
+        handle = TimerHandle(self, tick, deadline, self._seq, func, args, kwargs)
+        self._slots[tick % self.wheel_size][handle] = None
+        self._pending += 1
+
+        self.stats['scheduled'] += 1
+        if self._pending > self.stats['peak_depth']:
+            self.stats['peak_depth'] = self._pending
+
+        return handle
+
+    @property
+    def queue_depth(self):
+        """当前等待中的任务数"""
+        return self._pending
+
+    def advance(self, now=None):
+        """
+        推进时间轮到 now，执行所有到期任务
+
+        LoopingCall 每个 tick 调一次；无 reactor 的场景可以手动调用。
+        """
+        if now is None:
+            now = self.clock()
+
+        target = int((now - self._origin) / self.resolution)
+        fired = 0
+
+        while self._tick < target and self._pending:
+            self._tick += 1
+            fired += self._fire_slot(self._tick, now)
+
+        # 队列清空后直接跳到目标 tick，不再空转槽位
+        if self._tick < target:
+            self._tick = target
+
+        return fired
+
+    def get_stats(self):
+        """
+        调度统计
+
+        Returns:
+            dict: 队列深度、累计调度/执行/取消数、延迟与抖动（毫秒）
+        """
+        stats = dict(self.stats)
+        stats['queue_depth'] = self._pending
+        stats['lag_avg_ms'] = round(self.stats['lag_avg'] * 1000, 2)
+        stats['lag_max_ms'] = round(self.stats['lag_max'] * 1000, 2)
+        stats['jitter_avg_ms'] = round(self.stats['jitter_avg'] * 1000, 2)
+        stats['jitter_max_ms'] = round(self.stats['jitter_max'] * 1000, 2)
+        return stats
+
+    def reset_stats(self):
+        """清空统计（保留队列）"""
+        self._reset_stats()
+
+    def stop(self):
+        """停止驱动（不清空队列）"""
+        if self._loop and self._loop.running:
+            self._loop.stop()
+        self._loop = None
+
+    def clear(self):
+        """取消所有任务"""
+        for slot in self._slots:
+            for handle in slot:
+                handle.state = TimerHandle.CANCELLED
+            slot.clear()
+        self._pending = 0
+        self.stop()
+
+    # ========================================
+    # 内部方法
+    # ========================================
+
+    def _fire_slot(self, tick, now):
+        """执行一个槽位里到期的任务"""
+        slot = self._slots[tick % self.wheel_size]
+        if not slot:
+            return 0
+
+        due = [h for h in slot if h.tick <= tick]
+        if not due:
+            return 0
+
+        for handle in due:
+            del slot[handle]
+        self._pending -= len(due)
+
+        # 同一 tick 内按到期时间、调度顺序执行（保证"先逻辑后文本"）
+        if len(due) > 1:
+            due.sort(key=lambda h: (h.deadline, h.seq))
+
+        stats = self.stats
+        fired = 0
+        for handle in due:
+            # 前面的回调可能取消了后面的任务
+            if handle.state != TimerHandle.PENDING:
+                continue
+            handle.state = TimerHandle.CALLED
+
+            lag = now - handle.deadline
+            if lag > stats['lag_max']:
+                stats['lag_max'] = lag
+            stats['lag_avg'] += (lag - stats['lag_avg']) * 0.05
+
+            try:
+                handle.func(*handle.args, **handle.kwargs)
+            except Exception as e:
+                stats['errors'] += 1
+                logger.log_trace(f"[战斗调度] 回调执行出错: {e}")
+            fired += 1
+
+        stats['fired'] += fired
+        return fired
+
+    def _discard(self, handle):
+        """从槽位移除已取消的任务"""
+        slot = self._slots[handle.tick % self.wheel_size]
+        if handle in slot:
+            del slot[handle]
+            self._pending -= 1
+            self.stats['cancelled'] += 1
+
+    def _rebase(self):
+        """
+        重新对齐时间原点，避免 tick 无限增长
+
+        只在队列为空时调用，顺带按当前配置更新精度和槽位数
+        """
+        resolution, wheel_size = self._fixed
+        self.resolution = resolution or RESOLUTION.value
+        self.wheel_size = wheel_size or WHEEL_SIZE.value
+        if len(self._slots) != self.wheel_size:
+            # 每个槽位是 {handle: None}，利用字典的插入顺序 + O(1) 删除
+            self._slots = [{} for _ in range(self.wheel_size)]
+
+        self._origin = self.clock()
+        self._tick = 0
+        self._last_drive = None
+
+    def _ensure_running(self):
+        """按需启动 LoopingCall（空闲后重启时重新对齐时间原点）"""
+        if self._loop is None:
+            if not self._pending:
+                self._rebase()
+            self._loop = task.LoopingCall(self._on_loop)
+            self._loop.start(self.resolution, now=False)
+
+    def _on_loop(self):
+        """LoopingCall 回调"""
+        now = self.clock()
+
+        # Tick 抖动：实际间隔与期望间隔之差
+        if self._last_drive is not None:
+            jitter = abs((now - self._last_drive) - self.resolution)
+            if jitter > self.stats['jitter_max']:
+                self.stats['jitter_max'] = jitter
+            self.stats['jitter_avg'] += (jitter - self.stats['jitter_avg']) * 0.05
+        self._last_drive = now
+        self.stats['ticks'] += 1
+
+        self.advance(now)
+
+        # 空闲时停止驱动，下一次调度再启动
+        if not self._pending:
+            self.stop()
+
+    def _reset_stats(self):
+        self._last_drive = None
+        self.stats = {
+            'scheduled': 0,
+            'fired': 0,
+            'cancelled': 0,
+            'errors': 0,
+            'ticks': 0,
+            'peak_depth': 0,
+            'lag_avg': 0.0,
+            'lag_max': 0.0,
+            'jitter_avg': 0.0,
+            'jitter_max': 0.0,
+        }
+
+
+COMBAT_SCHEDULER = CombatScheduler()
@@ -0,0 +1,448 @@
+"""
+world/managers/combat_simulator.py
+无头战斗模拟器 - 数值平衡 / 回归基准
+
+用虚拟时钟驱动 CombatSystem / CombatManager 的真实战斗逻辑，
+不依赖 reactor 和数据库对象：
+1. VirtualScheduler: 与 CombatScheduler 接口一致，但直接跳到下一个到期任务
+2. SimCombatant: 从 data/npcs/*.yaml 或境界配置构造的轻量替身
+3. CombatSimulator: 固定随机种子批量跑战斗，统计胜率、击杀耗时、伤害分布
+
+每场模拟战斗和线上一样有自己的 random.Random（ndb.combat_rng），种子由
+模拟器种子派生；不重设 random 模块的全局状态（线上奖励、掉落仍在用它）。
+
+用法（evennia shell）:
+    >>> from world.managers.combat_simulator import CombatSimulator
+    >>> report = CombatSimulator(seed=42).run('野猪', '森林狼', fights=10000)
+    >>> print(report.format())
+"""
+import heapq
+import random
+import statistics
+from collections import Counter
+from itertools import count
+from types import SimpleNamespace
+
+from evennia.utils import logger
+
+from world.loaders.game_data import GAME_DATA, get_data
+from world.managers.combat_scheduler import TimerHandle
+from world.managers.combat_manager import CombatManager
+from world.managers.combat_registry import CombatRegistry
+from world.systems.combat_system import CombatSystem
+
+
+class VirtualScheduler:
+    """
+    虚拟时钟调度器
+
+    接口与 CombatScheduler 相同（call_later / queue_depth），
+    run() 时按到期顺序直接跳到下一个任务，不经过真实时间。
+    回调出错时与 CombatScheduler 一样记日志、计入 errors，继续执行后面的任务。
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.errors = 0
+        self._heap = []
+        self._seq = 0
+        self._pending = 0
+
+    def clock(self):
+        return self.now
+
+    def call_later(self, delay, func, *args, **kwargs):
+        deadline = self.now + max(0, delay)
+        self._seq += 1
+        handle = TimerHandle(self, 0, deadline, self._seq, func, args, kwargs)
+        heapq.heappush(self._heap, (deadline, self._seq, handle))
+        self._pending += 1
+        return handle
+
+    @property
+    def queue_depth(self):
+        return self._pending
+
+    def run(self, until=None):
+        """
+        执行所有任务（或执行到虚拟时间 until）
+
+        Returns:
+            int: 执行的回调数
+        """
+        heap = self._heap
+        fired = 0
+        while heap:
+            deadline, _, handle = heap[0]
+            if until is not None and deadline > until:
+                break
+            heapq.heappop(heap)
+            if handle.state != TimerHandle.PENDING:
+                continue
+            self._pending -= 1
+            handle.state = TimerHandle.CALLED
+            self.now = deadline
+            try:
+                handle.func(*handle.args, **handle.kwargs)
+            except Exception as e:
+                self.errors += 1
+                logger.log_trace(f"[战斗模拟] 回调执行出错: {e}")
+            fired += 1
+        if until is not None and until > self.now:
+            self.now = until
+        return fired
+
+    def _discard(self, handle):
+        # 堆中的条目延迟清理，run() 时跳过
+        self._pending -= 1
+
+
+class SimCombatant:
+    """
+    战斗替身
+
+    只提供 CombatSystem / BuffManager 会访问的接口:
+    key/name/id、ndb、db.learned_skills、get_active_skills()、msg()
+    """
+
+    _ids = count(1)
+
+    def __init__(self, key, stats, skills=None, level=1, realm=None, is_npc=True):
+        self.id = next(SimCombatant._ids)
+        self.key = key
+        self.name = key
+        self.is_npc = is_npc
+        self.location = None
+        self.ndb = SimpleNamespace()
+        self.db = SimpleNamespace()
+
+        skills = dict(skills or {})
+        self.db.learned_skills = dict(skills)
+        self.db.learned_skills.setdefault('basic_attack', 1)
+        self._active_skills = [(k, lv) for k, lv in skills.items() if k != 'basic_attack']
+        self._active_skills.append(('basic_attack', self.db.learned_skills['basic_attack']))
+
+        ndb = self.ndb
+        for attr in ('strength', 'agility', 'intelligence', 'constitution'):
+            setattr(ndb, attr, stats.get(attr, 10))
+        ndb.max_hp = stats.get('max_hp') or stats.get('hp') or 100
+        ndb.max_qi = stats.get('max_qi') or stats.get('qi') or 100
+        ndb.hp = stats.get('hp') or ndb.max_hp
+        ndb.qi = stats.get('qi') or ndb.max_qi
+        ndb.critical_rate = stats.get('critical_rate', 0.05)
+        ndb.level = level
+        ndb.realm = realm
+
+    def msg(self, *args, **kwargs):
+        pass
+
+    def get_active_skills(self):
+        return list(self._active_skills)
+
+    # ========================================
+    # 构造
+    # ========================================
+
+    @staticmethod
+    def _npc_args(npc_key):
+        """从 GAME_DATA['npcs'] 的配置解析参数（兼容 stats 与 attrs 两种写法）"""
+        npc_data = get_data('npcs', npc_key)
+        if not npc_data:
+            raise KeyError(f"NPC不存在: {npc_key}")
+
+        fields = dict(npc_data)
+        for attr in npc_data.get('attrs') or []:
+            if isinstance(attr, dict) and 'name' in attr:
+                fields[attr['name']] = attr.get('value')
+
+        stats = dict(fields.get('stats') or {})
+        level = fields.get('level') or stats.get('level') or 1
+        skills = _resolve_skill_list(fields.get('skills'))
+
+        return (npc_key, stats, skills, level, fields.get('realm'), True)
+
+    @staticmethod
+    def _realm_args(realm, level=1, skills=None, key=None):
+        """按境界 base_stats + (等级-1) × level_growth 解析玩家参数"""
+        realm_data = get_data('realms', realm)
+        if not realm_data:
+            raise KeyError(f"境界不存在: {realm}")
+
+        base_stats = realm_data.get('base_stats', {})
+        level_growth = realm_data.get('level_growth', {})
+        stats = dict(base_stats)
+        for attr, per_level in level_growth.items():
+            stats[attr] = base_stats.get(attr, 0) + (level - 1) * per_level
+
+        return (key or f"{realm}Lv{level}", stats, skills, level, realm, False)
+
+    @classmethod
+    def factory(cls, spec):
+        """
+        按描述生成替身工厂（配置只解析一次，每次调用产出一个满状态的新替身）
+
+        Args:
+            spec: NPC key 字符串，或 {'realm': ..., 'level': ..., 'skills': {...}}
+
+        Returns:
+            callable: 无参工厂函数
+        """
+        if isinstance(spec, dict):
+            args = cls._realm_args(spec['realm'], spec.get('level', 1), spec.get('skills'), spec.get('key'))
+        else:
+            args = cls._npc_args(spec)
+        return lambda: cls(*args)
+
+    @classmethod
+    def build(cls, spec):
+        """按描述构造单个替身"""
+        return cls.factory(spec)()
+
+
+def _resolve_skill_list(raw_skills):
+    """
+    NPC 配置里的技能可能写中文名、key 或 {key: 等级}，统一转为 {skill_key: level}
+    找不到的技能直接忽略（战斗时会退回 basic_attack）
+    """
+    name_to_key = {cfg.get('name'): key for key, cfg in GAME_DATA['skills'].items()}
+    result = {}
+
+    for entry in raw_skills or []:
+        pairs = entry.items() if isinstance(entry, dict) else [(entry, 1)]
+        for name, level in pairs:
+            key = name if name in GAME_DATA['skills'] else name_to_key.get(name)
+            if key:
+                result[key] = level or 1
+
+    return result
+
+
+class SimCombatManager(CombatManager):
+    """
+    模拟用战斗管理器
+
+    复用 CombatManager 的回合逻辑，替换掉与数据库/奖励/尸体相关的收尾，
+    每个实例独立（不走单例）。
+    """
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, scheduler, on_finish, replay_log=None):
+        self.scheduler = scheduler
+        self.combat_system = CombatSystem(scheduler)
+        self.active_combats = CombatRegistry()
+        self.replay_log = replay_log
+        self.damage = {}
+        self.on_finish = on_finish
+        self._initialized = True
+
+    def _on_turn_complete(self, combat_id, result):
+        record = self.active_combats.get(combat_id)
+        if record and result.get('hit'):
+            side = 'a' if record.current_turn == 0 else 'b'
+            self.damage.setdefault(combat_id, {'a': [], 'b': []})[side].append(result.get('damage', 0))
+        super()._on_turn_complete(combat_id, result)
+
+    def _show_combat_status(self, attacker, target):
+        pass
+
+    def _end_combat(self, combat_id, winner):
+        record = self.active_combats.remove(combat_id)
+        if not record:
+            return
+        if record.delayed_call and record.delayed_call.active():
+            record.delayed_call.cancel()
+        self.on_finish(record, winner, self.damage.pop(combat_id, None))
+
+    def _end_group_combat(self, combat_id, winner_side):
+        record = self.active_combats.remove(combat_id)
+        if not record:
+            return
+        for handle in (record.delayed_call, record.watchdog):
+            if handle and handle.active():
+                handle.cancel()
+        for char in record.participants:
+            self.combat_system.leave_combat(char)
+        self.on_finish(record, winner_side, self.damage.pop(combat_id, None))
+
+    def _turn_to_corpse(self, npc):
+        pass
+
+    def _save_combat_data(self, character):
+        pass
+
+
+class SimReport:
+    """模拟结果统计"""
+
+    def __init__(self, side_a, side_b, seed):
+        self.side_a = side_a
+        self.side_b = side_b
+        self.seed = seed
+        self.outcomes = Counter()
+        self.ttk = []
+        self.rounds = []
+        self.damage = {'a': [], 'b': []}
+        self.callbacks = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    @property
+    def fights(self):
+        return sum(self.outcomes.values())
+
+    def summary(self):
+        """
+        Returns:
+            dict: 胜率、击杀耗时(虚拟秒)、回合数与单次伤害的统计值
+        """
+        total = self.fights or 1
+        return {
+            'fights': self.fights,
+            'seed': self.seed,
+            'win_rate_a': self.outcomes['a'] / total,
+            'win_rate_b': self.outcomes['b'] / total,
+            'draw_rate': self.outcomes['draw'] / total,
+            'ttk': _describe(self.ttk),
+            'rounds': _describe(self.rounds),
+            'damage_a': _describe(self.damage['a']),
+            'damage_b': _describe(self.damage['b']),
+            'errors': self.errors,
+            'wall_time': self.elapsed,
+        }
+
+    def histogram(self, side, bins=10):
+        """单次伤害分布直方图 [(下界, 上界, 次数), ...]"""
+        values = self.damage[side]
+        if not values:
+            return []
+        low, high = min(values), max(values)
+        width = max(1, (high - low) / bins)
+        counts = Counter(min(int((v - low) / width), bins - 1) for v in values)
+        return [(int(low + i * width), int(low + (i + 1) * width), counts[i]) for i in range(bins)]
+
+    def format(self):
+        """生成可直接 msg 的文本报告"""
+        s = self.summary()
+        lines = [
+            f"|w=== 战斗模拟: {self.side_a} vs {self.side_b} ===|n",
+            f"场次: {s['fights']}  种子: {s['seed']}  耗时: {s['wall_time']:.2f}s  回调: {self.callbacks}",
+        ]
+        if self.errors:
+            lines.append(f"|r回调出错: {self.errors} 次（详见日志）|n")
+        lines += [
+            f"胜率: A |g{s['win_rate_a']:.1%}|n  B |r{s['win_rate_b']:.1%}|n  平局 {s['draw_rate']:.1%}",
+            f"击杀耗时(秒): {_format_stats(s['ttk'])}",
+            f"回合数: {_format_stats(s['rounds'])}",
+            f"A 单次伤害: {_format_stats(s['damage_a'])}",
+            f"B 单次伤害: {_format_stats(s['damage_b'])}",
+        ]
+        for side in ('a', 'b'):
+            hist = self.histogram(side)
+            if hist:
+                peak = max(c for _, _, c in hist) or 1
+                lines.append(f"{side.upper()} 伤害分布:")
+                for low, high, c in hist:
+                    lines.append(f"  {low:>6}-{high:<6} {'█' * int(c * 30 / peak)} {c}")
+        return "\n".join(lines)
+
+
+def _describe(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    return {
+        'mean': statistics.fmean(ordered),
+        'stdev': statistics.pstdev(ordered),
+        'min': ordered[0],
+        'median': ordered[len(ordered) // 2],
+        'p90': ordered[int(len(ordered) * 0.9) - 1 if len(ordered) >= 10 else -1],
+        'max': ordered[-1],
+    }
+
+
+def _format_stats(desc):
+    if not desc:
+        return "-"
+    return (f"均值 {desc['mean']:.1f} ±{desc['stdev']:.1f}  "
+            f"中位 {desc['median']:.1f}  P90 {desc['p90']:.1f}  "
+            f"[{desc['min']:.1f}, {desc['max']:.1f}]")
+
+
+class CombatSimulator:
+    """
+    批量战斗模拟
+
+    Args:
+        seed (int): 随机种子（相同种子 + 相同数据 = 相同结果）
+        batch_size (int): 每批并发的战斗数
+    """
+
+    def __init__(self, seed=None, batch_size=500):
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.batch_size = batch_size
+
+    @staticmethod
+    def ensure_data_loaded():
+        """离线运行时按需加载配置和数据"""
+        if not GAME_DATA.get('skills'):
+            from world.loaders.config_loader import load_all_configs
+            from world.loaders.data_loader import load_all_data
+            load_all_configs()
+            load_all_data()
+
+    def run(self, side_a, side_b, fights=1000):
+        """
+        运行模拟
+
+        Args:
+            side_a / side_b: 替身描述（NPC key 或境界描述字典），A 为先手
+            fights (int): 战斗场次
+
+        Returns:
+            SimReport
+        """
+        import time
+
+        self.ensure_data_loaded()
+        # 只用来派生每场战斗的种子，不碰 random 模块的全局状态
+        seeds = random.Random(self.seed)
+
+        report = SimReport(side_a, side_b, self.seed)
+        scheduler = VirtualScheduler()
+        started = {}
+
+        def on_finish(record, winner, damage):
+            attacker = record.attacker
+            start_time = started.pop(attacker.id, scheduler.now)
+            if winner is None:
+                report.outcomes['draw'] += 1
+            else:
+                report.outcomes['a' if winner is attacker else 'b'] += 1
+                report.ttk.append(scheduler.now - start_time)
+            report.rounds.append(getattr(attacker.ndb, 'combat_round', 0))
+            if damage:
+                report.damage['a'].extend(damage['a'])
+                report.damage['b'].extend(damage['b'])
+
+        manager = SimCombatManager(scheduler, on_finish)
+        make_a = SimCombatant.factory(side_a)
+        make_b = SimCombatant.factory(side_b)
+
+        wall_start = time.perf_counter()
+        remaining = fights
+        while remaining > 0:
+            batch = min(self.batch_size, remaining)
+            for _ in range(batch):
+                attacker = make_a()
+                target = make_b()
+                if manager.start_combat(attacker, target, seed=seeds.getrandbits(63)):
+                    started[attacker.id] = scheduler.now
+            report.callbacks += scheduler.run()
+            remaining -= batch
+
+        report.errors = scheduler.errors
+
+        report.elapsed = time.perf_counter() - wall_start
+        return report
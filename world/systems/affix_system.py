@@ -9,7 +9,8 @@ world/systems/affix_system.py
 - 词条继承（合成时）
 """
 import random
-from world.loaders.game_data import GAME_DATA
+from world.loaders.game_data import GAME_DATA, thaw
+from world.loaders.data_index import affix_by_id, affix_candidates
 from evennia.utils import logger
 
 
@@ -18,8 +19,10 @@ class AffixSystem:
     词条系统（纯逻辑）
     """
     
-    def __init__(self):
-        self.affixes = GAME_DATA.get('affixes', {})
+    @property
+    def affixes(self):
+        """词条库（每次取当前数据，热重载后无需重建实例）"""
+        return GAME_DATA.get('affixes', {})
     
     # ========== 词条生成 ==========
     
@@ -100,35 +103,22 @@ class AffixSystem:
         Returns:
             dict: 词条数据
         """
-        # 筛选指定类型的词条
-        candidates = [
-            affix for affix in self.affixes.values()
-            if affix.get('type') == affix_type
-        ]
+        # 指定类型的词条及按tier（品质）算好的累积权重（见 data_index）
+        # rarity_boost 原先对所有候选乘同一个系数，不改变分布，这里不再参与计算
+        candidates, cum_weights = affix_candidates(affix_type)
         
         if not candidates:
             return None
         
-        # 根据tier（品质）加权
-        weights = []
-        for affix in candidates:
-            tier = affix.get('tier', 1)
-            # 高tier的词条更稀有，权重更低
-            # 但rarity_boost可以提高高tier的概率
-            base_weight = 100 / (tier ** 1.5)
-            boosted_weight = base_weight * (1 + rarity_boost * 0.2)
-            weights.append(boosted_weight)
-        
         # 加权随机选择
-        selected = random.choices(candidates, weights=weights)[0]
+        selected = random.choices(candidates, cum_weights=cum_weights)[0]
         
         # 深拷贝词条数据
         return self._copy_affix(selected)
     
     def _copy_affix(self, affix):
-        """深拷贝词条数据"""
-        import copy
-        return copy.deepcopy(affix)
+        """复制词条数据（词条库是只读的，生成的词条要存进装备并可能被修改）"""
+        return thaw(affix)
     
     # ========== 词条应用 ==========
     
@@ -362,10 +352,8 @@ class AffixSystem:
         Returns:
             dict: 词条数据
         """
-        for affix in self.affixes.values():
-            if affix.get('id') == affix_id:
-                return self._copy_affix(affix)
-        return None
+        affix = affix_by_id(affix_id)
+        return self._copy_affix(affix) if affix is not None else None
     
     def validate_affixes(self, affixes):
         """
@@ -0,0 +1,97 @@
+"""
+world/systems/attr_store.py
+属性写回 - ndb → db 只写有变化的字段
+
+_save_to_db 算出每个要落库的 attribute 应有的值，这里与 attributes 缓存
+（即数据库里现有的值）逐项比较，只写不同的几项；连同 Buff 一起放进
+一个事务。Evennia 的 attributes 缓存按 key 缓存：某个 key 第一次读取时查一次库，
+之后（包括写入后）都从缓存读。这些字段在 sync_stats_to_ndb 上线同步时已经读过，
+所以比较本身不查库，没有变化的角色保存一次是零查询。
+
+其它地方直接写 attributes（AttrManager、战斗结算写 hp）也会更新这份缓存，
+所以比较的对象总是库里的真实值，不会因为快照过期而漏写。
+
+每次写回的行数和字节数（pickle 后的大小，近似值）累计在 SAVE_STATS。
+事务失败时清空 attributes 缓存、Buff 状态退回"未保存"，下次保存时重新比较并重写。
+"""
+import pickle
+from django.db import transaction
+from world.systems.buff_container import BuffContainer
+from world.systems.buff_store import BuffStore
+
+# 写回统计（xx saves 查看）
+SAVE_STATS = {'flushes': 0, 'idle': 0, 'rows': 0, 'bytes': 0}
+
+
+def _size(value):
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class AttrStore:
+    """只写变化字段的角色存档"""
+
+    @staticmethod
+    def changed(character, values):
+        """
+        与数据库现有值不同的字段
+
+        Args:
+            values (dict): {attribute: 应有的值}
+
+        Returns:
+            list: [(attribute, 值), ...]
+        """
+        attrs = character.attributes.get(key=list(values), return_obj=True, return_list=True)
+        return [
+            (key, value)
+            for (key, value), attr in zip(values.items(), attrs)
+            if attr is None or attr.value != value
+        ]
+
+    @staticmethod
+    def flush(character, values):
+        """
+        写回有变化的字段和 Buff（同一个事务）
+
+        Args:
+            values (dict): {attribute: 应有的值}
+
+        Returns:
+            tuple: (写入行数, 字节数)，没有变化时为 (0, 0)
+        """
+        changed = AttrStore.changed(character, values)
+        buff_state = BuffStore.pending(character)
+
+        SAVE_STATS['flushes'] += 1
+        if not changed and buff_state is None:
+            SAVE_STATS['idle'] += 1
+            return 0, 0
+
+        # 事务失败要还原: attributes 缓存里可能已是回滚掉的新值，pending() 也已清掉 Buff 的 dirty 标记
+        last_buff_state = getattr(character.ndb, 'buff_state', None)
+        try:
+            with transaction.atomic():
+                if changed:
+                    character.attributes.batch_add(*changed)
+                if buff_state is not None:
+                    BuffStore.save(character, buff_state)
+        except Exception:
+            character.attributes.reset_cache()
+            if buff_state is not None:
+                character.ndb.buff_state = last_buff_state
+                buffs = getattr(character.ndb, 'buffs', None)
+                if isinstance(buffs, BuffContainer):
+                    buffs.dirty = True
+            raise
+
+        rows = len(changed) + (buff_state is not None)
+        size = sum(_size(value) for _, value in changed)
+        if buff_state is not None:
+            size += _size(buff_state)
+
+        SAVE_STATS['rows'] += rows
+        SAVE_STATS['bytes'] += size
+        return rows, size
@@ -0,0 +1,34 @@
+"""
+world/systems/batch_rng.py
+批量随机数 - 范围技能一次施法对多个目标的判定
+
+一次取 n 个随机数；目标数达到 combat.area.vector_min 且装了 numpy 时
+用 numpy 一次生成（子生成器的种子从战斗随机数流里取，同一种子仍可复现），
+否则逐个从战斗随机数流里取。
+
+numpy 是可选依赖，未安装时始终走逐个抽取。
+"""
+try:
+    import numpy as np
+except ImportError:  # 可选依赖
+    np = None
+
+from world.loaders.game_data import config_int
+
+VECTOR_MIN = config_int('combat.area.vector_min', 64)
+
+
+def batch_random(rng, n):
+    """
+    n 个 [0, 1) 均匀随机数
+
+    Args:
+        rng: 战斗的随机数流（random.Random / random 模块）
+
+    Returns:
+        list: 长度为 n
+    """
+    if np is not None and n >= VECTOR_MIN.value:
+        return np.random.default_rng(rng.getrandbits(64)).random(n).tolist()
+    draw = rng.random
+    return [draw() for _ in range(n)]
@@ -0,0 +1,207 @@
+"""
+world/systems/battle_text.py
+战斗文本 - 模板预解析 + 按回合合并发送
+
+- 模板: 首次使用时用 string.Formatter 拆成 (字面量, 字段, 格式) 片段并缓存，
+  之后每次只做拼接，不再对整段模板调用 str.format
+- 合并: 同一次出手中到期时间相同的文本行放进同一个缓冲；
+  再经 CombatOutbox 把同一调度 Tick 内发给同一接收者的所有战斗消息
+  （多人出手的文本、状态栏、反击提示）拼成一次 msg
+- 范围技能: AreaOutput 把一次施法对所有目标的结果合成一块文本
+"""
+from functools import lru_cache
+from string import Formatter
+from evennia.utils import logger
+
+# 文本发送统计（合并前应发的行数 / 合并批次 / 实际 msg 调用次数）
+TEXT_STATS = {'lines': 0, 'flushes': 0, 'writes': 0}
+
+_FORMATTER = Formatter()
+
+
+@lru_cache(maxsize=2048)
+def compile_template(template):
+    """
+    预解析战斗文本模板
+
+    Returns:
+        tuple: ((字面量, 字段名, 格式说明, 转换符), ...)
+    """
+    return tuple(_FORMATTER.parse(template))
+
+
+def render_template(parts, values):
+    """按预解析片段渲染文本"""
+    out = []
+    for literal, field, spec, conversion in parts:
+        if literal:
+            out.append(literal)
+        if field is None:
+            continue
+        value = values[field]
+        if conversion == 'r':
+            value = repr(value)
+        out.append(format(value, spec) if spec else str(value))
+    return ''.join(out)
+
+
+class CombatOutbox:
+    """
+    战斗消息发件箱
+
+    send() 只把文本挂到接收者名下，本 Tick 第一次 send 时挂一个 0 延迟的调度任务，
+    到点后每个接收者一次 msg。需要立刻送达时（例如战斗结束前）手动 flush()。
+
+    Args:
+        scheduler: 战斗调度器（与 CombatSystem 共用）
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self._pending = {}
+        self._handle = None
+
+    def send(self, recipient, text, lines=1):
+        """
+        排队一条消息
+
+        Args:
+            lines (int): text 由几行原始文本合并而来（仅用于统计）
+        """
+        queued = self._pending.get(recipient)
+        if queued is None:
+            self._pending[recipient] = [text]
+        else:
+            queued.append(text)
+        TEXT_STATS['lines'] += lines
+
+        if self._handle is None:
+            self._handle = self.scheduler.call_later(0, self.flush)
+
+    def flush(self):
+        """立即发送所有排队的消息"""
+        if self._handle is not None and self._handle.active():
+            self._handle.cancel()
+        self._handle = None
+
+        pending = self._pending
+        if not pending:
+            return
+        self._pending = {}
+
+        for recipient, lines in pending.items():
+            recipient.msg("\n".join(lines))
+        TEXT_STATS['flushes'] += 1
+        TEXT_STATS['writes'] += len(pending)
+
+
+class TurnOutput:
+    """
+    单次出手的文本缓冲
+
+    按到期延迟归组，每组只挂一个调度任务；渲染在发送时刻进行，
+    此时才读取 context 中的伤害值（保持原来的"先逻辑后文本"）。
+    """
+
+    __slots__ = ('attacker', 'target', 'context', '_due')
+
+    def __init__(self, attacker, target, context):
+        self.attacker = attacker
+        self.target = target
+        self.context = context
+        self._due = {}
+
+    def add(self, delay, template):
+        """加入一行文本"""
+        self._due.setdefault(delay, []).append(compile_template(template))
+
+    def schedule(self, outbox):
+        """每个到期时间挂一个调度任务，到点后交给发件箱"""
+        for delay in sorted(self._due):
+            outbox.scheduler.call_later(delay, self.flush, outbox, self._due[delay])
+        self._due = {}
+
+    def flush(self, outbox, lines):
+        """渲染一组文本并交给发件箱"""
+        attacker = self.attacker
+        target = self.target
+        context = self.context
+
+        try:
+            values = {
+                'caster': attacker.name or attacker.key,
+                'target': target.name or target.key,
+                'damage': int(context.get('total_damage', 0)),
+                'heal': int(context.get('total_heal', 0)),
+                'reflect_damage': int(context.get('reflect_damage', 0)),
+            }
+            text = "\n".join(render_template(parts, values) for parts in lines)
+        except Exception as e:
+            logger.log_err(f"[Combat] Message formatting error: {e}")
+            return
+
+        outbox.send(attacker, text, len(lines))
+        if target is not attacker and hasattr(target, 'msg'):
+            outbox.send(target, text, len(lines))
+
+
+class AreaOutput:
+    """
+    范围技能的文本缓冲
+
+    施法行只渲染一次；结果行（命中/暴击/闪避）按每个目标各自的结果渲染，
+    同一到期时间的所有行合并成一整块，发给施法者和每个目标。
+
+    Args:
+        contexts (list): 每个目标一份 context（context['target'] 为该目标，
+            context['outcome'] 为 'hit' / 'critical' / 'dodge'）
+    """
+
+    __slots__ = ('attacker', 'contexts', '_due')
+
+    def __init__(self, attacker, contexts):
+        self.attacker = attacker
+        self.contexts = contexts
+        self._due = {}
+
+    def add(self, delay, template, outcome=None):
+        """加入一行文本（outcome 为空时是施法行）"""
+        self._due.setdefault(delay, []).append((outcome, compile_template(template)))
+
+    def schedule(self, outbox):
+        """每个到期时间挂一个调度任务，到点后交给发件箱"""
+        for delay in sorted(self._due):
+            outbox.scheduler.call_later(delay, self.flush, outbox, self._due[delay])
+        self._due = {}
+
+    def flush(self, outbox, lines):
+        """渲染一组文本并交给发件箱"""
+        attacker = self.attacker
+        caster = attacker.name or attacker.key
+
+        try:
+            out = []
+            for outcome, parts in lines:
+                for context in self.contexts:
+                    if outcome is not None and context['outcome'] != outcome:
+                        continue
+                    target = context['target']
+                    out.append(render_template(parts, {
+                        'caster': caster,
+                        'target': target.name or target.key,
+                        'damage': int(context.get('total_damage', 0)),
+                        'heal': int(context.get('total_heal', 0)),
+                        'reflect_damage': int(context.get('reflect_damage', 0)),
+                    }))
+                    if outcome is None:
+                        break
+            text = "\n".join(out)
+        except Exception as e:
+            logger.log_err(f"[Combat] Message formatting error: {e}")
+            return
+
+        outbox.send(attacker, text, len(out))
+        for context in self.contexts:
+            target = context['target']
+            if target is not attacker and hasattr(target, 'msg'):
+                outbox.send(target, text, len(out))
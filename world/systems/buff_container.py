@@ -0,0 +1,325 @@
+"""
+world/systems/buff_container.py
+Buff 容器 - 带索引的角色 Buff 存储
+
+- BuffTemplate: Buff 的定义部分（类型、名称、效果列表、extra…），按内容哈希登记，
+  同一技能效果产生的所有 Buff 共用一份，创建后只读
+- Buff: 单个 Buff 实例，只有模板引用、层数、到期回合、tick计数和施加者；
+  保留 buff['name'] / buff.get('source') 的字典式读取（定义字段转到模板），
+  旧代码无需修改
+- 名称索引: 同名 Buff 查找 O(1)
+- 触发桶: trigger_on → {buff_id: Buff}，只收有可触发效果（非 stat_mod）的 Buff，
+  tick 时只遍历对应桶
+- 到期堆: (到期回合, 序号, Buff) 最小堆；持续时间不再逐个递减，
+  容器回合 +1 后只弹出已到期的 Buff（刷新时长产生的旧堆项弹出时丢弃）
+"""
+import heapq
+from hashlib import blake2b
+from itertools import count
+from types import MappingProxyType
+
+# 只作用于属性、不需要回合触发的效果类型
+PASSIVE_EFFECTS = frozenset(('stat_mod',))
+
+# 模板字段及缺省值（同一技能效果产生的 Buff 这些字段总是相同）
+TEMPLATE_DEFAULTS = (
+    ('type', 'buff'),
+    ('name', '未命名效果'),
+    ('max_stacks', 1),
+    ('stack_mode', 'refresh'),
+    ('effects', []),
+    ('trigger_on', 'turn_start'),
+    ('tick_interval', 1),
+    ('icon', ''),
+    ('desc', ''),
+    ('extra', {}),
+    ('show_tick_message', False),
+)
+TEMPLATE_FIELDS = tuple(field for field, _ in TEMPLATE_DEFAULTS)
+
+# 模板ID 的取值范围（64 位）
+TID_MASK = (1 << 64) - 1
+
+# Buff 实例 id：进程内单调递增（只用于容器索引和属性表来源，不落库）
+_BUFF_IDS = count(1)
+
+
+def _thaw(value):
+    """只读结构还原为普通 dict / list（用于哈希和持久化）"""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_thaw(item) for item in value]
+    return value
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class BuffTemplate:
+    """
+    Buff 模板（享元）
+
+    用 BuffTemplate.intern() 取得，内容相同的定义全服只有一份。
+    tid 是定义内容的 64 位哈希，持久化时角色身上只存 tid（见 buff_store.py）。
+    登记时比较定义内容，万一哈希冲突就往后探测空位，不会把两种 Buff 当成一种。
+    """
+
+    __slots__ = ('tid', 'fields', 'type', 'name', 'max_stacks', 'stack_mode', 'effects',
+                 'trigger_on', 'tick_interval', 'icon', 'desc', 'extra', 'show_tick_message',
+                 'ticks', 'stat_mods')
+
+    # tid -> BuffTemplate
+    _registry = {}
+
+    def __init__(self, tid, fields):
+        self.tid = tid
+        self.fields = fields
+        for field, value in zip(TEMPLATE_FIELDS, fields):
+            setattr(self, field, _freeze(value))
+
+        # 预先算好 tick 与属性修正需要的东西
+        self.ticks = any(effect.get('type') not in PASSIVE_EFFECTS for effect in self.effects)
+        stat_mods = {}
+        for effect in self.effects:
+            if effect.get('type') == 'stat_mod':
+                stat_mods[effect['stat']] = stat_mods.get(effect['stat'], 0) + effect['value']
+        self.stat_mods = MappingProxyType(stat_mods)
+
+    @classmethod
+    def intern(cls, config):
+        """
+        按内容取模板（没有则登记）
+
+        Args:
+            config: Buff 配置（dict / MappingProxyType，或按 TEMPLATE_FIELDS 排列的元组）
+        """
+        if isinstance(config, tuple):
+            fields = tuple(_thaw(value) for value in config)
+            # 旧存档的字段元组可能比现在短，缺的字段取缺省值
+            fields += tuple(default for _, default in TEMPLATE_DEFAULTS[len(fields):])
+        else:
+            fields = tuple(_thaw(config.get(field, default)) for field, default in TEMPLATE_DEFAULTS)
+
+        tid = int.from_bytes(blake2b(repr(fields).encode('utf-8'), digest_size=8).digest(), 'little')
+        while True:
+            template = cls._registry.get(tid)
+            if template is None:
+                template = cls._registry[tid] = cls(tid, fields)
+                return template
+            if template.fields == fields:
+                return template
+            # 哈希冲突：线性探测下一个 tid
+            tid = (tid + 1) & TID_MASK
+
+    @classmethod
+    def get(cls, tid):
+        return cls._registry.get(tid)
+
+    @classmethod
+    def relocate(cls, template, taken):
+        """
+        给模板换一个新的 tid（与持久化的模板表冲突时用）
+
+        原 tid 仍指向该模板，按内容 intern 照样能找到它。
+
+        Args:
+            taken (callable): tid -> 是否已被登记表之外的地方（如模板表）占用
+        """
+        tid = template.tid
+        while tid in cls._registry or taken(tid):
+            tid = (tid + 1) & TID_MASK
+        template.tid = tid
+        cls._registry[tid] = template
+
+    def __repr__(self):
+        return f"<BuffTemplate {self.name} {self.tid:016x}>"
+
+
+class Buff:
+    """
+    单个 Buff 实例
+
+    duration 由到期回合与所属容器的当前回合换算得出，
+    赋值时由容器重新登记到期时间。
+    """
+
+    __slots__ = ('id', 'template', 'source', 'stacks', 'last_tick', 'expires_at', 'owner')
+
+    def __init__(self, template, source=None, duration=3, stacks=1, last_tick=0):
+        self.id = next(_BUFF_IDS)
+        self.template = template
+        self.source = source
+        self.stacks = stacks
+        self.last_tick = last_tick
+        # 未放入容器时 expires_at 即剩余回合
+        self.expires_at = duration
+        self.owner = None
+
+    @classmethod
+    def from_dict(cls, data):
+        """由旧版 Buff 字典构造（旧 id 不沿用，重新编号）"""
+        return cls(
+            BuffTemplate.intern(data),
+            source=data.get('source'),
+            duration=data.get('duration', 3),
+            stacks=data.get('stacks', 1),
+            last_tick=data.get('last_tick', 0),
+        )
+
+    def __getattr__(self, key):
+        # 定义部分（name、effects、extra…）从模板读
+        if key in TEMPLATE_FIELDS:
+            return getattr(self.template, key)
+        raise AttributeError(key)
+
+    @property
+    def duration(self):
+        """剩余回合"""
+        return self.expires_at - (self.owner.round if self.owner is not None else 0)
+
+    @duration.setter
+    def duration(self, value):
+        if self.owner is not None:
+            self.owner.reschedule(self, value)
+        else:
+            self.expires_at = value
+
+    @property
+    def ticks(self):
+        """是否有需要回合触发的效果"""
+        return self.template.ticks
+
+    # ---------- 字典兼容接口 ----------
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def __repr__(self):
+        return f"<Buff {self.name} x{self.stacks} ({self.duration})>"
+
+
+class BuffContainer:
+    """
+    角色身上的所有 Buff（存放在 ndb.buffs）
+
+    round 是容器自己的回合计数，每次 advance() +1；
+    Buff 到期回合 = 放入/刷新时的 round + 持续回合。
+    """
+
+    __slots__ = ('round', 'dirty', '_by_id', '_by_name', '_buckets', '_expiry', '_seq')
+
+    def __init__(self, buffs=()):
+        self.round = 0
+        self.dirty = False      # 自上次持久化后是否有变化（见 buff_store.py）
+        self._by_id = {}        # buff_id -> Buff（保持加入顺序）
+        self._by_name = {}      # name -> Buff
+        self._buckets = {}      # trigger_on -> {buff_id: Buff}
+        self._expiry = []       # [(到期回合, 序号, Buff)]
+        self._seq = count()
+        for buff in buffs:
+            self.add(buff if isinstance(buff, Buff) else Buff.from_dict(buff))
+
+    # ========================================
+    # 增删
+    # ========================================
+
+    def add(self, buff):
+        """放入一个 Buff（buff.duration 为剩余回合）"""
+        duration = buff.duration
+        buff.owner = self
+        self._by_id[buff.id] = buff
+        self._by_name.setdefault(buff.name, buff)
+        if buff.ticks:
+            self._buckets.setdefault(buff.trigger_on, {})[buff.id] = buff
+        self.reschedule(buff, duration)
+        self.dirty = True
+        return buff
+
+    def remove(self, buff):
+        """取出一个 Buff，返回是否存在"""
+        if self._by_id.get(buff.id) is not buff:
+            return False
+
+        del self._by_id[buff.id]
+        if self._by_name.get(buff.name) is buff:
+            del self._by_name[buff.name]
+            # 同名的其它 Buff 顶上（只在恢复旧数据时可能出现）
+            for other in self._by_id.values():
+                if other.name == buff.name:
+                    self._by_name[buff.name] = other
+                    break
+        bucket = self._buckets.get(buff.trigger_on)
+        if bucket is not None:
+            bucket.pop(buff.id, None)
+
+        buff.expires_at = buff.duration
+        buff.owner = None
+        self.dirty = True
+        return True
+
+    def reschedule(self, buff, duration):
+        """重新登记到期时间（旧堆项留在堆里，弹出时按 expires_at 识别并丢弃）"""
+        buff.expires_at = self.round + duration
+        heapq.heappush(self._expiry, (buff.expires_at, next(self._seq), buff))
+        self.dirty = True
+
+    def advance(self):
+        """
+        回合 +1
+
+        Returns:
+            list: 本回合到期的 Buff（仍在容器中，由调用方移除）
+        """
+        self.round += 1
+        if self._by_id:
+            self.dirty = True
+        expired = []
+        heap = self._expiry
+        while heap and heap[0][0] <= self.round:
+            expires_at, _, buff = heapq.heappop(heap)
+            if buff.owner is self and buff.expires_at == expires_at and self._by_id.get(buff.id) is buff:
+                expired.append(buff)
+        return expired
+
+    # ========================================
+    # 查询
+    # ========================================
+
+    def get(self, buff_id):
+        return self._by_id.get(buff_id)
+
+    def find(self, name):
+        """按名称查找"""
+        return self._by_name.get(name)
+
+    def triggered(self, trigger_moment):
+        """在指定时机触发的 Buff（副本，遍历时可增删）"""
+        bucket = self._buckets.get(trigger_moment)
+        return list(bucket.values()) if bucket else []
+
+    def __iter__(self):
+        return iter(list(self._by_id.values()))
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __repr__(self):
+        return f"<BuffContainer round={self.round} {list(self._by_id.values())}>"
@@ -1,10 +1,16 @@
 """
 world/systems/buff_manager.py
 回合制Buff管理系统 - 修仙MUD专用
+
+Buff 存放在 ndb.buffs 的 BuffContainer 中（见 buff_container.py），
+按名称查找、按触发时机取 Buff、回合到期都不再扫描整个列表。
+Buff 的定义部分是共享的 BuffTemplate，每次施加只新建一个小的 Buff 实例。
 """
-import uuid
 from evennia.utils import logger
 from world.loaders.game_data import get_config
+from world.systems.buff_container import Buff, BuffContainer, BuffTemplate
+from world.systems.stat_engine import StatSheet
+from world.systems.buff_store import BuffStore
 
 class BuffManager:
     """
@@ -24,7 +30,7 @@ class BuffManager:
         
         Args:
             character: 目标角色
-            buff_config (dict): Buff配置
+            buff_config (BuffTemplate | dict): Buff模板，或Buff配置
                 {
                     'type': 'dot/buff/debuff/control',
                     'name': '中毒',
@@ -43,70 +49,49 @@ class BuffManager:
             duration: 持续回合数（覆盖配置）
         
         Returns:
-            str: Buff ID（用于追踪和移除）
+            int: Buff ID（用于追踪和移除）
         """
-        # 初始化buffs列表
-        if not hasattr(character.ndb, 'buffs'):
-            character.ndb.buffs = []
+        buffs = BuffManager._container(character)
         
-        buff_type = buff_config.get('type', 'buff')
-        buff_name = buff_config.get('name', '未命名效果')
-        max_stacks = buff_config.get('max_stacks', 1)
-        stack_mode = buff_config.get('stack_mode', 'refresh')  # add/refresh/replace
+        if isinstance(buff_config, BuffTemplate):
+            template = buff_config
+            duration = duration or 3
+        else:
+            template = BuffTemplate.intern(buff_config)
+            duration = duration or buff_config.get('duration', 3)
+        buff_name = template.name
         
         # 检查是否已存在同名Buff
-        existing = BuffManager._find_buff_by_name(character, buff_name)
+        existing = buffs.find(buff_name)
         
         if existing:
             # 处理叠加逻辑
-            if stack_mode == 'refresh':
+            if template.stack_mode == 'refresh':
                 # 刷新时长
-                existing['duration'] = duration or buff_config.get('duration', 3)
-                existing['last_tick'] = 0
+                existing.duration = duration
+                existing.last_tick = 0
                 character.msg(f"|y{buff_name} 效果刷新！|n")
-                return existing['id']
+                return existing.id
             
-            elif stack_mode == 'add':
+            elif template.stack_mode == 'add':
                 # 增加层数
-                if existing['stacks'] < max_stacks:
-                    existing['stacks'] += 1
-                    existing['duration'] = duration or buff_config.get('duration', 3)
-                    character.msg(f"|y{buff_name} 叠加到 {existing['stacks']} 层！|n")
+                if existing.stacks < template.max_stacks:
+                    existing.stacks += 1
+                    existing.duration = duration
+                    BuffManager._apply_stat_modifiers(character, existing, apply=True)
+                    character.msg(f"|y{buff_name} 叠加到 {existing.stacks} 层！|n")
                 else:
-                    existing['duration'] = duration or buff_config.get('duration', 3)
+                    existing.duration = duration
                     character.msg(f"|y{buff_name} 已达最大层数！|n")
-                return existing['id']
+                return existing.id
             
-            elif stack_mode == 'replace':
+            elif template.stack_mode == 'replace':
                 # 替换旧的
-                BuffManager.remove_buff(character, existing['id'])
-        
-        # 创建新Buff
-        buff_id = str(uuid.uuid4())[:8]
-        
-        new_buff = {
-            'id': buff_id,
-            'type': buff_type,
-            'name': buff_name,
-            'source': source,
-            'duration': duration or buff_config.get('duration', 3),
-            'stacks': buff_config.get('stacks', 1),
-            'max_stacks': max_stacks,
-            'stack_mode': stack_mode,
-            'effects': buff_config.get('effects', []),
-            'trigger_on': buff_config.get('trigger_on', 'turn_start'),
-            'tick_interval': buff_config.get('tick_interval', 1),
-            'last_tick': 0,  # 上次触发的回合
-            
-            # 可选：图标/描述
-            'icon': buff_config.get('icon', ''),
-            'desc': buff_config.get('desc', ''),
-            
-            # 额外数据（用于特殊效果）
-            'extra': buff_config.get('extra', {}),
-        }
+                BuffManager.remove_buff(character, existing.id)
         
-        character.ndb.buffs.append(new_buff)
+        # 创建新Buff（定义部分共用模板）
+        stacks = 1 if template is buff_config else buff_config.get('stacks', 1)
+        new_buff = buffs.add(Buff(template, source=source, duration=duration, stacks=stacks))
         
         # 显示消息
         BuffManager._show_buff_message(character, new_buff, 'add')
@@ -114,9 +99,9 @@ class BuffManager:
         # 如果是属性修改型Buff，立即应用
         BuffManager._apply_stat_modifiers(character, new_buff, apply=True)
         
-        logger.log_info(f"[Buff] {character.key} 获得 {buff_name} ({buff_id})")
+        logger.log_info(f"[Buff] {character.key} 获得 {buff_name} ({new_buff.id})")
         
-        return buff_id
+        return new_buff.id
     
     @staticmethod
     def remove_buff(character, buff_id):
@@ -125,29 +110,27 @@ class BuffManager:
         
         Args:
             character: 目标角色
-            buff_id (str): Buff ID
+            buff_id (int): Buff ID
         
         Returns:
             bool: 是否移除成功
         """
-        if not hasattr(character.ndb, 'buffs'):
+        buffs = BuffManager._container(character, create=False)
+        buff = buffs.get(buff_id) if buffs is not None else None
+        if buff is None:
             return False
         
-        for i, buff in enumerate(character.ndb.buffs):
-            if buff['id'] == buff_id:
-                # 移除属性修改
-                BuffManager._apply_stat_modifiers(character, buff, apply=False)
-                
-                # 显示消息
-                BuffManager._show_buff_message(character, buff, 'remove')
-                
-                # 删除
-                character.ndb.buffs.pop(i)
-                
-                logger.log_info(f"[Buff] {character.key} 失去 {buff['name']} ({buff_id})")
-                return True
-        
-        return False
+        # 移除属性修改
+        BuffManager._apply_stat_modifiers(character, buff, apply=False)
+        
+        # 显示消息
+        BuffManager._show_buff_message(character, buff, 'remove')
+        
+        # 删除
+        buffs.remove(buff)
+        
+        logger.log_info(f"[Buff] {character.key} 失去 {buff.name} ({buff_id})")
+        return True
     
     @staticmethod
     def tick_buffs(character, trigger_moment, combat_context=None):
@@ -159,22 +142,20 @@ class BuffManager:
             trigger_moment (str): 'turn_start' / 'turn_end' / 'on_hit' / 'on_damaged'
             combat_context (dict): 战斗上下文（可选）
         """
-        if not hasattr(character.ndb, 'buffs'):
+        buffs = BuffManager._container(character, create=False)
+        if not buffs:
             return
         
-        for buff in list(character.ndb.buffs):  # 复制列表，避免迭代时修改
-            # 检查触发时机
-            if buff['trigger_on'] != trigger_moment:
-                continue
-            
+        # 只取该时机的触发桶（纯属性修改的 Buff 不在桶里）
+        for buff in buffs.triggered(trigger_moment):
             # 检查触发间隔
-            tick_interval = buff.get('tick_interval', 1)
-            if buff['last_tick'] + tick_interval > 0:
-                buff['last_tick'] -= 1
+            tick_interval = buff.tick_interval or 1
+            if buff.last_tick + tick_interval > 0:
+                buff.last_tick -= 1
                 continue
             
             # 重置tick计数
-            buff['last_tick'] = tick_interval - 1
+            buff.last_tick = tick_interval - 1
             
             # 执行效果
             BuffManager._execute_buff_effects(character, buff, combat_context)
@@ -184,23 +165,18 @@ class BuffManager:
         """
         减少所有Buff的持续时间（每回合结束调用一次）
         
+        容器回合 +1，只从到期堆里取出已到期的 Buff
+        
         Args:
             character: 角色
         """
-        if not hasattr(character.ndb, 'buffs'):
+        buffs = BuffManager._container(character, create=False)
+        if not buffs:
             return
         
-        expired = []
-        
-        for buff in character.ndb.buffs:
-            buff['duration'] -= 1
-            
-            if buff['duration'] <= 0:
-                expired.append(buff['id'])
-        
         # 移除过期的Buff
-        for buff_id in expired:
-            BuffManager.remove_buff(character, buff_id)
+        for buff in buffs.advance():
+            BuffManager.remove_buff(character, buff.id)
     
     @staticmethod
     def clear_all_buffs(character, buff_type=None):
@@ -211,14 +187,15 @@ class BuffManager:
             character: 角色
             buff_type (str): 只清除特定类型（可选）'buff'/'debuff'/'dot'
         """
-        if not hasattr(character.ndb, 'buffs'):
+        buffs = BuffManager._container(character, create=False)
+        if not buffs:
             return
         
         to_remove = []
         
-        for buff in character.ndb.buffs:
-            if buff_type is None or buff['type'] == buff_type:
-                to_remove.append(buff['id'])
+        for buff in buffs:
+            if buff_type is None or buff.type == buff_type:
+                to_remove.append(buff.id)
         
         for buff_id in to_remove:
             BuffManager.remove_buff(character, buff_id)
@@ -257,15 +234,35 @@ class BuffManager:
     # ========================================
     
     @staticmethod
-    def _find_buff_by_name(character, buff_name):
-        """查找指定名称的Buff"""
-        if not hasattr(character.ndb, 'buffs'):
+    def _container(character, create=True):
+        """
+        角色的 Buff 容器
+        
+        ndb.buffs 仍是旧版列表（如 at_init 里的 []）时就地换成容器；
+        db.buff_state 里有保存的 Buff 时先还原
+        
+        Args:
+            create (bool): 没有 Buff 时是否新建空容器
+        """
+        # 下线/reload 前保存的 Buff 在第一次访问时还原
+        if getattr(character.ndb, 'buff_state', None) is None and hasattr(character, 'attributes'):
+            BuffStore.restore(character)
+        
+        buffs = getattr(character.ndb, 'buffs', None)
+        if isinstance(buffs, BuffContainer):
+            return buffs
+        if not buffs and not create:
             return None
         
-        for buff in character.ndb.buffs:
-            if buff['name'] == buff_name:
-                return buff
-        return None
+        buffs = BuffContainer(buffs or ())
+        character.ndb.buffs = buffs
+        return buffs
+    
+    @staticmethod
+    def _find_buff_by_name(character, buff_name):
+        """查找指定名称的Buff"""
+        buffs = BuffManager._container(character, create=False)
+        return buffs.find(buff_name) if buffs is not None else None
     
     @staticmethod
     def _execute_buff_effects(character, buff, combat_context):
@@ -287,6 +284,7 @@ class BuffManager:
             'attacker': attacker,
             'target': target,
             'is_buff_tick': True,
+            'rng': getattr(character.ndb, 'combat_rng', None),
         }
         
         # 应用层数倍率
@@ -313,21 +311,25 @@ class BuffManager:
         """
         应用/移除属性修改型Buff
         
+        修正记在属性表的 'buff:<id>' 来源下，重复应用是幂等的（层数变化后重新应用即可）
+        
         Args:
             character: 角色
             buff (dict): Buff数据
             apply (bool): True=应用, False=移除
         """
-        multiplier = 1 if apply else -1
-        stacks = buff.get('stacks', 1)
+        source = f"buff:{buff['id']}"
+        sheet = StatSheet.of(character)
+        
+        if not apply:
+            sheet.remove_source(source)
+            return
         
-        for effect in buff['effects']:
-            if effect['type'] == 'stat_mod':
-                stat_name = effect['stat']
-                value = effect['value'] * stacks * multiplier
-                
-                current = getattr(character.ndb, stat_name, 0) or 0
-                setattr(character.ndb, stat_name, current + value)
+        stat_mods = buff.template.stat_mods
+        if not stat_mods:
+            return
+        stacks = buff.stacks
+        sheet.set_source(source, {stat: value * stacks for stat, value in stat_mods.items()})
     
     @staticmethod
     def _show_buff_message(character, buff, action):
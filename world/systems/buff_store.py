@@ -0,0 +1,310 @@
+"""
+world/systems/buff_store.py
+Buff 的持久化 - 下线、reload 后不再丢失
+
+Buff 只存在 ndb.buffs 里，at_init 会清空。这里把 Buff 压成紧凑元组
+写进角色的 db.buff_state，上线时（at_post_puppet，或 reload 后第一次访问 Buff）
+再还原。
+
+角色状态:
+    ((模板ID, 层数, 剩余回合, tick计数, 施加者dbid), ...)
+
+技能冷却不在这里：冷却按战斗内出手序号计算，enter_combat 清零、leave_combat 删除，
+只在一场战斗里有意义；战斗中 reload 由战斗快照（combat_persistence.py）保留。
+旧格式 (Buff, 冷却) 读取时只取 Buff 部分。
+
+Buff 的定义部分是共享的 BuffTemplate（见 buff_container.py），模板ID 即其
+64 位内容哈希；模板表全服共用一份，每个模板一条 ServerConfig（buff_template:<tid>），
+新模板只追加写入自己那一条。角色身上只存引用，单个 Buff 约二三十字节。
+表里同一模板ID 存的是另一种定义时（哈希冲突），给新模板换一个空闲的ID，不覆盖旧的。
+启动时 prune_templates 删除已没有存档引用的模板（调整 Buff 数值后旧定义不会一直堆着）。
+
+只在内容变化时写库（Buff 容器带 dirty 标记，最终结果再与上次写入的比较）。
+"""
+from collections.abc import Mapping
+from evennia.utils import logger
+from world.systems.buff_container import Buff, BuffContainer, BuffTemplate
+
+TEMPLATE_PREFIX = 'buff_template:'
+
+# 旧格式：整张模板表存在一个键里（读到后拆成逐条）
+LEGACY_TEMPLATE_KEY = 'buff_templates'
+
+EMPTY_STATE = ()
+
+# 模板表: 模板ID -> 模板字段元组（None 表示尚未从 ServerConfig 读取）
+_TEMPLATES = None
+
+# 还没写入 ServerConfig 的模板: 模板ID -> 模板字段元组
+_UNSAVED = {}
+
+
+def _plain(value):
+    """ServerConfig 读出的值还原为普通 dict / list（与 BuffTemplate.fields 可比较）"""
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return tuple(_plain(item) for item in value)
+    if isinstance(value, (str, bytes)) or not hasattr(value, '__iter__'):
+        return value
+    return [_plain(item) for item in value]
+
+
+def _packed_buffs(state):
+    """db.buff_state -> 打包的 Buff（兼容旧格式 (Buff, 冷却)）"""
+    if not state:
+        return EMPTY_STATE
+    if len(state) == 2 and all(not part or isinstance(part[0], tuple) for part in state):
+        return tuple(state[0])
+    return tuple(state)
+
+
+def _conf_key(tid):
+    return f"{TEMPLATE_PREFIX}{tid:016x}"
+
+
+def _template_table():
+    global _TEMPLATES
+    if _TEMPLATES is None:
+        from evennia.server.models import ServerConfig
+        table = {}
+        for conf in ServerConfig.objects.filter(db_key__startswith=TEMPLATE_PREFIX):
+            table[int(conf.db_key[len(TEMPLATE_PREFIX):], 16)] = _plain(conf.value)
+
+        legacy = ServerConfig.objects.conf(LEGACY_TEMPLATE_KEY)
+        if legacy:
+            for tid, fields in dict(legacy).items():
+                if tid not in table:
+                    table[tid] = _UNSAVED[tid] = _plain(fields)
+        _TEMPLATES = table
+
+        if legacy:
+            BuffStore.flush_templates()
+            ServerConfig.objects.conf(LEGACY_TEMPLATE_KEY, delete=True)
+    return _TEMPLATES
+
+
+class BuffStore:
+    """Buff 的打包、保存与还原"""
+
+    # ========================================
+    # 模板
+    # ========================================
+
+    @staticmethod
+    def intern(buff):
+        """
+        登记 Buff 的模板，返回模板ID
+
+        Returns:
+            int: 64 位内容哈希（与模板表冲突时为换过的ID）
+        """
+        template = buff.template
+        table = _template_table()
+        stored = table.get(template.tid)
+        if stored == template.fields:
+            return template.tid
+
+        if stored is not None:
+            old_tid = template.tid
+            BuffTemplate.relocate(template, table.__contains__)
+            logger.log_warn(
+                f"[Buff] 模板ID {old_tid:016x} 冲突（{template.name}），改用 {template.tid:016x}"
+            )
+        table[template.tid] = _UNSAVED[template.tid] = template.fields
+        return template.tid
+
+    @staticmethod
+    def template(tid):
+        """按模板ID 取模板（本进程没有时从模板表重建），不存在返回 None"""
+        fields = _template_table().get(tid)
+        template = BuffTemplate.get(tid)
+        if template is not None and (fields is None or template.fields == fields):
+            return template
+        if fields is None:
+            return None
+        return BuffTemplate.intern(fields)
+
+    @staticmethod
+    def flush_templates():
+        """新登记的模板逐条写入 ServerConfig（已有的不重写）"""
+        if not _UNSAVED:
+            return
+        from evennia.server.models import ServerConfig
+        for tid, fields in list(_UNSAVED.items()):
+            ServerConfig.objects.conf(_conf_key(tid), fields)
+        _UNSAVED.clear()
+
+    @staticmethod
+    def prune_templates():
+        """
+        删除没有任何存档引用、本进程也没在用的模板（启动时调用）
+
+        引用来源是所有对象的 db.buff_state；本进程登记过的模板（技能效果当前的定义、
+        战斗快照恢复出来的 Buff）一律保留。
+
+        Returns:
+            int: 删除的模板数
+        """
+        from evennia.server.models import ServerConfig
+        from evennia.typeclasses.attributes import Attribute
+
+        table = _template_table()
+        referenced = set()
+        for attr in Attribute.objects.filter(db_key='buff_state', db_category__isnull=True).iterator():
+            try:
+                referenced.update(row[0] for row in _packed_buffs(attr.value))
+            except Exception as e:
+                # 读不出来的存档：保守起见本次不清理
+                logger.log_warn(f"[Buff] 读取 buff_state 失败，跳过模板清理: {e}")
+                return 0
+
+        stale = [tid for tid in table if tid not in referenced and BuffTemplate.get(tid) is None]
+        if not stale:
+            return 0
+
+        ServerConfig.objects.filter(db_key__in=[_conf_key(tid) for tid in stale]).delete()
+        for tid in stale:
+            del table[tid]
+            _UNSAVED.pop(tid, None)
+        logger.log_info(f"[Buff] 清理了 {len(stale)} 个不再被引用的模板，剩余 {len(table)} 个")
+        return len(stale)
+
+    # ========================================
+    # 保存
+    # ========================================
+
+    @staticmethod
+    def pack(character):
+        """
+        当前 Buff 的紧凑表示
+
+        Buff 容器没有变化时沿用上次打包的结果
+        """
+        ndb = character.ndb
+        buffs = getattr(ndb, 'buffs', None)
+
+        if isinstance(buffs, BuffContainer) and not buffs.dirty:
+            return getattr(ndb, 'buff_state', None) or EMPTY_STATE
+
+        packed_buffs = BuffStore.pack_buffs(buffs or ())
+        if isinstance(buffs, BuffContainer):
+            buffs.dirty = False
+        return packed_buffs
+
+    @staticmethod
+    def pack_buffs(buffs):
+        """Buff 列表 -> ((模板ID, 层数, 剩余回合, tick计数, 施加者dbid), ...)"""
+        return tuple(
+            (
+                BuffStore.intern(buff),
+                buff.stacks,
+                buff.duration,
+                buff.last_tick,
+                getattr(buff.source, 'id', None),
+            )
+            for buff in buffs
+        )
+
+    @staticmethod
+    def pending(character):
+        """
+        需要写库的 Buff 状态（没还原过或与上次写入相同时为 None）
+
+        打包会清掉 Buff 容器的 dirty 标记，拿到结果后应紧接着 save。
+        """
+        last = getattr(character.ndb, 'buff_state', None)
+        if last is None:
+            return None
+
+        state = BuffStore.pack(character)
+        return None if state == last else state
+
+    @staticmethod
+    def save(character, state=None):
+        """
+        把 Buff 写进 db.buff_state（只对已还原过的角色生效，内容不变不写）
+
+        Args:
+            state: pending 的结果（已经算过时传入，避免重复打包）
+
+        Returns:
+            bool: 是否写了数据库
+        """
+        if state is None:
+            state = BuffStore.pending(character)
+            if state is None:
+                return False
+
+        BuffStore.flush_templates()
+        if state == EMPTY_STATE:
+            character.attributes.remove('buff_state')
+        else:
+            character.db.buff_state = state
+        character.ndb.buff_state = state
+        return True
+
+    # ========================================
+    # 还原
+    # ========================================
+
+    @staticmethod
+    def restore(character):
+        """
+        从 db.buff_state 还原 Buff（每个角色只还原一次）
+
+        Buff 的属性修正重新施加到属性表，不显示获得消息。
+        """
+        ndb = character.ndb
+        if getattr(ndb, 'buff_state', None) is not None:
+            return
+
+        # 旧格式存档只取 Buff 部分（不单独改写，Buff 变化后保存时按新格式覆盖）
+        packed_buffs = _packed_buffs(getattr(character.db, 'buff_state', None))
+        ndb.buff_state = packed_buffs
+
+        if packed_buffs:
+            BuffStore.unpack_buffs(character, packed_buffs, BuffStore._fetch_source)
+            # 与 db.buff_state 一致，不需要回写
+            ndb.buffs.dirty = False
+
+    @staticmethod
+    def unpack_buffs(character, packed_buffs, fetch_source):
+        """
+        把打包的 Buff 放回角色的 Buff 容器，并重新施加属性修正
+
+        Args:
+            fetch_source (callable): 施加者 dbid -> 对象
+        """
+        from world.systems.buff_manager import BuffManager
+
+        buffs = getattr(character.ndb, 'buffs', None)
+        if not isinstance(buffs, BuffContainer):
+            buffs = BuffContainer(buffs or ())
+            character.ndb.buffs = buffs
+
+        for tid, stacks, remaining, last_tick, source_id in packed_buffs:
+            template = BuffStore.template(tid)
+            if template is None:
+                logger.log_warn(f"[Buff] {character.key} 的 Buff 模板 {tid:08x} 不存在，已丢弃")
+                continue
+            buff = buffs.add(Buff(
+                template,
+                source=fetch_source(source_id) if source_id is not None else None,
+                duration=remaining,
+                stacks=stacks,
+                last_tick=last_tick,
+            ))
+            BuffManager._apply_stat_modifiers(character, buff, apply=True)
+
+    @staticmethod
+    def adopt(character):
+        """
+        视为已还原（战斗快照已经写回了更新的 Buff），下次保存时覆盖 db.buff_state
+        """
+        character.ndb.buff_state = _packed_buffs(getattr(character.db, 'buff_state', None))
+
+    @staticmethod
+    def _fetch_source(source_id):
+        from evennia.objects.models import ObjectDB
+        return ObjectDB.objects.get_id(source_id)
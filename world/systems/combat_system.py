@@ -9,17 +9,42 @@
 4. 包含冷却减少逻辑(_reduce_cooldowns)
 """
 import random
-from twisted.internet import reactor
+from bisect import bisect_right
 from evennia.utils import logger
-from world.loaders.game_data import GAME_DATA, get_config, get_data
-from world.systems.skill_effects import apply_effect
+from world.loaders.game_data import GAME_DATA, get_config, get_data, config_float, config_int
+from world.systems.skill_effects import effect_pipeline, run_pipeline, run_area_pipeline
+from world.loaders import skill_loader
 from world.systems.quest_system import QUEST_SYSTEM
+from world.managers.combat_scheduler import COMBAT_SCHEDULER
+from world.systems.battle_text import CombatOutbox, TurnOutput, AreaOutput
+from world.systems.batch_rng import batch_random
+
+
+# 热路径上的配置项（导入时绑定，配置重载后自动更新）
+COUNTER_BASE_RATE = config_float('combat.counter.base_rate', 0.02)
+COUNTER_LEVEL_DIFF_BONUS = config_float('combat.counter.level_diff_bonus', 0.01)
+COUNTER_AGILITY_BONUS = config_float('combat.counter.agility_bonus', 0.001)
+COUNTER_MAX_RATE = config_float('combat.counter.max_rate', 0.50)
+CRITICAL_CHANCE = config_float('combat.critical_chance', 0.05)
+EXP_PER_ENEMY_LEVEL = config_int('combat.exp_per_enemy_level', 10)
+GOLD_PER_ENEMY_LEVEL = config_int('combat.gold_per_enemy_level', 5)
+AREA_MAX_TARGETS = config_int('combat.area.max_targets', 10)
+
+
+def combat_rng(char):
+    """角色所在战斗的随机数流（不在战斗中时退回全局 random）"""
+    return getattr(char.ndb, 'combat_rng', None) or random
+
 
 class CombatSystem:
     DEBUG_COMBAT = False
     """战斗系统"""
     
-    def __init__(self):
+    def __init__(self, scheduler=None):
+        # 所有延迟回调统一走战斗调度器（时间轮），不直接使用 reactor.callLater
+        self.scheduler = scheduler or COMBAT_SCHEDULER
+        # 战斗消息按调度 Tick 合并，每个接收者每 Tick 一次 msg
+        self.outbox = CombatOutbox(self.scheduler)
         self.turn_interval = get_config('combat.turn_interval', 2.0)
         self.max_rounds = get_config('combat.max_combat_rounds', 100)
     
@@ -30,34 +55,70 @@ class CombatSystem:
         if hasattr(target.ndb, 'in_combat') and target.ndb.in_combat:
             return False
         
-        attacker.ndb.in_combat = True
-        attacker.ndb.combat_target = target
-        attacker.ndb.combat_round = 0
-        attacker.ndb.skill_cooldowns = {}
+        self.enter_combat(attacker, target)
+        self.enter_combat(target, attacker)
+        
+        return True
+    
+    def start_group_combat(self, side_a, side_b):
+        """开始团战（任何一方有人已在战斗中则拒绝）"""
+        participants = list(side_a) + list(side_b)
+        if not side_a or not side_b:
+            return False
+        if any(getattr(char.ndb, 'in_combat', False) for char in participants):
+            return False
         
-        target.ndb.in_combat = True
-        target.ndb.combat_target = attacker
-        target.ndb.combat_round = 0
-        target.ndb.skill_cooldowns = {}
+        for char in side_a:
+            self.enter_combat(char, side_b[0])
+        for char in side_b:
+            self.enter_combat(char, side_a[0])
         
         return True
     
+    def enter_combat(self, char, target, rng=None):
+        """
+        初始化单个参战者的战斗状态
+        
+        rng 为整场战斗共用的随机数流（random.Random），所有判定都从它取数，
+        同一种子即可复现整场战斗
+        """
+        char.ndb.in_combat = True
+        char.ndb.combat_rng = rng
+        char.ndb.combat_target = target
+        char.ndb.combat_round = 0
+        char.ndb.combat_turn = 0
+        char.ndb.skill_cooldowns = {}
+    
+    def leave_combat(self, char):
+        """清理单个参战者的战斗状态"""
+        if hasattr(char.ndb, 'in_combat'):
+            char.ndb.in_combat = False
+        if hasattr(char.ndb, 'combat_target'):
+            del char.ndb.combat_target
+        if hasattr(char.ndb, 'combat_round'):
+            del char.ndb.combat_round
+        if hasattr(char.ndb, 'skill_cooldowns'):
+            del char.ndb.skill_cooldowns
+        if hasattr(char.ndb, 'combat_turn'):
+            del char.ndb.combat_turn
+        if hasattr(char.ndb, 'combat_rng'):
+            del char.ndb.combat_rng
+    
     def end_combat(self, char1, char2, winner=None):
         """结束战斗"""
         for char in [char1, char2]:
-            if hasattr(char.ndb, 'in_combat'):
-                char.ndb.in_combat = False
-            if hasattr(char.ndb, 'combat_target'):
-                del char.ndb.combat_target
-            if hasattr(char.ndb, 'combat_round'):
-                del char.ndb.combat_round
-            if hasattr(char.ndb, 'skill_cooldowns'):
-                del char.ndb.skill_cooldowns
+            self.leave_combat(char)
         
         logger.log_info(f"[战斗] {char1.key} vs {char2.key} 结束")
     
-    def use_skill(self, attacker, target, skill_key, skill_level=None, is_counter_attack=False, callback=None):
-        """使用技能"""
+    def use_skill(self, attacker, target, skill_key, skill_level=None, is_counter_attack=False, callback=None,
+                  targets=None):
+        """
+        使用技能
+        
+        Args:
+            targets (list): 范围技能的全部目标（见 area_targets），多于一个时一次施法结算所有目标
+        """
         # 1. 获取技能数据
         if skill_level is None:
             learned = getattr(attacker.db, 'learned_skills', {}) or {}
@@ -81,7 +142,11 @@ class CombatSystem:
         self._consume_skill_cost(attacker, skill_data)
         cooldown = skill_data.get('cooldown', 0)
         if cooldown > 0:
-            attacker.ndb.skill_cooldowns[skill_key] = cooldown
+            self._set_cooldown(attacker, skill_key, cooldown)
+        
+        if targets is not None and len(targets) > 1 and not is_counter_attack:
+            self._use_area_skill(attacker, targets, skill_data, callback)
+            return
             
         # 4. 初始化上下文 (Shared Context)
         # 这里的 total_damage 会在逻辑执行后更新，供文本读取
@@ -94,7 +159,8 @@ class CombatSystem:
             'reflect_damage': 0,
             'is_critical': False,
             'hit': False,
-            'countered': False
+            'countered': False,
+            'rng': combat_rng(attacker),
         }
 
         # 获取施法时间
@@ -116,10 +182,12 @@ class CombatSystem:
             counter_msg = f"|y{defender_name}身形一闪，格挡了攻击并准备反击！|n"
             
             # 调度施法文本
-            self._schedule_battle_texts(cast_texts, cast_time, attacker, target, context)
+            output = TurnOutput(attacker, target, context)
+            self._schedule_battle_texts(cast_texts, cast_time, output)
+            output.schedule(self.outbox)
             
             # 施法结束瞬间触发反击逻辑
-            reactor.callLater(
+            self.scheduler.call_later(
                 cast_time,
                 lambda: self._execute_counter_trigger(target, attacker, counter_msg, callback)
             )
@@ -155,16 +223,18 @@ class CombatSystem:
             else:
                 result_texts = skill_data.get('battle_text', {}).get('hit', [])
 
-        # 7. 统一调度所有文本
-        max_delay_cast = self._schedule_battle_texts(cast_texts, cast_time, attacker, target, context)
-        max_delay_result = self._schedule_battle_texts(result_texts, cast_time, attacker, target, context)
+        # 7. 统一调度所有文本（同一时刻到期的行合并成一次发送）
+        output = TurnOutput(attacker, target, context)
+        max_delay_cast = self._schedule_battle_texts(cast_texts, cast_time, output)
+        max_delay_result = self._schedule_battle_texts(result_texts, cast_time, output)
+        output.schedule(self.outbox)
         
         final_delay = max(cast_time, max_delay_cast, max_delay_result)
 
         # 8. 调度逻辑执行
         if trigger_execution:
             # 核心逻辑：伤害计算安排在 cast_time 执行
-            reactor.callLater(
+            self.scheduler.call_later(
                 cast_time,
                 self._execute_skill_logic,
                 attacker, target, skill_data, context, skill_key, callback, final_delay
@@ -173,38 +243,155 @@ class CombatSystem:
     def _execute_skill_logic(self, attacker, target, skill_data, context, skill_key, callback, final_delay):
         """执行技能的数值逻辑（计算伤害、应用效果）"""
         
+        # 团战中施法者可能在前摇期间被先手的人击倒，招式落空
+        if (getattr(attacker.ndb, 'hp', 1) or 0) <= 0:
+            if callback:
+                callback({'success': False, 'reason': '施法者已倒下'})
+            return
+        
         if not context['hit']:
             # 闪避情况
             remaining_time = max(0, final_delay - skill_data.get('cast_time', 0))
-            reactor.callLater(remaining_time + 0.5, lambda: callback({
+            self.scheduler.call_later(remaining_time + 0.5, lambda: callback({
                 'success': True, 'hit': False, 'countered': False
             }) if callback else None)
             return
 
         # 应用效果 (context['total_damage'] 在此处被更新)
-        for effect_config in skill_data.get('effects', []):
-            apply_effect(effect_config, attacker, target, context)
+        # 效果列表在数据加载时已编译成管线，这里只是顺序调用
+        run_pipeline(effect_pipeline(skill_data.get('effects')), attacker, target, context)
         
         # 计算剩余等待时间 (确保文本显示完成后再回调结束回合)
         wait_time = max(0, final_delay - skill_data.get('cast_time', 0))
         
-        reactor.callLater(
+        self.scheduler.call_later(
             wait_time + 0.5,
             lambda: callback({
                 'success': True,
                 'hit': True,
                 'damage': context.get('total_damage', 0),
+                'critical': context.get('is_critical', False),
                 'countered': False
             }) if callback else None
         )
 
+    # ================= 范围技能 =================
+    
+    @staticmethod
+    def is_area_skill(skill_data):
+        """是否范围技能（技能配置 target_type: area）"""
+        return bool(skill_data) and skill_data.get('target_type') == 'area'
+    
+    def area_targets(self, skill_data, target, enemies):
+        """
+        范围技能的目标列表：主目标在前，其余存活的敌人依次补上
+        
+        数量上限取技能的 max_targets，没有则取 combat.area.max_targets
+        """
+        limit = skill_data.get('max_targets') or AREA_MAX_TARGETS.value
+        targets = [target]
+        for enemy in enemies:
+            if len(targets) >= limit:
+                break
+            if enemy is not target and (getattr(enemy.ndb, 'hp', 0) or 0) > 0:
+                targets.append(enemy)
+        return targets
+    
+    def _use_area_skill(self, attacker, targets, skill_data, callback):
+        """
+        范围技能：一次施法结算所有目标
+        
+        命中、暴击、伤害浮动对所有目标一次批量抽取（目标很多时由 numpy 生成，
+        见 batch_rng.py），逐目标只剩扣血和挂 Buff；
+        文本合并成一整块发送，调度任务数与单体技能相同。范围技能不会被反击。
+        """
+        rng = combat_rng(attacker)
+        hits, crits = self._roll_area(attacker, targets, skill_data, rng)
+        
+        contexts = []
+        for target, hit, critical in zip(targets, hits, crits):
+            contexts.append({
+                'attacker': attacker,
+                'target': target,
+                'skill': skill_data,
+                'total_damage': 0,
+                'total_heal': 0,
+                'reflect_damage': 0,
+                'is_critical': critical,
+                'hit': hit,
+                'countered': False,
+                'rng': rng,
+                'outcome': 'critical' if critical else ('hit' if hit else 'dodge'),
+            })
+        
+        battle_text = skill_data.get('battle_text', {})
+        cast_time = skill_data.get('cast_time', 0)
+        
+        output = AreaOutput(attacker, contexts)
+        final_delay = max(cast_time, self._schedule_battle_texts(battle_text.get('cast', []), cast_time, output))
+        for outcome in ('hit', 'critical', 'dodge'):
+            if any(context['outcome'] == outcome for context in contexts):
+                texts = battle_text.get(outcome, []) or (battle_text.get('hit', []) if outcome == 'critical' else [])
+                final_delay = max(final_delay, self._schedule_battle_texts(texts, cast_time, output, outcome))
+        output.schedule(self.outbox)
+        
+        self.scheduler.call_later(
+            cast_time,
+            self._execute_area_logic,
+            attacker, contexts, skill_data, callback, final_delay
+        )
+    
+    def _roll_area(self, attacker, targets, skill_data, rng):
+        """
+        所有目标的命中、暴击一次抽取（规则同 _check_hit / _check_crit）
+        
+        Returns:
+            tuple: (命中列表, 暴击列表)
+        """
+        base_accuracy = skill_data.get('accuracy', 0.9)
+        final_accuracy = base_accuracy + sum(
+            (getattr(attacker.ndb, attr, 0) or 0) * ratio
+            for attr, ratio in skill_data.get('accuracy_scale', {}).items()
+        )
+        crit_chance = CRITICAL_CHANCE.value + skill_data.get('crit_bonus', 0)
+        
+        n = len(targets)
+        rolls = batch_random(rng, 2 * n)
+        hits = [
+            roll < max(0.05, final_accuracy - (getattr(target.ndb, 'dodge_rate', 0.1) or 0.1))
+            for target, roll in zip(targets, rolls)
+        ]
+        crits = [hit and roll < crit_chance for hit, roll in zip(hits, rolls[n:])]
+        return hits, crits
+    
+    def _execute_area_logic(self, attacker, contexts, skill_data, callback, final_delay):
+        """执行范围技能的数值逻辑（所有命中的目标一次结算）"""
+        if (getattr(attacker.ndb, 'hp', 1) or 0) <= 0:
+            if callback:
+                callback({'success': False, 'reason': '施法者已倒下'})
+            return
+        
+        hit_contexts = [context for context in contexts if context['hit']]
+        run_area_pipeline(effect_pipeline(skill_data.get('effects')), attacker, hit_contexts)
+        
+        wait_time = max(0, final_delay - skill_data.get('cast_time', 0))
+        result = {
+            'success': True,
+            'hit': bool(hit_contexts),
+            'damage': sum(context['total_damage'] for context in hit_contexts),
+            'critical': any(context['is_critical'] for context in hit_contexts),
+            'countered': False,
+            'targets': len(contexts),
+        }
+        self.scheduler.call_later(wait_time + 0.5, lambda: callback(result) if callback else None)
+
     def _execute_counter_trigger(self, defender, attacker, msg, original_callback):
         """执行反击触发"""
-        defender.msg(msg)
-        attacker.msg(msg)
+        self.outbox.send(defender, msg)
+        self.outbox.send(attacker, msg)
         
         # 0.5秒后执行具体的反击技能
-        reactor.callLater(
+        self.scheduler.call_later(
             0.5,
             self._execute_counter,
             defender,
@@ -216,9 +403,10 @@ class CombatSystem:
             }) if original_callback else None
         )
 
-    def _schedule_battle_texts(self, battle_texts, base_time, attacker, target, context):
+    def _schedule_battle_texts(self, battle_texts, base_time, output, outcome=None):
         """
-        调度战斗文本
+        把战斗文本按到期时间放进本次出手的文本缓冲（由调用方统一调度）
+        outcome 只用于范围技能（AreaOutput），标明这些行属于哪种结果
         关键修复：如果是结算阶段(100%或之后)的文本，强制增加微小延迟，
         确保先执行逻辑计算(damage不为0)，再执行文本格式化。
         """
@@ -240,55 +428,33 @@ class CombatSystem:
                 
             max_delay = max(max_delay, delay)
             
-            reactor.callLater(
-                delay,
-                self._send_deferred_message,
-                attacker,
-                target,
-                text_template,
-                context
-            )
+            if outcome is None:
+                output.add(delay, text_template)
+            else:
+                output.add(delay, text_template, outcome)
             
         return max_delay
 
-    def _send_deferred_message(self, attacker, target, template, context):
-        """延迟发送消息（在发送的一刻才读取 context 中的伤害值）"""
-        try:
-            fmt_data = {
-                'caster': attacker.name or attacker.key,
-                'target': target.name or target.key,
-                'damage': int(context.get('total_damage', 0)),
-                'heal': int(context.get('total_heal', 0)),
-                'reflect_damage': int(context.get('reflect_damage', 0)),
-            }
-            text = template.format(**fmt_data)
-            
-            attacker.msg(text)
-            if hasattr(target, 'msg'):
-                target.msg(text)
-        except Exception as e:
-            logger.log_err(f"[Combat] Message formatting error: {e}")
-
     # ================= 辅助判定逻辑 =================
 
     def _check_counter_before_hit(self, attacker, target, skill_data):
         """判定是否触发反击"""
-        base_rate = get_config('combat.counter.base_rate', 0.02)
+        base_rate = COUNTER_BASE_RATE.value
         skill_counter = skill_data.get('counter_chance', 0)
         target_counter = getattr(target.ndb, 'counter_rate', 0) or 0
         
         target_level = getattr(target.ndb, 'level', 1) or 1
         attacker_level = getattr(attacker.ndb, 'level', 1) or 1
-        level_bonus = (target_level - attacker_level) * get_config('combat.counter.level_diff_bonus', 0.01)
+        level_bonus = (target_level - attacker_level) * COUNTER_LEVEL_DIFF_BONUS.value
         
         target_agility = getattr(target.ndb, 'agility', 10) or 10
-        agility_bonus = target_agility * get_config('combat.counter.agility_bonus', 0.001)
+        agility_bonus = target_agility * COUNTER_AGILITY_BONUS.value
         
         total_rate = base_rate + skill_counter + target_counter + level_bonus + agility_bonus
-        max_rate = get_config('combat.counter.max_rate', 0.50)
+        max_rate = COUNTER_MAX_RATE.value
         final_rate = min(max(total_rate, 0), max_rate)
         
-        return random.random() < final_rate
+        return combat_rng(attacker).random() < final_rate
 
     def _check_hit(self, attacker, target, skill_data):
         """判定命中和暴击"""
@@ -304,7 +470,7 @@ class CombatSystem:
         dodge_rate = getattr(target.ndb, 'dodge_rate', 0.1) or 0.1
         
         hit_chance = max(0.05, final_accuracy - dodge_rate)
-        hit = random.random() < hit_chance
+        hit = combat_rng(attacker).random() < hit_chance
         
         if not hit:
             return {'hit': False, 'is_critical': False}
@@ -313,9 +479,9 @@ class CombatSystem:
 
     def _check_crit(self, attacker, skill_data):
         """判定暴击"""
-        base_crit = get_config('combat.critical_chance', 0.05)
+        base_crit = CRITICAL_CHANCE.value
         skill_crit_bonus = skill_data.get('crit_bonus', 0)
-        return random.random() < (base_crit + skill_crit_bonus)
+        return combat_rng(attacker).random() < (base_crit + skill_crit_bonus)
 
     def _execute_counter(self, defender, attacker, callback):
         """执行反击（100%命中）"""
@@ -342,36 +508,71 @@ class CombatSystem:
         )
     
     def _choose_counter_skill(self, character):
-        """选择反击技能"""
-        active_skills = character.get_active_skills() if hasattr(character, 'get_active_skills') else []
+        """选择反击技能（与普通出招共用权重表）"""
+        return self.pick_skill(character, combat_rng(character))
+    
+    def pick_skill(self, character, rng=None):
+        """
+        按权重选一个不在冷却中的技能（此方法被 CombatManager 调用）
         
-        if not active_skills:
-            return ('basic_attack', 1)
+        在缓存的累计权重表上 bisect 一次；抽到冷却中的技能就重抽
+        （拒绝采样，结果分布与"只在可用技能里按权重抽"相同），
+        连续落空几次再退回线性筛选。
         
-        available = []
-        weights = []
+        Returns:
+            tuple: (skill_key, skill_level)
+        """
+        _, skills, cumulative, total = self._skill_table(character)
         
-        for skill_key, skill_level in active_skills:
-            # 检查冷却
-            if character.ndb.skill_cooldowns.get(skill_key, 0) > 0:
-                continue
+        if skills and total > 0:
+            rng = rng or random
+            cooldowns = getattr(character.ndb, 'skill_cooldowns', None) or {}
+            turn = getattr(character.ndb, 'combat_turn', 0) or 0
             
-            skill_data = get_data('skills', skill_key)
-            if not skill_data:
-                continue
+            for _ in range(4):
+                skill_key, skill_level = skills[bisect_right(cumulative, rng.random() * total)]
+                if cooldowns.get(skill_key, 0) <= turn:
+                    return skill_key, skill_level
             
-            weight = skill_data.get('counter_weight', 1)
-            available.append((skill_key, skill_level))
-            weights.append(weight)
+            available = [entry for entry in skills if cooldowns.get(entry[0], 0) <= turn]
+            if available:
+                return self._choose_skill_weighted(available, rng)
         
-        if not available:
-            return ('basic_attack', 1)
+        learned = getattr(character.db, 'learned_skills', None) or {}
+        return 'basic_attack', learned.get('basic_attack', 1)
+    
+    def _skill_table(self, character):
+        """
+        出招权重表，缓存在 ndb.skill_table
+        
+        只在技能组合变化（equip_skill / unequip_skill / upgrade_skill 会清掉缓存）
+        或技能数据重载后重建。
         
-        return random.choices(available, weights=weights, k=1)[0]
+        Returns:
+            tuple: (数据版本, ((skill_key, level), ...), 累计权重列表, 总权重)
+        """
+        table = getattr(character.ndb, 'skill_table', None)
+        if table is not None and table[0] == skill_loader.SKILL_DATA_VERSION:
+            return table
+        
+        skills = tuple(character.get_active_skills()) if hasattr(character, 'get_active_skills') else ()
+        cumulative = []
+        total = 0
+        for skill_key, skill_level in skills:
+            skill_data = get_data('skills', skill_key)
+            total += skill_data.get('counter_weight', 1) if skill_data else 1
+            cumulative.append(total)
+        
+        table = (skill_loader.SKILL_DATA_VERSION, skills, cumulative, total)
+        character.ndb.skill_table = table
+        return table
     
-    def _choose_skill_weighted(self, available_skills):
+    def _choose_skill_weighted(self, available_skills, rng=None):
         """
-        按权重选择技能（此方法被 CombatManager 调用）
+        按权重选择技能（权重表抽样多次落空时的后备）
+        
+        Args:
+            rng: 战斗的随机数流（默认全局 random）
         """
         if not available_skills:
             return ('basic_attack', 1)
@@ -385,12 +586,12 @@ class CombatSystem:
                 weight = 1
             weights.append(weight)
         
-        chosen = random.choices(available_skills, weights=weights, k=1)[0]
+        chosen = (rng or random).choices(available_skills, weights=weights, k=1)[0]
         return chosen
     
     def _check_skill_usable(self, attacker, skill_data, skill_key):
         """检查技能是否可用"""
-        cooldown_remaining = attacker.ndb.skill_cooldowns.get(skill_key, 0)
+        cooldown_remaining = self.cooldown_remaining(attacker, skill_key)
         if cooldown_remaining > 0:
             return False, f"技能冷却中（剩余{cooldown_remaining}回合）"
         
@@ -414,20 +615,48 @@ class CombatSystem:
         if cost_hp > 0:
             attacker.ndb.hp = max(1, attacker.ndb.hp - cost_hp)
     
-    def _reduce_cooldowns(self, character):
-        """减少技能冷却（此方法被 CombatManager 调用）"""
-        if not hasattr(character.ndb, 'skill_cooldowns'):
+    # ================= 冷却（按出手序号打戳） =================
+    
+    def _advance_turn(self, character):
+        """
+        本人出手序号 +1（此方法被 CombatManager 调用）
+        
+        冷却记录的是"第几次出手时就绪"，推进序号即完成冷却，不再逐个递减
+        """
+        character.ndb.combat_turn = (getattr(character.ndb, 'combat_turn', 0) or 0) + 1
+    
+    def _set_cooldown(self, character, skill_key, cooldown):
+        """技能进入冷却：记下就绪时的出手序号"""
+        if getattr(character.ndb, 'skill_cooldowns', None) is None:
             character.ndb.skill_cooldowns = {}
+        turn = getattr(character.ndb, 'combat_turn', 0) or 0
+        character.ndb.skill_cooldowns[skill_key] = turn + cooldown
+    
+    @staticmethod
+    def cooldown_remaining(character, skill_key):
+        """技能剩余冷却回合"""
+        ready_at = (getattr(character.ndb, 'skill_cooldowns', None) or {}).get(skill_key, 0)
+        return max(0, ready_at - (getattr(character.ndb, 'combat_turn', 0) or 0))
+    
+    @staticmethod
+    def remaining_cooldowns(character):
+        """
+        所有仍在冷却中的技能（快照、回放日志用）
         
-        for skill_key in list(character.ndb.skill_cooldowns.keys()):
-            character.ndb.skill_cooldowns[skill_key] -= 1
-            if character.ndb.skill_cooldowns[skill_key] <= 0:
-                del character.ndb.skill_cooldowns[skill_key]
+        Returns:
+            dict: {skill_key: 剩余回合}，恢复时配合出手序号 0 直接写回
+        """
+        turn = getattr(character.ndb, 'combat_turn', 0) or 0
+        return {
+            skill_key: ready_at - turn
+            for skill_key, ready_at in (getattr(character.ndb, 'skill_cooldowns', None) or {}).items()
+            if ready_at > turn
+        }
     
     def calculate_combat_rewards(self, winner, loser):
         """计算战斗奖励"""
-        exp_per_level = get_config('combat.exp_per_enemy_level', 10)
-        gold_per_level = get_config('combat.gold_per_enemy_level', 5)
+        exp_per_level = EXP_PER_ENEMY_LEVEL.value
+        gold_per_level = GOLD_PER_ENEMY_LEVEL.value
         
         loser_level = getattr(loser.ndb, 'level', 1)
         
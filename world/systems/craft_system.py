@@ -158,7 +158,7 @@ class CraftSystem:
             return False, "生成装备失败", None
         
         # 应用继承的词条（限制数量）
-        max_affixes = new_equipment.db.template.get('affix_slots', 3)
+        max_affixes = new_equipment.template.get('affix_slots', 3)
         new_equipment.db.affixes = inherited_affixes[:max_affixes]
         
         # 删除源装备
@@ -182,7 +182,7 @@ class CraftSystem:
         """
         # 检查是否已满级
         current_level = equipment.db.enhance_level or 0
-        max_level = equipment.db.template.get('enhance_max', 15)
+        max_level = equipment.template.get('enhance_max', 15)
         
         if current_level >= max_level:
             return False, "已达到最高强化等级"
@@ -302,9 +302,8 @@ class EquipmentSystem:
             location=location
         )
         
-        # 存储模板数据
+        # 只存物品ID，模板按ID从 GAME_DATA 取（UniqueItem.template）
         equipment.db.item_key = item_key
-        equipment.db.template = template
         
         # 初始化属性
         equipment.db.enhance_level = 0
@@ -7,6 +7,7 @@ world/systems/item_system.py
 2. ItemSystem: 物品查询与合成逻辑
 """
 from world.loaders.game_data import GAME_DATA
+from world.loaders.data_index import find_item_key, items_in_category, search_item_keys
 from evennia.utils import logger
 
 
@@ -101,11 +102,7 @@ class ItemSystem:
             dict: {item_key: template}
         """
         all_items = GAME_DATA.get('items', {})
-        return {
-            key: template 
-            for key, template in all_items.items() 
-            if template.get('category') == category
-        }
+        return {key: all_items[key] for key in items_in_category(category)}
     
     def search_items(self, keyword):
         """
@@ -118,13 +115,7 @@ class ItemSystem:
             dict: {item_key: template}
         """
         all_items = GAME_DATA.get('items', {})
-        keyword_lower = keyword.lower()
-        
-        return {
-            key: template 
-            for key, template in all_items.items() 
-            if keyword_lower in template.get('name', '').lower() or keyword_lower in key.lower()
-        }
+        return {key: all_items[key] for key in search_item_keys(keyword)}
     
     def can_use_item(self, character, item_key):
         """
@@ -158,12 +149,14 @@ class ItemSystem:
         
         Args:
             character: 角色对象
-            item_key: 物品ID
+            item_key: 物品ID（也可以是物品名称或别名）
             amount: 使用数量
         
         Returns:
             bool: 是否成功
         """
+        item_key = find_item_key(item_key) or item_key
+        
         # 检查是否可以使用
         can_use, reason = self.can_use_item(character, item_key)
         if not can_use:
@@ -1,7 +1,8 @@
 """
 任务系统核心
 """
-from world.loaders.game_data import GAME_DATA
+from world.loaders.game_data import GAME_DATA, thaw
+from world.loaders.data_index import quests_finished_by, quests_given_by, quests_with_objective
 from world.systems.quest_objectives import get_objective_handler
 from evennia.utils import logger
 import datetime
@@ -98,7 +99,7 @@ class QuestSystem:
         # 创建任务实例
         quest_instance = {
             'quest_id': quest_id,
-            'objectives': [obj.copy() for obj in quest_data.get('objectives', [])],
+            'objectives': thaw(quest_data.get('objectives', [])),
             'started_at': datetime.datetime.now().isoformat()
         }
         
@@ -137,6 +138,10 @@ class QuestSystem:
         if not hasattr(character.db, 'quests'):
             return
         
+        # 没有任何任务以此为目标
+        if not quests_with_objective('kill', target_name):
+            return
+        
         active_quests = character.db.quests.get('active', [])
         
         for quest_instance in active_quests:
@@ -175,6 +180,10 @@ class QuestSystem:
         if not hasattr(character.db, 'quests'):
             return
         
+        # 没有任何任务以此为目标
+        if not quests_with_objective('collect', item_name):
+            return
+        
         active_quests = character.db.quests.get('active', [])
         
         for quest_instance in active_quests:
@@ -209,6 +218,10 @@ class QuestSystem:
         if not hasattr(character.db, 'quests'):
             return
         
+        # 没有任何任务以此为目标
+        if not quests_with_objective('talk', npc_name):
+            return
+        
         active_quests = character.db.quests.get('active', [])
         
         for quest_instance in active_quests:
@@ -240,6 +253,10 @@ class QuestSystem:
         if not hasattr(character.db, 'quests'):
             return
         
+        # 没有任何任务以此为目标
+        if not quests_with_objective('explore', location_key):
+            return
+        
         active_quests = character.db.quests.get('active', [])
         
         for quest_instance in active_quests:
@@ -435,13 +452,10 @@ class QuestSystem:
         """
         available = []
         
-        for quest_id, quest_data in GAME_DATA['quests'].items():
-            # 检查NPC
-            if npc_name:
-                quest_giver = quest_data.get('quest_giver')
-                if quest_giver != npc_name:
-                    continue
-            
+        # 指定NPC时只看该NPC发布的任务
+        quest_ids = quests_given_by(npc_name) if npc_name else GAME_DATA['quests']
+        
+        for quest_id in quest_ids:
             # 检查是否可接取
             can_accept, _ = self.can_accept_quest(character, quest_id)
             if can_accept:
@@ -462,19 +476,20 @@ class QuestSystem:
         completable = []
         active_quests = character.db.quests.get('active', [])
         
+        # 指定NPC时只看在该NPC处交付的任务
+        finishable = quests_finished_by(npc_name) if npc_name else None
+        if finishable == ():
+            return completable
+        
         for quest_instance in active_quests:
             quest_id = quest_instance['quest_id']
-            quest_data = GAME_DATA['quests'].get(quest_id)
+            if finishable is not None and quest_id not in finishable:
+                continue
             
+            quest_data = GAME_DATA['quests'].get(quest_id)
             if not quest_data:
                 continue
             
-            # 检查NPC
-            if npc_name:
-                finisher = quest_data.get('quest_finisher')
-                if finisher != npc_name:
-                    continue
-            
             # 检查是否完成
             if self._check_quest_complete(quest_instance, quest_data):
                 completable.append(quest_id)
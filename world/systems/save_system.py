@@ -2,8 +2,13 @@
 """
 角色存档系统
 支持: 自动存档、手动存档、配置化开关
-"""
 
+自动存档不在一个 tick 里存完所有人：每到存档间隔，AUTO_SAVER 从在线会话里
+取出角色排成一轮，分成小批摊到间隔里执行（见 AutoSaver）。
+"""
+import time
+from collections import deque
+from math import ceil
 from world.loaders.game_data import get_config
 from evennia.utils import logger
 
@@ -27,7 +32,8 @@ class SaveSystem:
             return False
         
         try:
-            character._save_to_db()
+            rows, size = character._save_to_db() or (0, 0)
+            character.ndb.save_dirty = False
             
             # 记录日志
             if get_config('game.save_system.save_log_enabled', True):
@@ -38,7 +44,8 @@ class SaveSystem:
                         f"[存档] {character.key} - "
                         f"境界:{character.ndb.realm} "
                         f"等级:{character.ndb.level} "
-                        f"经验:{character.ndb.exp}"
+                        f"经验:{character.ndb.exp} "
+                        f"写入:{rows}行/{size}字节"
                     )
                 else:
                     logger.log_info(f"[存档] {character.key}")
@@ -49,34 +56,57 @@ class SaveSystem:
             logger.log_err(f"[存档失败] {character.key}: {e}")
             return False
     
+    @staticmethod
+    def online_characters():
+        """
+        在线（被操控中）的角色，按会话列表取，不查数据库
+        
+        Returns:
+            list: 角色对象（同一角色多个会话只出现一次）
+        """
+        from evennia import SESSION_HANDLER
+        
+        characters = {}
+        for session in SESSION_HANDLER.get_sessions():
+            puppet = getattr(session, 'puppet', None)
+            if puppet is not None and hasattr(puppet, '_save_to_db'):
+                characters[puppet.id] = puppet
+        return list(characters.values())
+    
     @staticmethod
     def save_all_online():
         """
-        保存所有在线角色
+        立即保存所有在线角色（同步执行，自动存档走 AUTO_SAVER 分批）
         
         Returns:
             tuple: (成功数, 总数)
         """
-        from evennia import search_object
-        
-        # 获取所有在线角色
-        characters = search_object(typeclass="typeclasses.characters.Character")
+        characters = SaveSystem.online_characters()
         
         success_count = 0
-        total_count = 0
+        total_count = len(characters)
         
         for char in characters:
-            # 检查是否在线
-            if char.sessions.all():
-                total_count += 1
-                if SaveSystem.save_character(char):
-                    success_count += 1
+            if SaveSystem.save_character(char):
+                success_count += 1
         
         if total_count > 0:
             logger.log_info(f"[批量存档] {success_count}/{total_count} 个角色")
         
         return success_count, total_count
     
+    @staticmethod
+    def mark_dirty(character):
+        """标记角色有未落库的变化，下一轮自动存档优先保存"""
+        character.ndb.save_dirty = True
+    
+    @staticmethod
+    def is_dirty(character):
+        """是否被标记过，或 Buff 有未保存的变化"""
+        if getattr(character.ndb, 'save_dirty', False):
+            return True
+        return getattr(getattr(character.ndb, 'buffs', None), 'dirty', False)
+    
     @staticmethod
     def should_save_on_event(event_type):
         """
@@ -103,17 +133,207 @@ class SaveSystem:
         return get_config(config_key, True)
 
 
+# ============================================
+# 自动存档调度
+# ============================================
+
+class AutoSaver:
+    """
+    分批自动存档
+    
+    每轮开始时从会话列表取出在线角色（有未保存变化的排在前面），
+    每批存 auto_save_batch 个，批次间隔 = 存档间隔 × auto_save_spread / 批数，
+    这样一轮存档均匀摊开，不会在一个 tick 里集中卡顿。
+    
+    负载高时退避：单批耗时或定时器的迟到时间超过 auto_save_budget_ms，
+    批次间隔翻倍（最多 auto_save_max_backoff 倍），之后每批正常就减半恢复。
+    上一轮还没存完时新一轮开始，只把新上线的角色补进队列。
+    
+    Args:
+        clock (callable): 时间源，默认 time.monotonic
+        call_later (callable): call_later(秒, 函数) -> 可 cancel 的句柄，默认 reactor.callLater
+    """
+    
+    def __init__(self, clock=None, call_later=None):
+        self.clock = clock or time.monotonic
+        self.call_later = call_later
+        
+        self._queue = deque()
+        self._queued = set()
+        self._call = None
+        self._due = None
+        self._delay = 0
+        self._backoff = 1
+        self._round = None
+        self.batch_size = 8
+        self.budget = 0.05
+        self.max_backoff = 8
+        self._reset_stats()
+    
+    def _reset_stats(self):
+        self.stats = {
+            'rounds': 0, 'batches': 0, 'saved': 0, 'failed': 0, 'skipped': 0, 'rows': 0,
+            'batch_last': 0.0, 'batch_total': 0.0, 'batch_max': 0.0,
+            'lag_max': 0.0, 'backoffs': 0, 'round_last': 0.0,
+        }
+    
+    # ========================================
+    # 对外接口
+    # ========================================
+    
+    def start_round(self, interval=None):
+        """
+        开始一轮存档（自动存档 Ticker 每个间隔调用一次）
+        
+        Returns:
+            int: 队列中等待保存的角色数
+        """
+        if interval is None:
+            interval = get_config('game.save_system.auto_save_interval', 300)
+        self.batch_size = max(1, int(get_config('game.save_system.auto_save_batch', 8)))
+        self.budget = get_config('game.save_system.auto_save_budget_ms', 50) / 1000
+        self.max_backoff = max(1, get_config('game.save_system.auto_save_max_backoff', 8))
+        
+        characters = [char for char in SaveSystem.online_characters() if char.id not in self._queued]
+        self._queued.update(char.id for char in characters)
+        
+        # 有未保存变化的角色排到最前（包括上一轮剩下的）
+        self._queue = deque(sorted(
+            list(self._queue) + characters, key=lambda char: not SaveSystem.is_dirty(char)
+        ))
+        
+        batches = ceil(len(self._queue) / self.batch_size)
+        spread = get_config('game.save_system.auto_save_spread', 0.5)
+        self._delay = interval * spread / batches if batches else 0
+        
+        if self._round is None:
+            self._round = {'started': self.clock(), 'saved': 0, 'total': 0, 'rows': 0, 'batches': 0}
+            self.stats['rounds'] += 1
+        self._round['total'] += len(characters)
+        
+        if self._queue and self._call is None:
+            self._schedule(0)
+        return len(self._queue)
+    
+    def pending(self):
+        """等待保存的角色数"""
+        return len(self._queue)
+    
+    def stop(self):
+        """取消本轮剩下的存档"""
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        self._queue.clear()
+        self._queued.clear()
+        self._round = None
+    
+    def get_stats(self):
+        """
+        调度统计
+        
+        Returns:
+            dict: 轮数、批数、保存数、写入行数、单批耗时与定时器迟到（毫秒）、当前退避倍数
+        """
+        stats = dict(self.stats)
+        stats['batch_avg'] = stats.pop('batch_total') / stats['batches'] if stats['batches'] else 0.0
+        for key in ('batch_last', 'batch_avg', 'batch_max', 'lag_max', 'round_last'):
+            stats[key + '_ms'] = round(stats.pop(key) * 1000, 2)
+        stats['pending'] = len(self._queue)
+        stats['backoff'] = self._backoff
+        stats['delay'] = round(self._delay * self._backoff, 3)
+        return stats
+    
+    def reset_stats(self):
+        """清空统计（不影响进行中的一轮）"""
+        self._reset_stats()
+    
+    # ========================================
+    # 内部方法
+    # ========================================
+    
+    def _schedule(self, delay):
+        call_later = self.call_later
+        if call_later is None:
+            from twisted.internet import reactor
+            call_later = reactor.callLater
+        self._due = self.clock() + delay
+        self._call = call_later(delay, self._run_batch)
+    
+    def _run_batch(self):
+        """存一批角色，安排下一批"""
+        from world.systems.attr_store import SAVE_STATS
+        
+        self._call = None
+        stats = self.stats
+        lag = max(0.0, self.clock() - self._due)
+        rows_before = SAVE_STATS['rows']
+        started = time.perf_counter()
+        
+        saved = 0
+        for _ in range(min(self.batch_size, len(self._queue))):
+            char = self._queue.popleft()
+            self._queued.discard(char.id)
+            # 排队期间下线的角色已在下线时保存过
+            if not char.pk or not char.sessions.count():
+                stats['skipped'] += 1
+                continue
+            if SaveSystem.save_character(char):
+                saved += 1
+            else:
+                stats['failed'] += 1
+        
+        elapsed = time.perf_counter() - started
+        rows = SAVE_STATS['rows'] - rows_before
+        
+        stats['batches'] += 1
+        stats['saved'] += saved
+        stats['rows'] += rows
+        stats['batch_last'] = elapsed
+        stats['batch_total'] += elapsed
+        stats['batch_max'] = max(stats['batch_max'], elapsed)
+        stats['lag_max'] = max(stats['lag_max'], lag)
+        
+        # 负载高（本批太慢或定时器迟到）时拉长间隔，正常后逐步恢复
+        if elapsed > self.budget or lag > self.budget:
+            self._backoff = min(self._backoff * 2, self.max_backoff)
+            stats['backoffs'] += 1
+        else:
+            self._backoff = max(1, self._backoff // 2)
+        
+        current = self._round
+        current['saved'] += saved
+        current['rows'] += rows
+        current['batches'] += 1
+        
+        if self._queue:
+            self._schedule(self._delay * self._backoff)
+            return
+        
+        duration = self.clock() - current['started']
+        stats['round_last'] = duration
+        self._round = None
+        if current['total'] > 0:
+            logger.log_info(
+                f"[批量存档] {current['saved']}/{current['total']} 个角色, "
+                f"写入 {current['rows']} 行, 分 {current['batches']} 批, 用时 {duration:.1f}s"
+            )
+
+
+AUTO_SAVER = AutoSaver()
+
+
 # ============================================
 # 自动存档 Ticker (服务器启动时注册)
 # ============================================
 
 def auto_save_tick(*args, **kwargs):
-    """自动存档回调函数"""
+    """自动存档回调函数（开始新一轮分批存档）"""
     # 检查是否启用
     if not get_config('game.save_system.auto_save_enabled', True):
         return
     
-    SaveSystem.save_all_online()
+    AUTO_SAVER.start_round()
 
 
 def start_auto_save():
@@ -148,5 +368,6 @@ def stop_auto_save():
         callback=auto_save_tick,
         idstring="auto_save_characters"
     )
+    AUTO_SAVER.stop()
     
     logger.log_info("[存档系统] 自动存档已停止")
\ No newline at end of file
@@ -1,7 +1,40 @@
-"""技能效果插件注册中心"""
+"""
+技能效果插件注册中心
+
+效果有两种注册方式：
+- register_effect: 普通处理函数 handler(config, attacker, target, context)
+- register_compiled: 编译函数 compile(config) -> step(attacker, target, context)，
+  参数在编译时读好绑定成局部变量，施法时不再逐个 config.get；
+  只作用于施法者的 step 设 on_self = True，范围技能每次施法只执行一次
+
+技能数据加载后，每个技能等级的 effects 预编译成 (效果类型, step, 计时) 元组
+（见 compile_skill_pipelines），出招时 run_pipeline 顺序执行即可；
+范围技能用 run_area_pipeline 一次结算所有目标。
+每种效果的调用次数和累计耗时记在 EFFECT_STATS（xx effects 查看）。
+"""
+from time import perf_counter
+from evennia.utils import logger
+from world.systems.buff_container import BuffTemplate
+from world.systems.buff_manager import BuffManager
 
 EFFECT_REGISTRY = {}
 
+# 可编译的效果: effect_type -> compile(config)
+EFFECT_COMPILERS = {}
+
+# Buff 类效果: effect_type -> 把效果配置翻译成 Buff 定义的函数
+BUFF_BUILDERS = {}
+
+# 效果耗时: effect_type -> [调用次数, 累计秒数]（列表原地累加，编译好的管线直接持有）
+EFFECT_STATS = {}
+
+# 预编译的效果管线: id(effects) -> (effects, pipeline)
+# effects 是 get_skill_at_level 缓存的只读元组，同时保存引用防止 id 被复用
+_PIPELINES = {}
+
+# 已经报过的未知效果类型（每种只报一次）
+_UNKNOWN = set()
+
 def register_effect(effect_type):
     """注册效果"""
     def decorator(func):
@@ -9,22 +42,209 @@ def register_effect(effect_type):
         return func
     return decorator
 
+def register_compiled(effect_type):
+    """
+    注册可编译的效果
+
+    被装饰的函数接收效果配置，返回 step(attacker, target, context)。
+    同时注册同名的普通处理函数（现编译现执行），apply_effect 照常可用。
+    """
+    def decorator(compile_func):
+        EFFECT_COMPILERS[effect_type] = compile_func
+
+        def handler(config, attacker, target, context):
+            return compile_func(config)(attacker, target, context)
+
+        handler.__doc__ = compile_func.__doc__
+        EFFECT_REGISTRY[effect_type] = handler
+        return compile_func
+    return decorator
+
+def register_buff(effect_type, duration=3, on_self=False):
+    """
+    注册 Buff 类效果
+
+    被装饰的函数把效果配置翻译成 Buff 定义（dict），编译时生成共享模板；
+    执行时把模板挂到目标身上（on_self 时挂到施法者身上）。
+
+    Args:
+        duration: 配置里没写 duration 时的持续回合数
+        on_self: 是否作用于施法者
+    """
+    def decorator(build):
+        BUFF_BUILDERS[effect_type] = build
+
+        def compile_buff(config):
+            template = buff_template(config)
+            buff_duration = config.get('duration', duration)
+            result = {'type': effect_type, 'name': template.name}
+
+            def apply_buff(attacker, target, context):
+                BuffManager.add_buff(attacker if on_self else target, template, attacker, buff_duration)
+                return result
+            apply_buff.on_self = on_self
+            return apply_buff
+
+        compile_buff.__doc__ = build.__doc__
+        register_compiled(effect_type)(compile_buff)
+        return build
+    return decorator
+
+def buff_template(config):
+    """效果配置对应的 Buff 模板"""
+    return BuffTemplate.intern(BUFF_BUILDERS[config['type']](config))
+
 def apply_effect(effect_config, attacker, target, context):
     """应用效果"""
     effect_type = effect_config.get('type')
-    
+
     if not effect_type:
         return {'type': 'error', 'message': '缺少type字段'}
-    
+
     handler = EFFECT_REGISTRY.get(effect_type)
-    
+
     if not handler:
         return {'type': 'error', 'message': f'未知效果: {effect_type}'}
-    
+
+    stats = EFFECT_STATS.get(effect_type) or EFFECT_STATS.setdefault(effect_type, [0, 0.0])
+    started = perf_counter()
     try:
         return handler(effect_config, attacker, target, context)
     except Exception as e:
         return {'type': 'error', 'message': f'执行错误: {e}'}
+    finally:
+        stats[0] += 1
+        stats[1] += perf_counter() - started
+
+# ========================================
+# 效果管线
+# ========================================
+
+def compile_effect(effect_config):
+    """
+    单个效果配置 -> 执行函数 step(attacker, target, context)
+
+    Returns:
+        callable | None: 未知效果返回 None
+    """
+    effect_type = effect_config.get('type')
+    compile_func = EFFECT_COMPILERS.get(effect_type)
+    if compile_func:
+        return compile_func(effect_config)
+
+    handler = EFFECT_REGISTRY.get(effect_type)
+    if handler:
+        return lambda attacker, target, context: handler(effect_config, attacker, target, context)
+    return None
+
+def compile_pipeline(effects):
+    """
+    效果列表 -> ((effect_type, step, 计时), ...)
+
+    未知或编译失败的效果在这里记一次日志并跳过，施法时不再逐次报错。
+    """
+    pipeline = []
+    for effect_config in effects:
+        effect_type = effect_config.get('type')
+        try:
+            step = compile_effect(effect_config)
+        except Exception as e:
+            logger.log_err(f"[效果] {effect_type} 编译失败: {e}")
+            continue
+        if step is None:
+            if effect_type not in _UNKNOWN:
+                _UNKNOWN.add(effect_type)
+                logger.log_warn(f"[效果] 未知效果: {effect_type}")
+            continue
+        pipeline.append((effect_type, step, EFFECT_STATS.setdefault(effect_type, [0, 0.0])))
+    return tuple(pipeline)
+
+def effect_pipeline(effects):
+    """效果列表对应的管线（预编译过的直接取，否则现编译）"""
+    if not effects:
+        return ()
+    entry = _PIPELINES.get(id(effects))
+    if entry is not None and entry[0] is effects:
+        return entry[1]
+    return compile_pipeline(effects)
+
+def run_pipeline(pipeline, attacker, target, context):
+    """顺序执行管线（单个效果出错只记日志，不影响后面的效果）"""
+    for effect_type, step, stats in pipeline:
+        started = perf_counter()
+        try:
+            step(attacker, target, context)
+        except Exception as e:
+            logger.log_err(f"[效果] {effect_type} 执行错误: {e}")
+        stats[0] += 1
+        stats[1] += perf_counter() - started
+
+def run_area_pipeline(pipeline, attacker, contexts):
+    """
+    对多个目标执行管线（范围技能）
+
+    step 带 batch 属性的效果（如 damage）一次处理所有目标，
+    on_self 的效果（自疗、回灵、自身 Buff）只用第一个目标的 context 执行一次，
+    其它效果逐目标调用。每个目标一份 context，context['target'] 为该目标。
+    """
+    if not contexts:
+        return
+    for effect_type, step, stats in pipeline:
+        started = perf_counter()
+        try:
+            batch = getattr(step, 'batch', None)
+            if batch is not None:
+                batch(attacker, contexts)
+            elif getattr(step, 'on_self', False):
+                step(attacker, contexts[0]['target'], contexts[0])
+            else:
+                for context in contexts:
+                    step(attacker, context['target'], context)
+        except Exception as e:
+            logger.log_err(f"[效果] {effect_type} 执行错误: {e}")
+        stats[0] += 1 if getattr(step, 'on_self', False) else len(contexts)
+        stats[1] += perf_counter() - started
+
+def compile_skill_pipelines():
+    """
+    预编译所有技能各等级的效果管线（技能数据加载后调用）
+
+    Returns:
+        int: 管线数
+    """
+    from world.loaders.game_data import GAME_DATA
+    from world.loaders.skill_loader import get_skill_at_level
+
+    _PIPELINES.clear()
+    for skill_key, skill in GAME_DATA.get('skills', {}).items():
+        # 被动技能的 stat_bonus 由 skill_mixin 装备时施加，不走出招管线
+        if not skill.get('effects') or skill.get('type') == 'passive':
+            continue
+
+        max_level = (skill.get('level_formula') or {}).get('max_level', 1)
+        for level in range(1, max_level + 1):
+            effects = get_skill_at_level(skill_key, level).get('effects')
+            if effects:
+                _PIPELINES[id(effects)] = (effects, compile_pipeline(effects))
+
+    return len(_PIPELINES)
+
+def get_effect_stats():
+    """
+    各效果耗时统计，按累计耗时从高到低
+
+    Returns:
+        list: [(effect_type, 调用次数, 累计秒数), ...]
+    """
+    rows = [(effect_type, calls, seconds) for effect_type, (calls, seconds) in EFFECT_STATS.items() if calls]
+    rows.sort(key=lambda row: row[2], reverse=True)
+    return rows
+
+def reset_effect_stats():
+    """清空耗时统计（原地清零，已编译的管线继续使用同一份计数）"""
+    for stats in EFFECT_STATS.values():
+        stats[0] = 0
+        stats[1] = 0.0
 
 def get_registered_effects():
     """获取已注册效果列表"""
@@ -37,7 +257,17 @@ from . import debuff_effects
 # 删除：blood_effects, counter_effects
 __all__ = [
     'register_effect',
+    'register_compiled',
+    'register_buff',
     'apply_effect',
+    'buff_template',
+    'compile_pipeline',
+    'effect_pipeline',
+    'run_pipeline',
+    'run_area_pipeline',
+    'compile_skill_pipelines',
+    'get_effect_stats',
+    'reset_effect_stats',
     'get_registered_effects',
     'EFFECT_REGISTRY'
-]
\ No newline at end of file
+]
@@ -1,11 +1,15 @@
 """基础技能效果 - 伤害、治疗等
 /home/gg/xx/xxx/world/systems/skill_effects/base_effects.py"""
 import random
-from . import register_effect
-from world.loaders.game_data import get_config
+from . import register_compiled
+from world.loaders.game_data import config_float
+from world.systems.batch_rng import batch_random
 
-@register_effect("damage")
-def damage_effect(config, attacker, target, context):
+DAMAGE_VARIANCE = config_float('combat.damage_variance', 0.1)
+CRITICAL_MULTIPLIER = config_float('combat.critical_multiplier', 2.0)
+
+@register_compiled("damage")
+def damage_effect(config):
     """
     造成伤害效果
     
@@ -16,73 +20,111 @@ def damage_effect(config, attacker, target, context):
         scale_ratio: 缩放系数（默认1.0）
         damage_variance: 伤害浮动范围（可选，默认使用全局配置）
     """
-    base_damage = config.get('value', 0)
+    base_value = config.get('value', 0)
     element = config.get('element', 'physical')
     
     # 属性缩放
     scale_attr = config.get('scale_with')
     scale_ratio = config.get('scale_ratio', 1.0)
     
-    if scale_attr:
-        attr_value = getattr(attacker.ndb, scale_attr, 0) or 0
-        base_damage += attr_value * scale_ratio
-    
-    # 伤害浮动 - 优先使用技能配置的variance，其次使用全局配置
-    variance = config.get('damage_variance', get_config('combat.damage_variance', 0.1))
-    damage = base_damage * random.uniform(1 - variance, 1 + variance)
-    
-    # 暴击倍率（从context获取）
-    if context.get('is_critical'):
-        crit_multi = get_config('combat.critical_multiplier', 2.0)
-        damage *= crit_multi
+    # 伤害浮动 - 优先使用技能配置的variance，其次使用全局配置（执行时读取，跟随配置重载）
+    skill_variance = config.get('damage_variance')
     
-    # 应用伤害
-    final_damage = int(damage)
-    target.ndb.hp = max(0, target.ndb.hp - final_damage)
+    def damage(attacker, target, context):
+        base_damage = base_value
+        if scale_attr:
+            attr_value = getattr(attacker.ndb, scale_attr, 0) or 0
+            base_damage += attr_value * scale_ratio
+        
+        variance = DAMAGE_VARIANCE.value if skill_variance is None else skill_variance
+        rng = context.get('rng') or random
+        damage = base_damage * rng.uniform(1 - variance, 1 + variance)
+        
+        # 暴击倍率（从context获取）
+        if context.get('is_critical'):
+            damage *= CRITICAL_MULTIPLIER.value
+        
+        # 应用伤害
+        final_damage = int(damage)
+        target.ndb.hp = max(0, target.ndb.hp - final_damage)
+        
+        # 保存到上下文
+        context['last_damage'] = final_damage
+        context['total_damage'] = context.get('total_damage', 0) + final_damage
+        
+        return {
+            'type': 'damage',
+            'value': final_damage,
+            'element': element,
+        }
     
-    # 保存到上下文
-    context['last_damage'] = final_damage
-    context['total_damage'] = context.get('total_damage', 0) + final_damage
+    def damage_many(attacker, contexts):
+        """范围技能：所有目标的浮动一次批量抽取，属性缩放只算一次"""
+        base_damage = base_value
+        if scale_attr:
+            attr_value = getattr(attacker.ndb, scale_attr, 0) or 0
+            base_damage += attr_value * scale_ratio
+        
+        variance = DAMAGE_VARIANCE.value if skill_variance is None else skill_variance
+        low = 1 - variance
+        span = 2 * variance
+        crit_multi = CRITICAL_MULTIPLIER.value
+        rng = contexts[0].get('rng') or random
+        
+        for context, roll in zip(contexts, batch_random(rng, len(contexts))):
+            damage = base_damage * (low + span * roll)
+            if context.get('is_critical'):
+                damage *= crit_multi
+            
+            final_damage = int(damage)
+            target = context['target']
+            target.ndb.hp = max(0, target.ndb.hp - final_damage)
+            
+            context['last_damage'] = final_damage
+            context['total_damage'] = context.get('total_damage', 0) + final_damage
     
-    return {
-        'type': 'damage',
-        'value': final_damage,
-        'element': element,
-    }
+    damage.batch = damage_many
+    return damage
 
-@register_effect("heal")
-def heal_effect(config, attacker, target, context):
+@register_compiled("heal")
+def heal_effect(config):
     """治疗效果"""
     heal_value = config.get('value', 0)
-    heal_target_type = config.get('target', 'target')
+    on_self = config.get('target', 'target') == 'self'
     
-    heal_target = attacker if heal_target_type == 'self' else target
-    
-    old_hp = heal_target.ndb.hp
-    heal_target.ndb.hp = min(
-        heal_target.ndb.hp + heal_value, 
-        heal_target.ndb.max_hp
-    )
-    actual_heal = heal_target.ndb.hp - old_hp
-    
-    return {
-        'type': 'heal',
-        'value': actual_heal,
-    }
+    def heal(attacker, target, context):
+        heal_target = attacker if on_self else target
+        
+        old_hp = heal_target.ndb.hp
+        heal_target.ndb.hp = min(
+            heal_target.ndb.hp + heal_value, 
+            heal_target.ndb.max_hp
+        )
+        actual_heal = heal_target.ndb.hp - old_hp
+        
+        return {
+            'type': 'heal',
+            'value': actual_heal,
+        }
+    heal.on_self = on_self
+    return heal
 
-@register_effect("restore_qi")
-def restore_qi_effect(config, attacker, target, context):
+@register_compiled("restore_qi")
+def restore_qi_effect(config):
     """恢复灵力效果"""
     qi_value = config.get('value', 0)
     
-    old_qi = attacker.ndb.qi
-    attacker.ndb.qi = min(
-        attacker.ndb.qi + qi_value,
-        attacker.ndb.max_qi
-    )
-    actual_restore = attacker.ndb.qi - old_qi
-    
-    return {
-        'type': 'restore_qi',
-        'value': actual_restore,
-    }
\ No newline at end of file
+    def restore_qi(attacker, target, context):
+        old_qi = attacker.ndb.qi
+        attacker.ndb.qi = min(
+            attacker.ndb.qi + qi_value,
+            attacker.ndb.max_qi
+        )
+        actual_restore = attacker.ndb.qi - old_qi
+        
+        return {
+            'type': 'restore_qi',
+            'value': actual_restore,
+        }
+    restore_qi.on_self = True
+    return restore_qi
@@ -1,48 +1,69 @@
 """
 world/systems/skill_effects/debuff_effects.py
 减益效果（Debuff）- 修仙MUD
+
+Debuff 同样编译成共享模板（见 register_buff）。
 """
-from . import register_effect
-from world.systems.buff_manager import BuffManager
+from . import register_compiled, register_buff
 
-@register_effect("apply_poison")
-def apply_poison_effect(config, attacker, target, context):
-    """
-    中毒：每回合损失生命
-    
-    Config:
-        tick_damage: 每回合伤害
-        duration: 持续回合数
-        element: 元素类型（默认poison）
-    """
-    tick_damage = config.get('tick_damage', 10)
-    duration = config.get('duration', 3)
-    element = config.get('element', 'poison')
-    name = config.get('name', '中毒')
-    
-    buff_config = {
+def _dot(config, name, element, default_damage, max_stacks, extra=None, effects=()):
+    """持续伤害类 Debuff 的公共部分"""
+    buff = {
         'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 5,
+        'name': config.get('name', name),
+        'max_stacks': max_stacks,
         'stack_mode': 'add',
         'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': element}
+            {'type': 'damage', 'value': config.get('tick_damage', default_damage), 'element': element},
+            *effects,
         ],
         'trigger_on': 'turn_start',
         'tick_interval': 1,
         'show_tick_message': True,
     }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
+    if extra:
+        buff['extra'] = extra
+    return buff
+
+def _stat_debuff(config, name, stat, default_value, max_stacks=3, stack_mode='add'):
+    """属性削弱类 Debuff 的公共部分"""
     return {
-        'type': 'apply_poison',
-        'tick_damage': tick_damage,
+        'type': 'debuff',
+        'name': config.get('name', name),
+        'max_stacks': max_stacks,
+        'stack_mode': stack_mode,
+        'effects': [
+            {'type': 'stat_mod', 'stat': stat, 'value': config.get('value', default_value)}
+        ],
+        'trigger_on': 'turn_start',
+    }
+
+def _flag_debuff(config, buff_type, name, extra):
+    """只在 extra 里打标记、由战斗逻辑读取的 Debuff"""
+    return {
+        'type': buff_type,
+        'name': config.get('name', name),
+        'max_stacks': 1,
+        'stack_mode': 'refresh',
+        'effects': [],
+        'trigger_on': 'turn_start',
+        'extra': extra,
     }
 
-@register_effect("apply_weakness")
-def apply_weakness_effect(config, attacker, target, context):
+@register_buff("apply_poison")
+def poison_buff(config):
+    """
+    中毒：每回合损失生命
+    
+    Config:
+        tick_damage: 每回合伤害
+        duration: 持续回合数
+        element: 元素类型（默认poison）
+    """
+    return _dot(config, '中毒', config.get('element', 'poison'), 10, 5)
+
+@register_buff("apply_weakness")
+def weakness_buff(config):
     """
     虚弱：降低攻击力
     
@@ -51,32 +72,10 @@ def apply_weakness_effect(config, attacker, target, context):
         duration: 持续回合数
         stat: 属性名（strength/intelligence等）
     """
-    debuff_value = config.get('value', -10)
-    duration = config.get('duration', 3)
-    stat = config.get('stat', 'strength')
-    name = config.get('name', '虚弱')
-    
-    buff_config = {
-        'type': 'debuff',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 3,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'stat_mod', 'stat': stat, 'value': debuff_value}
-        ],
-        'trigger_on': 'turn_start',
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_weakness',
-        'value': debuff_value,
-    }
+    return _stat_debuff(config, '虚弱', config.get('stat', 'strength'), -10)
 
-@register_effect("apply_armor_break")
-def apply_armor_break_effect(config, attacker, target, context):
+@register_buff("apply_armor_break")
+def armor_break_buff(config):
     """
     破防：降低防御力
     
@@ -84,31 +83,10 @@ def apply_armor_break_effect(config, attacker, target, context):
         value: 防御力减少量
         duration: 持续回合数
     """
-    debuff_value = config.get('value', -15)
-    duration = config.get('duration', 3)
-    name = config.get('name', '破防')
-    
-    buff_config = {
-        'type': 'debuff',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 3,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'stat_mod', 'stat': 'defense', 'value': debuff_value}
-        ],
-        'trigger_on': 'turn_start',
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_armor_break',
-        'value': debuff_value,
-    }
+    return _stat_debuff(config, '破防', 'defense', -15)
 
-@register_effect("apply_slow")
-def apply_slow_effect(config, attacker, target, context):
+@register_buff("apply_slow")
+def slow_buff(config):
     """
     减速：降低行动速度
     
@@ -116,31 +94,10 @@ def apply_slow_effect(config, attacker, target, context):
         value: 敏捷减少量
         duration: 持续回合数
     """
-    debuff_value = config.get('value', -5)
-    duration = config.get('duration', 3)
-    name = config.get('name', '减速')
-    
-    buff_config = {
-        'type': 'debuff',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 3,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'stat_mod', 'stat': 'agility', 'value': debuff_value}
-        ],
-        'trigger_on': 'turn_start',
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_slow',
-        'value': debuff_value,
-    }
+    return _stat_debuff(config, '减速', 'agility', -5)
 
-@register_effect("apply_bleed")
-def apply_bleed_effect(config, attacker, target, context):
+@register_buff("apply_bleed")
+def bleed_buff(config):
     """
     流血：每回合损失生命 + 治疗效果降低
     
@@ -149,97 +106,32 @@ def apply_bleed_effect(config, attacker, target, context):
         heal_reduce: 治疗效果降低比例（0.5 = 50%）
         duration: 持续回合数
     """
-    tick_damage = config.get('tick_damage', 15)
-    heal_reduce = config.get('heal_reduce', 0.5)
-    duration = config.get('duration', 3)
-    name = config.get('name', '流血')
-    
-    buff_config = {
-        'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 5,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': 'physical'}
-        ],
-        'trigger_on': 'turn_start',
-        'tick_interval': 1,
-        'show_tick_message': True,
-        'extra': {
-            'heal_reduce': heal_reduce,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_bleed',
-        'tick_damage': tick_damage,
-    }
+    return _dot(config, '流血', 'physical', 15, 5, extra={
+        'heal_reduce': config.get('heal_reduce', 0.5),
+    })
 
-@register_effect("apply_silence")
-def apply_silence_effect(config, attacker, target, context):
+@register_buff("apply_silence", duration=2)
+def silence_buff(config):
     """
     沉默：无法使用技能
     
     Config:
         duration: 持续回合数
     """
-    duration = config.get('duration', 2)
-    name = config.get('name', '沉默')
-    
-    buff_config = {
-        'type': 'control',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 1,
-        'stack_mode': 'refresh',
-        'effects': [],
-        'trigger_on': 'turn_start',
-        'extra': {
-            'silenced': True,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_silence',
-    }
+    return _flag_debuff(config, 'control', '沉默', {'silenced': True})
 
-@register_effect("apply_stun")
-def apply_stun_effect(config, attacker, target, context):
+@register_buff("apply_stun", duration=1)
+def stun_buff(config):
     """
     禁锢/眩晕：无法行动
     
     Config:
         duration: 持续回合数
     """
-    duration = config.get('duration', 1)
-    name = config.get('name', '禁锢')
-    
-    buff_config = {
-        'type': 'control',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 1,
-        'stack_mode': 'refresh',
-        'effects': [],
-        'trigger_on': 'turn_start',
-        'extra': {
-            'stunned': True,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_stun',
-    }
+    return _flag_debuff(config, 'control', '禁锢', {'stunned': True})
 
-@register_effect("apply_blind")
-def apply_blind_effect(config, attacker, target, context):
+@register_buff("apply_blind")
+def blind_buff(config):
     """
     致盲：攻击命中率下降
     
@@ -247,31 +139,10 @@ def apply_blind_effect(config, attacker, target, context):
         value: 命中率减少量（-0.2 = -20%）
         duration: 持续回合数
     """
-    debuff_value = config.get('value', -0.2)
-    duration = config.get('duration', 3)
-    name = config.get('name', '致盲')
-    
-    buff_config = {
-        'type': 'debuff',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 1,
-        'stack_mode': 'refresh',
-        'effects': [
-            {'type': 'stat_mod', 'stat': 'accuracy', 'value': debuff_value}
-        ],
-        'trigger_on': 'turn_start',
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_blind',
-        'value': debuff_value,
-    }
+    return _stat_debuff(config, '致盲', 'accuracy', -0.2, max_stacks=1, stack_mode='refresh')
 
-@register_effect("apply_curse")
-def apply_curse_effect(config, attacker, target, context):
+@register_buff("apply_curse")
+def curse_buff(config):
     """
     诅咒：受到的所有伤害增加
     
@@ -279,32 +150,12 @@ def apply_curse_effect(config, attacker, target, context):
         damage_increase: 伤害增幅（0.3 = +30%）
         duration: 持续回合数
     """
-    damage_increase = config.get('damage_increase', 0.3)
-    duration = config.get('duration', 3)
-    name = config.get('name', '诅咒')
-    
-    buff_config = {
-        'type': 'debuff',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 1,
-        'stack_mode': 'refresh',
-        'effects': [],
-        'trigger_on': 'turn_start',
-        'extra': {
-            'damage_increase': damage_increase,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_curse',
-        'damage_increase': damage_increase,
-    }
+    return _flag_debuff(config, 'debuff', '诅咒', {
+        'damage_increase': config.get('damage_increase', 0.3),
+    })
 
-@register_effect("apply_qi_drain")
-def apply_qi_drain_effect(config, attacker, target, context):
+@register_buff("apply_qi_drain")
+def qi_drain_buff(config):
     """
     灵力流失：每回合损失灵力
     
@@ -312,37 +163,25 @@ def apply_qi_drain_effect(config, attacker, target, context):
         tick_drain: 每回合消耗灵力
         duration: 持续回合数
     """
-    tick_drain = config.get('tick_drain', 10)
-    duration = config.get('duration', 3)
-    name = config.get('name', '灵力流失')
-    
-    buff_config = {
+    return {
         'type': 'debuff',
-        'name': name,
-        'duration': duration,
+        'name': config.get('name', '灵力流失'),
         'max_stacks': 3,
         'stack_mode': 'add',
         'effects': [
-            {'type': 'qi_drain', 'value': tick_drain}
+            {'type': 'qi_drain', 'value': config.get('tick_drain', 10)}
         ],
         'trigger_on': 'turn_start',
         'tick_interval': 1,
         'show_tick_message': True,
     }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_qi_drain',
-        'tick_drain': tick_drain,
-    }
 
 # ========================================
 # 修仙特色Debuff
 # ========================================
 
-@register_effect("apply_burn")
-def apply_burn_effect(config, attacker, target, context):
+@register_buff("apply_burn")
+def burn_buff(config):
     """
     灼烧：火系持续伤害 + 降低治疗效果
     
@@ -351,37 +190,12 @@ def apply_burn_effect(config, attacker, target, context):
         heal_reduce: 治疗效果降低（0.3 = 30%）
         duration: 持续回合数
     """
-    tick_damage = config.get('tick_damage', 12)
-    heal_reduce = config.get('heal_reduce', 0.3)
-    duration = config.get('duration', 3)
-    name = config.get('name', '灼烧')
-    
-    buff_config = {
-        'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 5,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': 'fire'}
-        ],
-        'trigger_on': 'turn_start',
-        'tick_interval': 1,
-        'show_tick_message': True,
-        'extra': {
-            'heal_reduce': heal_reduce,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_burn',
-        'tick_damage': tick_damage,
-    }
+    return _dot(config, '灼烧', 'fire', 12, 5, extra={
+        'heal_reduce': config.get('heal_reduce', 0.3),
+    })
 
-@register_effect("apply_frozen")
-def apply_frozen_effect(config, attacker, target, context):
+@register_buff("apply_frozen")
+def frozen_buff(config):
     """
     冰封：水系持续伤害 + 降低速度
     
@@ -390,35 +204,12 @@ def apply_frozen_effect(config, attacker, target, context):
         slow_value: 速度减少量
         duration: 持续回合数
     """
-    tick_damage = config.get('tick_damage', 8)
-    slow_value = config.get('slow_value', -10)
-    duration = config.get('duration', 3)
-    name = config.get('name', '冰封')
-    
-    buff_config = {
-        'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 3,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': 'water'},
-            {'type': 'stat_mod', 'stat': 'agility', 'value': slow_value}
-        ],
-        'trigger_on': 'turn_start',
-        'tick_interval': 1,
-        'show_tick_message': True,
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_frozen',
-        'tick_damage': tick_damage,
-    }
+    return _dot(config, '冰封', 'water', 8, 3, effects=(
+        {'type': 'stat_mod', 'stat': 'agility', 'value': config.get('slow_value', -10)},
+    ))
 
-@register_effect("apply_shock")
-def apply_shock_effect(config, attacker, target, context):
+@register_buff("apply_shock")
+def shock_buff(config):
     """
     雷击麻痹：雷系持续伤害 + 有概率晕眩
     
@@ -427,37 +218,12 @@ def apply_shock_effect(config, attacker, target, context):
         stun_chance: 晕眩概率
         duration: 持续回合数
     """
-    tick_damage = config.get('tick_damage', 10)
-    stun_chance = config.get('stun_chance', 0.2)
-    duration = config.get('duration', 3)
-    name = config.get('name', '雷击麻痹')
-    
-    buff_config = {
-        'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 3,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': 'lightning'}
-        ],
-        'trigger_on': 'turn_start',
-        'tick_interval': 1,
-        'show_tick_message': True,
-        'extra': {
-            'stun_chance': stun_chance,
-        }
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_shock',
-        'tick_damage': tick_damage,
-    }
+    return _dot(config, '雷击麻痹', 'lightning', 10, 3, extra={
+        'stun_chance': config.get('stun_chance', 0.2),
+    })
 
-@register_effect("apply_corrosion")
-def apply_corrosion_effect(config, attacker, target, context):
+@register_buff("apply_corrosion")
+def corrosion_buff(config):
     """
     腐蚀：毒系持续伤害 + 降低防御
     
@@ -466,35 +232,12 @@ def apply_corrosion_effect(config, attacker, target, context):
         defense_reduce: 防御减少量
         duration: 持续回合数
     """
-    tick_damage = config.get('tick_damage', 10)
-    defense_reduce = config.get('defense_reduce', -5)
-    duration = config.get('duration', 3)
-    name = config.get('name', '腐蚀')
-    
-    buff_config = {
-        'type': 'dot',
-        'name': name,
-        'duration': duration,
-        'max_stacks': 5,
-        'stack_mode': 'add',
-        'effects': [
-            {'type': 'damage', 'value': tick_damage, 'element': 'poison'},
-            {'type': 'stat_mod', 'stat': 'defense', 'value': defense_reduce}
-        ],
-        'trigger_on': 'turn_start',
-        'tick_interval': 1,
-        'show_tick_message': True,
-    }
-    
-    BuffManager.add_buff(target, buff_config, attacker, duration)
-    
-    return {
-        'type': 'apply_corrosion',
-        'tick_damage': tick_damage,
-    }
+    return _dot(config, '腐蚀', 'poison', 10, 5, effects=(
+        {'type': 'stat_mod', 'stat': 'defense', 'value': config.get('defense_reduce', -5)},
+    ))
 
-@register_effect("qi_drain")
-def qi_drain_effect(config, attacker, target, context):
+@register_compiled("qi_drain")
+def qi_drain_effect(config):
     """
     灵力消耗效果（内部使用）
     
@@ -503,11 +246,13 @@ def qi_drain_effect(config, attacker, target, context):
     """
     drain_value = config.get('value', 10)
     
-    old_qi = target.ndb.qi
-    target.ndb.qi = max(0, target.ndb.qi - drain_value)
-    actual_drain = old_qi - target.ndb.qi
-    
-    return {
-        'type': 'qi_drain',
-        'value': actual_drain,
-    }
+    def qi_drain(attacker, target, context):
+        old_qi = target.ndb.qi
+        target.ndb.qi = max(0, target.ndb.qi - drain_value)
+        actual_drain = old_qi - target.ndb.qi
+        
+        return {
+            'type': 'qi_drain',
+            'value': actual_drain,
+        }
+    return qi_drain
@@ -0,0 +1,142 @@
+"""
+world/systems/stat_engine.py
+属性引擎 - 派生属性的修正栈
+
+派生属性 = 基础(境界+等级) + 装备 + 词条 + Buff + 被动技能
+
+每个属性保存基础值和一份 {来源: 修正值} 的修正栈，来源示例:
+    'equip'              装备（整层替换）
+    'affix'              装备词条（整层替换）
+    'buff:<buff_id>'     Buff 的 stat_mod
+    'passive:<skill>'    被动技能的 stat_bonus
+
+修改只把受影响的属性标脏，flush 时只重算这些属性并写回 ndb，
+战斗中读属性仍是 getattr(char.ndb, 'agility')，O(1)。
+重新从数据库同步（sync_stats_to_ndb）只替换基础层和装备层，
+Buff / 被动层保留，不再互相覆盖。
+"""
+
+# 上限变化时需要封顶的当前值
+CLAMPED_STATS = {'max_hp': 'hp', 'max_qi': 'qi'}
+
+
+class StatSheet:
+    """
+    单个角色的属性表（存放在 ndb.stats）
+
+    没有显式基础值的属性，第一次被修正时以 ndb 上的当前值作为基础值，
+    因此模拟器、测试用的假角色也能直接使用。
+    """
+
+    __slots__ = ('owner', '_base', '_mods', '_sources', '_totals', '_dirty', 'synced')
+
+    def __init__(self, owner):
+        self.owner = owner
+        self._base = {}         # stat -> 基础值
+        self._mods = {}         # stat -> {source: value}
+        self._sources = {}      # source -> {stat: value}
+        self._totals = {}       # stat -> 缓存的总值
+        self._dirty = set()
+        self.synced = None      # 上次从数据库重建基础层/装备层时的输入（sync_stats_to_ndb 用来跳过重复同步）
+
+    @classmethod
+    def of(cls, character):
+        """取角色的属性表（没有则新建）"""
+        sheet = getattr(character.ndb, 'stats', None)
+        if not isinstance(sheet, cls):
+            sheet = cls(character)
+            character.ndb.stats = sheet
+        return sheet
+
+    # ========================================
+    # 基础层
+    # ========================================
+
+    def set_base(self, stat, value):
+        """设置基础值（不立即写回，需 flush）"""
+        if self._base.get(stat) != value:
+            self._base[stat] = value
+            self._dirty.add(stat)
+
+    def base(self, stat, default=0):
+        """基础值（不含任何修正）"""
+        return self._base.get(stat, default)
+
+    # ========================================
+    # 修正层
+    # ========================================
+
+    def set_source(self, source, stats, flush=True):
+        """
+        整体替换某个来源的修正（重复调用是幂等的）
+
+        Args:
+            source (str): 来源标识
+            stats (dict): {stat: 修正值}，空字典等同于移除
+        """
+        old = self._sources.pop(source, None) or {}
+        new = {
+            stat: value for stat, value in (stats or {}).items()
+            if value and isinstance(value, (int, float))
+        }
+
+        for stat, value in old.items():
+            if new.get(stat) != value:
+                self._mods[stat].pop(source, None)
+                self._dirty.add(stat)
+        for stat, value in new.items():
+            if old.get(stat) != value:
+                self._seed(stat)
+                self._mods.setdefault(stat, {})[source] = value
+                self._dirty.add(stat)
+
+        if new:
+            self._sources[source] = new
+        if flush:
+            self.flush()
+
+    def remove_source(self, source, flush=True):
+        """移除某个来源的全部修正"""
+        self.set_source(source, None, flush)
+
+    def bonus(self, stat):
+        """所有修正之和"""
+        return sum(self._mods.get(stat, {}).values())
+
+    # ========================================
+    # 读取 / 写回
+    # ========================================
+
+    def get(self, stat, default=0):
+        """属性总值"""
+        if stat in self._dirty:
+            self.flush()
+        return self._totals.get(stat, self._base.get(stat, default))
+
+    def flush(self):
+        """重算标脏的属性并写回 ndb"""
+        if not self._dirty:
+            return
+
+        ndb = self.owner.ndb
+        dirty = self._dirty
+        self._dirty = set()
+
+        for stat in dirty:
+            total = self._base.get(stat, 0) + sum(self._mods.get(stat, {}).values())
+            self._totals[stat] = total
+            setattr(ndb, stat, total)
+
+            current = CLAMPED_STATS.get(stat)
+            if current is not None:
+                value = getattr(ndb, current, None)
+                if value is not None and value > total:
+                    setattr(ndb, current, total)
+
+    def _seed(self, stat):
+        """第一次修正没有基础值的属性时，以 ndb 当前值为基础"""
+        if stat not in self._base:
+            self._base[stat] = getattr(self.owner.ndb, stat, 0) or 0
+
+    def __repr__(self):
+        return f"<StatSheet {self.owner} {len(self._base)} stats, {len(self._sources)} sources>"